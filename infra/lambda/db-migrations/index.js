@@ -1,3 +1,4 @@
+const crypto = require('crypto');
 const fs = require('fs');
 const https = require('https');
 const url = require('url');
@@ -7,6 +8,12 @@ const { sql } = require('@databases/pg');
 
 const dbSecretArn = process.env.DB_SECRET_ARN;
 
+/** SQL directories in the order they are applied; files in name order within each */
+const SQL_DIRS = ['init-for-rds', 'init-scripts', 'migrations'];
+
+/** Session-level advisory lock so concurrent deploys don't apply files twice */
+const MIGRATION_LOCK = 'supabase-db-migrations';
+
 /** API Client for Secrets Manager */
 const secretsManager = new SecretsManagerClient({});
 
@@ -60,131 +67,220 @@ const sendResponse = async (event, context, status, data = {}, physicalResourceI
   });
 };
 
-/** Run queries under the directory */
-const runQueries = async (db, dir) => {
+/** SHA-256 of a file in the bundle */
+const checksumOf = (filePath) => crypto.createHash('sha256').update(fs.readFileSync(filePath)).digest('hex');
+
+/** Manifest of the bundled SQL tree, for events that don't carry one (e.g. test-event.json) */
+const localManifest = () => {
+  const manifest = [];
+  for (const dir of SQL_DIRS) {
+    if (!fs.existsSync(`./sql/${dir}`)) {
+      console.warn(`Directory does not exist: ./sql/${dir}`);
+      continue;
+    }
+    for (const file of fs.readdirSync(`./sql/${dir}`).filter(name => name.endsWith('.sql')).sort()) {
+      manifest.push({ path: `${dir}/${file}`, checksum: checksumOf(`./sql/${dir}/${file}`) });
+    }
+  }
+  return manifest;
+};
+
+/** Parse the "dir/file.sql:sha256" entries passed by DatabaseMigrations */
+const parseManifest = (entries) => entries.map((entry) => {
+  const separator = entry.lastIndexOf(':');
+  return { path: entry.slice(0, separator), checksum: entry.slice(separator + 1) };
+});
+
+/** Errors from files that were applied before the ledger existed and are safe to ignore */
+const isIgnorable = (err) => err.message.includes('already exists') ||
+  err.message.includes('already installed') ||
+  err.message.includes('permission denied to set parameter') ||
+  err.message.includes('does not exist') && (err.message.includes('role') || err.message.includes('function')) ||
+  err.severity === 'NOTICE';
+
+/** Create the ledger of applied files */
+const ensureLedger = async (connection) => {
+  await connection.query(sql`CREATE SCHEMA IF NOT EXISTS infra_migrations`);
+  await connection.query(sql`
+    CREATE TABLE IF NOT EXISTS infra_migrations.applied_files (
+      path text PRIMARY KEY,
+      checksum text NOT NULL,
+      applied_at timestamptz NOT NULL DEFAULT now(),
+      duration_ms integer NOT NULL,
+      runs integer NOT NULL DEFAULT 1
+    )`);
+  // Set when the file's error was ignored: it rolled back, so the next run tries it again
+  await connection.query(sql`ALTER TABLE infra_migrations.applied_files ADD COLUMN IF NOT EXISTS ignored_error text`);
+};
+
+/** Run one SQL file and record it in the ledger (with ignored_error if it failed harmlessly); returns its timing */
+const applyFile = async (connection, entry) => {
+  const filePath = `./sql/${entry.path}`;
+  const started = Date.now();
+  let ignored = null;
   try {
-    console.info(`Processing directory: ${dir}`);
-    
-    // Check if directory exists
-    if (!fs.existsSync(dir)) {
-      console.warn(`Directory does not exist: ${dir}`);
-      return;
+    console.info(`Executing SQL file: ${filePath}`);
+    await connection.query(sql.file(filePath));
+  } catch (err) {
+    if (!isIgnorable(err)) {
+      console.error(`Error executing ${entry.path}:`, err.message);
+      throw err; // Re-throw to stop execution on error
     }
+    console.warn(`Ignoring error in ${entry.path} - resource already exists, permission denied, or missing dependency: ${err.message}`);
+    ignored = err.message;
+  }
+  const durationMs = Date.now() - started;
+  await connection.query(sql`
+    INSERT INTO infra_migrations.applied_files (path, checksum, duration_ms, ignored_error)
+    VALUES (${entry.path}, ${entry.checksum}, ${durationMs}, ${ignored})
+    ON CONFLICT (path) DO UPDATE
+      SET checksum = EXCLUDED.checksum, duration_ms = EXCLUDED.duration_ms, ignored_error = EXCLUDED.ignored_error,
+          applied_at = now(), runs = applied_files.runs + 1`);
+  console.info(`${ignored ? 'Rolled back' : 'Applied'} ${entry.path} in ${durationMs}ms`);
+  return { path: entry.path, durationMs, ignored };
+};
 
-    /** SQL files under the directory */
-    const files = fs.readdirSync(dir).filter(name => name.endsWith('.sql'));
-    console.info(`Found ${files.length} SQL files in ${dir}`);
-
-    for (const file of files.sort()) {
-      const filePath = `${dir}/${file}`;
-      try {
-        console.info(`Executing SQL file: ${filePath}`);
-        const query = sql.file(filePath);
-        const result = await db.query(query);
-        console.info(`Successfully executed: ${file}`);
-        if (result.length > 0) {
-          console.info(`Query returned ${result.length} rows`);
-        }
-      } catch (err) {
-        // Handle common idempotent errors that are safe to ignore
-        if (err.message.includes('already exists') || 
-            err.message.includes('already installed') ||
-            err.message.includes('permission denied to set parameter') ||
-            err.message.includes('does not exist') && (err.message.includes('role') || err.message.includes('function')) ||
-            err.message.includes('relation') && err.message.includes('already exists') ||
-            err.severity === 'NOTICE') {
-          console.warn(`Skipping ${file} - resource already exists, permission denied, or missing dependency: ${err.message}`);
-        } else {
-          console.error(`Error executing ${file}:`, err.message);
-          throw err; // Re-throw to stop execution on error
-        }
+/** Apply the manifest files the ledger doesn't have (or has with another checksum) */
+const runMigrations = async (db, manifest) => db.task(async (connection) => {
+  const started = Date.now();
+  console.info(`Waiting for migration lock '${MIGRATION_LOCK}'`);
+  await connection.query(sql`SELECT pg_advisory_lock(hashtext(${MIGRATION_LOCK}))`);
+  try {
+    await ensureLedger(connection);
+    const rows = await connection.query(sql`SELECT path, checksum, ignored_error FROM infra_migrations.applied_files`);
+    const ledger = new Map(rows.map((row) => [row.path, row]));
+
+    const applied = [];
+    let unchanged = 0;
+    for (const entry of manifest) {
+      if (!fs.existsSync(`./sql/${entry.path}`) || checksumOf(`./sql/${entry.path}`) !== entry.checksum) {
+        throw new Error(`${entry.path} doesn't match the deployed Lambda bundle; redeploy the function`);
+      }
+      const recorded = ledger.get(entry.path);
+      if (recorded && recorded.checksum === entry.checksum && !recorded.ignored_error) {
+        unchanged += 1;
+        continue;
       }
+      if (recorded && recorded.checksum === entry.checksum) {
+        console.warn(`${entry.path} was rolled back last time (${recorded.ignored_error}) - trying it again`);
+      } else if (recorded) {
+        console.warn(`${entry.path} changed since it was applied - applying it again`);
+      }
+      applied.push(await applyFile(connection, entry));
     }
-  } catch (err) {
-    console.error(`Error processing directory ${dir}:`, err.message);
-    throw err;
+    return { applied, unchanged, durationMs: Date.now() - started };
+  } finally {
+    await connection.query(sql`SELECT pg_advisory_unlock(hashtext(${MIGRATION_LOCK}))`);
+  }
+});
+
+/** Response Data for CloudFormation (kept small: Data is limited to 4 KB) */
+const summarize = ({ applied, unchanged, durationMs }) => {
+  const slowest = applied.reduce((top, file) => (!top || file.durationMs > top.durationMs ? file : top), null);
+  return {
+    Message: 'Database migrations completed successfully',
+    Applied: String(applied.length),
+    Unchanged: String(unchanged),
+    IgnoredErrors: String(applied.filter((file) => file.ignored).length),
+    DurationMs: String(durationMs),
+    Slowest: slowest ? `${slowest.path} (${slowest.durationMs}ms)` : '',
+  };
+};
+
+/** Connect with the master user secret; RDS auto-generated secrets only contain username and password */
+const connectDatabase = async () => {
+  const { username: rootUsername, password: rootPassword } = await getSecret(dbSecretArn);
+
+  // Get RDS endpoint from environment variable
+  const host = process.env.DB_HOST;
+  const port = 5432;
+  const dbname = 'supabase';
+
+  console.info(`Connecting to database: ${host}:${port}/${dbname}`);
+  return connect({
+    host,
+    port: Number(port),
+    user: rootUsername,
+    password: rootPassword,
+    database: dbname,
+    ssl: 'disable',
+    bigIntMode: 'number',
+  });
+};
+
+/** Apply the manifest (or the bundled tree) and log per-file timings */
+const migrate = async (entries) => {
+  const db = await connectDatabase();
+  try {
+    const manifest = entries ? parseManifest(entries) : localManifest();
+    console.info(`Running database migrations (${manifest.length} files in the manifest)...`);
+    const result = await runMigrations(db, manifest);
+    for (const file of result.applied) {
+      console.info(`  ${String(file.durationMs).padStart(7)}ms  ${file.path}${file.ignored ? ' (error ignored)' : ''}`);
+    }
+    console.info(`Database migrations completed: ${result.applied.length} applied, ` +
+      `${result.unchanged} unchanged in ${result.durationMs}ms`);
+    return result;
+  } finally {
+    await db.dispose();
+    console.info('Database connection closed');
   }
 };
 
 exports.handler = async (event, context) => {
   console.info('Lambda invoked with event:', JSON.stringify(event, null, 2));
   console.info('Lambda context:', JSON.stringify(context, null, 2));
-  
+
+  // Direct invocation (aws_lambda_invocation): the result goes back to Terraform, errors fail the apply
+  if (!event.RequestType) {
+    if (event.Action !== 'migrate') {
+      console.info('Direct Lambda invocation without Action "migrate" - nothing to do');
+      return { statusCode: 200, body: 'Success' };
+    }
+    const result = await migrate(event.Manifest);
+    return {
+      fingerprint: event.Fingerprint || '',
+      applied: result.applied.length,
+      unchanged: result.unchanged,
+      ignored_errors: result.applied.filter((file) => file.ignored).length,
+      duration_ms: result.durationMs,
+      files: result.applied.map((file) => ({ path: file.path, duration_ms: file.durationMs })),
+    };
+  }
+
   try {
-    // Only run migrations for CloudFormation Custom Resource events
-    if (event.RequestType) {
-      const dbSecret = await getSecret(dbSecretArn);
-      
-      // RDS auto-generated secrets only contain username and password
-      // We need to get host from environment or construct it
-      const { username: rootUsername, password: rootPassword } = dbSecret;
-      
-      // Get RDS endpoint from environment variable
-      const host = process.env.DB_HOST;
-      const port = 5432;
-      const dbname = 'supabase';
-
-      console.info(`Connecting to database: ${host}:${port}/${dbname}`);
-      
-      const db = connect({
-        host,
-        port: Number(port),
-        user: rootUsername,
-        password: rootPassword,
-        database: dbname,
-        ssl: 'disable',
-        bigIntMode: 'number',
-      });
-      console.info('Connected to PostgreSQL database');
-
-      try {
-        switch (event.RequestType) {
-          case 'Create':
-          case 'Update': {
-            console.info('Running database migrations...');
-            await runQueries(db, './sql/init-for-rds/');
-            await runQueries(db, './sql/init-scripts/');
-            await runQueries(db, './sql/migrations/');
-            console.info('Database migrations completed successfully');
-            break;
-          }
-          case 'Delete': {
-            console.info('Delete operation - no action required');
-            break;
-          }
-          default: {
-            console.warn(`Unknown RequestType: ${event.RequestType}`);
-            break;
-          }
-        }
-      } finally {
-        await db.dispose();
-        console.info('Database connection closed');
+    let data = { Message: 'Database migrations completed successfully' };
+    switch (event.RequestType) {
+      case 'Create':
+      case 'Update': {
+        data = summarize(await migrate((event.ResourceProperties || {}).Manifest));
+        break;
+      }
+      case 'Delete': {
+        console.info('Delete operation - no action required');
+        break;
+      }
+      default: {
+        console.warn(`Unknown RequestType: ${event.RequestType}`);
+        break;
       }
-      
-      // Send SUCCESS response to CloudFormation
-      await sendResponse(event, context, 'SUCCESS', {
-        Message: 'Database migrations completed successfully'
-      });
-    } else {
-      console.info('Direct Lambda invocation - not a CloudFormation event');
     }
-    
+
+    // Send SUCCESS response to CloudFormation
+    await sendResponse(event, context, 'SUCCESS', data);
     return { statusCode: 200, body: 'Success' };
   } catch (error) {
     console.error('Lambda execution failed:', error);
-    
-    // Send FAILED response to CloudFormation if this is a CF event
-    if (event.RequestType) {
-      try {
-        await sendResponse(event, context, 'FAILED', {
-          Reason: error.message
-        });
-      } catch (responseError) {
-        console.error('Failed to send error response to CloudFormation:', responseError);
-      }
+
+    // Send FAILED response to CloudFormation
+    try {
+      await sendResponse(event, context, 'FAILED', {
+        Reason: error.message
+      });
+    } catch (responseError) {
+      console.error('Failed to send error response to CloudFormation:', responseError);
     }
-    
+
     throw error;
   }
-};
\ No newline at end of file
+};
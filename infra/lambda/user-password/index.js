@@ -1,3 +1,5 @@
+const https = require('https');
+const url = require('url');
 const { SecretsManagerClient, GetSecretValueCommand, PutSecretValueCommand } = require('@aws-sdk/client-secrets-manager');
 const connect = require('@databases/pg');
 const { sql } = require('@databases/pg');
@@ -29,7 +31,123 @@ const setUserPassword = async (db, username, password) => {
   await db.query(sql`ALTER USER ${raw(username)} WITH PASSWORD ${raw(password)}`);
 };
 
-exports.handler = async (event, _context) => {
+/** Quote a string literal for DDL that doesn't accept parameters */
+const literal = (text) => `'${String(text).replace(/'/g, "''")}'`;
+
+/** Send response to CloudFormation */
+const sendResponse = async (event, context, status, data = {}, physicalResourceId = null) => {
+  const responseBody = JSON.stringify({
+    Status: status,
+    Reason: data.Reason || `See CloudWatch Log Stream: ${context.logStreamName}`,
+    PhysicalResourceId: physicalResourceId || context.logStreamName,
+    StackId: event.StackId,
+    RequestId: event.RequestId,
+    LogicalResourceId: event.LogicalResourceId,
+    Data: data
+  });
+
+  const parsedUrl = url.parse(event.ResponseURL);
+  const options = {
+    hostname: parsedUrl.hostname,
+    port: 443,
+    path: parsedUrl.path,
+    method: 'PUT',
+    headers: {
+      'content-type': '',
+      'content-length': responseBody.length
+    }
+  };
+
+  return new Promise((resolve, reject) => {
+    const request = https.request(options, (response) => {
+      console.log('Response status code:', response.statusCode);
+      resolve();
+    });
+    request.on('error', reject);
+    request.write(responseBody);
+    request.end();
+  });
+};
+
+/**
+ * Set the passwords of several users over one database connection.
+ * On Update only users whose properties changed (new user, other secret or Revision) are touched.
+ */
+const setUserPasswords = async (event) => {
+  const users = event.ResourceProperties.Users || [];
+  const previous = new Map(((event.OldResourceProperties || {}).Users || [])
+    .map((user) => [user.Username, JSON.stringify(user)]));
+  const changed = event.RequestType === 'Update'
+    ? users.filter((user) => previous.get(user.Username) !== JSON.stringify(user))
+    : users;
+  if (changed.length === 0) {
+    console.log('No user changed');
+    return { updated: [], unchanged: users.length };
+  }
+
+  const dbSecret = await getSecret(dbSecretArn);
+  // RDS managed secrets only hold username and password
+  const host = dbSecret.host || process.env.DB_HOST;
+  const port = Number(dbSecret.port || 5432);
+  const dbname = dbSecret.dbname || 'supabase';
+  const passwords = await Promise.all(changed.map(async (user) => (await getSecret(user.SecretId)).password));
+
+  const db = connect({
+    host,
+    port,
+    user: dbSecret.username,
+    password: dbSecret.password,
+    database: dbname,
+    ssl: 'disable',
+    poolSize: 1,
+  });
+  try {
+    await db.task(async (connection) => {
+      for (const [index, user] of changed.entries()) {
+        await connection.query(sql`ALTER USER ${sql.ident(user.Username)} WITH PASSWORD ${raw(literal(passwords[index]))}`);
+        console.log(`Password set for ${user.Username}`);
+      }
+    });
+  } finally {
+    await db.dispose();
+  }
+
+  await Promise.all(changed.map((user, index) => putSecret(user.SecretId, {
+    username: user.Username,
+    password: passwords[index],
+    host,
+    port,
+    dbname,
+    uri: `postgres://${user.Username}:${passwords[index]}@${host}:${port}/${dbname}`,
+  })));
+  return { updated: changed.map((user) => user.Username), unchanged: users.length - changed.length };
+};
+
+/** Batched custom resource (DatabaseMigrations.gen_user_passwords) */
+const handleUsers = async (event, context) => {
+  const physicalResourceId = event.PhysicalResourceId || `users@${process.env.DB_HOST}`;
+  try {
+    if (event.RequestType === 'Delete') {
+      await sendResponse(event, context, 'SUCCESS', {}, physicalResourceId);
+      return;
+    }
+    const { updated, unchanged } = await setUserPasswords(event);
+    await sendResponse(event, context, 'SUCCESS', {
+      Updated: updated.join(','),
+      Unchanged: String(unchanged),
+    }, physicalResourceId);
+  } catch (error) {
+    console.error('Setting user passwords failed:', error);
+    await sendResponse(event, context, 'FAILED', { Reason: error.message }, physicalResourceId);
+    throw error;
+  }
+};
+
+exports.handler = async (event, context) => {
+  if (event.ResourceProperties && event.ResourceProperties.Users) {
+    return handleUsers(event, context);
+  }
+
   /** The name of user to be created or dropped */
   const username = event.ResourceProperties.Username;
   /** The secret of user to be created */
@@ -81,6 +81,14 @@ class InfraStack(TerraformStack):
             vpc_id=network.vpc_id,
             private_subnet_ids=network.private_subnet_ids,
             eks_node_sg_id=eks.node_security_group_id,
+            # Uncomment to pool connections from pods and Lambdas through an RDS Proxy.
+            # It's billed separately, and rds.client_endpoint (used by the Lambdas and
+            # supabase/database below) then moves every service except realtime onto it
+            # enable_proxy=True,
+            # Uncomment for a (separately billed) read replica for PostgREST GETs and
+            # other read-heavy traffic
+            # replica_count=1,
+            # replica_instance_class="db.t3.medium",
         )
 
         # Database migrations Lambda functions
@@ -90,19 +98,28 @@ class InfraStack(TerraformStack):
             vpc_id=network.vpc_id,
             private_subnet_ids=network.private_subnet_ids,
             db_secret_arn=rds.master_user_secret_arn,
-            db_endpoint=rds.db_endpoint,
-            tags=tags
+            db_endpoint=rds.client_endpoint,
+            tags=tags,
+            # Invoke the migration Lambda directly from Terraform (no CloudFormation stack).
+            # The first run on a database without the migration ledger re-runs every SQL file
+            migration_trigger="invoke",
+            # Fail synth on SQL that would lock auth.users or storage.objects for its whole run
+            lock_check="fail",
         )
 
         # Allow Lambda functions to access RDS
         rds.allow_lambda_access(db_migrations.lambda_security_group_id)
 
         # Example: Create database users for Supabase services
-        # Uncomment these lines to create specific users
-        # authenticator_secret = db_migrations.gen_user_password("authenticator")
-        # supabase_auth_admin_secret = db_migrations.gen_user_password("supabase_auth_admin") 
-        # supabase_storage_admin_secret = db_migrations.gen_user_password("supabase_storage_admin")
-        # supabase_read_only_user_secret = db_migrations.gen_user_password("supabase_read_only_user")
+        # Uncomment these lines to create specific users (one custom resource for all of them)
+        # db_user_secrets = db_migrations.gen_user_passwords([
+        #     "authenticator",
+        #     "supabase_auth_admin",
+        #     "supabase_storage_admin",
+        #     "supabase_read_only_user",
+        # ])
+        # With enable_proxy=True, also let these users log in through the proxy:
+        # rds.add_proxy_user_secrets([secret.arn for secret in db_user_secrets.values()])
 
         # S3 bucket for Supabase storage with KMS
         bucket = StorageBucket(self, "storage", bucket_prefix=f"{project}-storage-", use_kms=True, kms_key_arn=kms.s3_key_arn, tags=tags)
@@ -123,14 +140,18 @@ class InfraStack(TerraformStack):
         Secrets(
             self, 
             "secrets", 
-            db_endpoint=rds.db_endpoint,
-            s3_bucket_name=bucket.bucket_name
+            db_endpoint=rds.client_endpoint,
+            s3_bucket_name=bucket.bucket_name,
+            db_direct_endpoint=rds.db_endpoint,
+            db_read_endpoints=rds.reader_endpoints
         )
 
         # Outputs
         TerraformOutput(self, "s3_bucket_name", value=bucket.bucket_name)
         TerraformOutput(self, "s3_bucket_arn", value=bucket.bucket_arn)
         TerraformOutput(self, "db_endpoint", value=rds.db_endpoint)
+        TerraformOutput(self, "db_proxy_endpoint", value=rds.proxy_endpoint)
+        TerraformOutput(self, "db_reader_endpoints", value=rds.reader_endpoints)
         TerraformOutput(self, "db_name", value=rds.db_name)
         TerraformOutput(self, "db_master_user_secret_arn", value=rds.master_user_secret_arn)
         TerraformOutput(self, "cluster_name", value=eks.cluster_name)
@@ -142,6 +163,8 @@ class InfraStack(TerraformStack):
         TerraformOutput(self, "cluster_autoscaler_role_arn", value=iam_roles.cluster_autoscaler.role_arn)
         TerraformOutput(self, "migration_lambda_arn", value=db_migrations.migration_lambda_arn)
         TerraformOutput(self, "user_password_lambda_arn", value=db_migrations.user_password_lambda_arn)
+        TerraformOutput(self, "migration_files_applied", value=db_migrations.migration_files_applied)
+        TerraformOutput(self, "migration_duration_ms", value=db_migrations.migration_duration_ms)
 
 
 app = App()
@@ -1,6 +1,7 @@
 from constructs import Construct
-from cdktf import TerraformAsset, AssetType, TerraformOutput, Token
+from cdktf import TerraformAsset, AssetType, TerraformOutput, TerraformResourceLifecycle, Token, Fn, Annotations
 from cdktf_cdktf_provider_aws.lambda_function import LambdaFunction
+from cdktf_cdktf_provider_aws.lambda_invocation import LambdaInvocation
 from cdktf_cdktf_provider_aws.lambda_permission import LambdaPermission
 from cdktf_cdktf_provider_aws.iam_role import IamRole
 from cdktf_cdktf_provider_aws.iam_role_policy_attachment import IamRolePolicyAttachment
@@ -10,9 +11,12 @@ from cdktf_cdktf_provider_aws.security_group import SecurityGroup
 from cdktf_cdktf_provider_aws.security_group_rule import SecurityGroupRule
 from cdktf_cdktf_provider_aws.secretsmanager_secret import SecretsmanagerSecret
 from cdktf_cdktf_provider_aws.secretsmanager_secret_version import SecretsmanagerSecretVersion
+from cdktf_cdktf_provider_random.password import Password
 import json
 import os
 
+from stacks import sql_analyzer
+
 
 class DatabaseMigrations(Construct):
     """
@@ -20,6 +24,16 @@ class DatabaseMigrations(Construct):
     Based on the original CDK solution but adapted for CDKTF
     """
 
+    # SQL directories in the order the migration Lambda applies them
+    SQL_DIRS = ["init-for-rds", "init-scripts", "migrations"]
+    # Per-file hashes reused across synths while size and mtime are unchanged
+    FINGERPRINT_CACHE = os.path.join(os.path.dirname(__file__), "..", ".sql-fingerprints.json")
+    HASH_CHUNK_SIZE = 1024 * 1024
+    # Large, busy tables where a migration must not block traffic
+    HOT_TABLES = ["auth.users", "storage.objects"]
+    # Files applied before the lock check existed; their locks were reviewed then
+    LOCK_CHECK_BASELINE = ["migrations/20211115181400_update-auth-permissions.sql"]
+
     def __init__(
         self,
         scope: Construct,
@@ -30,8 +44,26 @@ class DatabaseMigrations(Construct):
         db_endpoint: str,
         db_port: int = 5432,
         tags: dict = None,
+        migration_trigger: str = "cloudformation",
+        lock_check: str = "warn",
+        hot_tables: list = None,
+        lock_check_allow: list = None,
     ):
+        """
+        migration_trigger selects how SQL changes reach the database:
+        "cloudformation" - custom resource in a CloudFormation stack (original behaviour)
+        "invoke"         - aws_lambda_invocation keyed on the SQL fingerprint, no CloudFormation hop
+
+        lock_check sets what synth does when a SQL file takes an ACCESS EXCLUSIVE
+        lock on, or rewrites or scans while blocking writes, one of hot_tables:
+        "warn" (annotation), "fail" (synth error) or "off".
+        lock_check_allow lists reviewed files ("migrations/x.sql") to skip.
+        """
         super().__init__(scope, construct_id)
+        if migration_trigger not in ("cloudformation", "invoke"):
+            raise ValueError(f"migration_trigger must be 'cloudformation' or 'invoke', not {migration_trigger!r}")
+        if lock_check not in ("warn", "fail", "off"):
+            raise ValueError(f"lock_check must be 'warn', 'fail' or 'off', not {lock_check!r}")
 
         self.vpc_id = vpc_id
         self.private_subnet_ids = private_subnet_ids
@@ -39,6 +71,10 @@ class DatabaseMigrations(Construct):
         self.db_endpoint = db_endpoint
         self.db_port = db_port
         self.tags = tags or {}
+        self.migration_trigger = migration_trigger
+        self.lock_check = lock_check
+        self.hot_tables = hot_tables if hot_tables is not None else list(self.HOT_TABLES)
+        self.lock_check_allow = lock_check_allow if lock_check_allow is not None else list(self.LOCK_CHECK_BASELINE)
 
         # Create security group for Lambda functions
         self._create_lambda_security_group()
@@ -53,8 +89,12 @@ class DatabaseMigrations(Construct):
         self._create_migration_lambda()
         self._create_user_password_lambda()
         
-        # Create custom resource for database migration
-        self._create_migration_custom_resource()
+        # Trigger database migration when the SQL files change
+        self._prepare_sql_manifest()
+        if migration_trigger == "invoke":
+            self._create_migration_invocation()
+        else:
+            self._create_migration_custom_resource()
 
     def _create_lambda_security_group(self):
         """Create security group for Lambda functions"""
@@ -291,13 +331,58 @@ class DatabaseMigrations(Construct):
             tags=self.tags
         )
 
+    def _prepare_sql_manifest(self):
+        """Fingerprints and per-file manifest of the SQL files bundled with the migration Lambda"""
+        sql_dir = os.path.join(os.path.dirname(__file__), "..", "lambda", "db-migrations", "sql")
+        file_hashes = self._hash_sql_files(sql_dir)
+        self._sql_fingerprint = self._calculate_sql_fingerprint(file_hashes)
+        self._sql_directory_fingerprints = self._calculate_directory_fingerprints(file_hashes)
+        # Per-file checksums: the Lambda applies only files its ledger table doesn't have
+        self._sql_manifest = self._build_sql_manifest(file_hashes)
+        self._check_sql_locks(sql_dir)
+
+    def _check_sql_locks(self, sql_dir: str):
+        """Flag SQL that would block traffic on the hot tables while it runs, or can't run in a transaction"""
+        self._lock_findings = []
+        if self.lock_check == "off":
+            return
+        for entry in self._sql_manifest:
+            path = entry.rsplit(":", 1)[0]
+            with open(os.path.join(sql_dir, path)) as f:
+                self._lock_findings.extend(sql_analyzer.analyze_sql(f.read(), path))
+
+        violations, warnings = sql_analyzer.check(self._lock_findings, self.hot_tables, self.lock_check_allow)
+        for finding in warnings:
+            Annotations.of(self).add_warning(f"Migration locks a hot table: {sql_analyzer.describe(finding)}")
+        if violations and self.lock_check == "fail":
+            raise ValueError(
+                "Migrations would fail to apply or block traffic on hot tables "
+                f"(mark reviewed hot-table statements with '-- {sql_analyzer.ACKNOWLEDGE_MARKER}'):\n"
+                + "\n".join(f"  {sql_analyzer.describe(finding)}" for finding in violations)
+            )
+        for finding in violations:
+            problem = "can't run in a transaction" if finding["fails"] else "blocks a hot table"
+            Annotations.of(self).add_warning(f"Migration {problem}: {sql_analyzer.describe(finding)}")
+
+    def _create_migration_invocation(self):
+        """Invoke the migration Lambda from Terraform whenever the SQL fingerprint changes"""
+        self.migration_invocation = LambdaInvocation(
+            self,
+            "migration_invocation",
+            function_name=self.migration_lambda.function_name,
+            input=json.dumps({
+                "Action": "migrate",
+                "Fingerprint": self._sql_fingerprint,
+                "Manifest": self._sql_manifest
+            }),
+            # Re-invoke only when the SQL changes
+            triggers={"fingerprint": self._sql_fingerprint}
+        )
+        self.migration_trigger_resource = self.migration_invocation
+
     def _create_migration_custom_resource(self):
         """Create CloudFormation custom resource to trigger migrations"""
-        
-        # Calculate fingerprint of SQL files for change detection
-        sql_dir = os.path.join(os.path.dirname(__file__), "..", "lambda", "db-migrations", "sql")
-        fingerprint = self._calculate_sql_fingerprint(sql_dir)
-        
+
         # CloudFormation template for custom resource
         cf_template = {
             "AWSTemplateFormatVersion": "2010-09-09",
@@ -306,7 +391,10 @@ class DatabaseMigrations(Construct):
                     "Type": "AWS::CloudFormation::CustomResource",
                     "Properties": {
                         "ServiceToken": self.migration_lambda.arn,
-                        "Fingerprint": fingerprint
+                        # Only the fingerprint: inline templates are capped at 51,200 bytes, which a
+                        # per-file manifest outgrows at a few hundred files. The Lambda builds the same
+                        # manifest from the SQL tree in its bundle.
+                        "Fingerprint": self._sql_fingerprint
                     }
                 }
             },
@@ -314,6 +402,14 @@ class DatabaseMigrations(Construct):
                 "MigrationStatus": {
                     "Value": {"Ref": "DatabaseMigration"},
                     "Description": "Database migration status"
+                },
+                "Applied": {
+                    "Value": {"Fn::GetAtt": ["DatabaseMigration", "Applied"]},
+                    "Description": "SQL files applied by the last migration run"
+                },
+                "DurationMs": {
+                    "Value": {"Fn::GetAtt": ["DatabaseMigration", "DurationMs"]},
+                    "Description": "Duration of the last migration run"
                 }
             }
         }
@@ -326,6 +422,7 @@ class DatabaseMigrations(Construct):
             capabilities=["CAPABILITY_IAM"],
             tags=self.tags
         )
+        self.migration_trigger_resource = self.migration_stack
 
         # Allow CloudFormation to invoke the Lambda
         LambdaPermission(
@@ -337,24 +434,116 @@ class DatabaseMigrations(Construct):
             principal="cloudformation.amazonaws.com"
         )
 
-    def _calculate_sql_fingerprint(self, sql_dir: str) -> str:
-        """Calculate a fingerprint of SQL files for change detection"""
+    def _hash_sql_files(self, sql_dir: str) -> dict:
+        """SHA-256 of every SQL file, keyed by its path relative to sql_dir.
+
+        Files whose size and mtime match the fingerprint cache aren't read again,
+        so synth stays fast however many migrations there are.
+        """
         import hashlib
-        
-        if not os.path.exists(sql_dir):
-            return "no-sql-files"
-        
-        file_hashes = []
+
+        try:
+            with open(self.FINGERPRINT_CACHE) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        hashes, fresh = {}, {}
         for root, dirs, files in os.walk(sql_dir):
+            dirs.sort()
             for file in sorted(files):
-                if file.endswith('.sql'):
-                    file_path = os.path.join(root, file)
+                if not file.endswith('.sql'):
+                    continue
+                file_path = os.path.join(root, file)
+                relative = os.path.relpath(file_path, sql_dir).replace(os.sep, "/")
+                stat = os.stat(file_path)
+                cached = cache.get(relative)
+                if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                    digest = cached[2]
+                else:
+                    sha = hashlib.sha256()
                     with open(file_path, 'rb') as f:
-                        file_hash = hashlib.md5(f.read()).hexdigest()
-                        file_hashes.append(f"{file}:{file_hash}")
-        
-        combined = "|".join(file_hashes)
-        return hashlib.md5(combined.encode()).hexdigest()
+                        for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                            sha.update(chunk)
+                    digest = sha.hexdigest()
+                hashes[relative] = digest
+                fresh[relative] = [stat.st_size, stat.st_mtime_ns, digest]
+
+        if fresh != cache:
+            try:
+                with open(self.FINGERPRINT_CACHE, 'w') as f:
+                    json.dump(fresh, f, indent=0, sort_keys=True)
+            except OSError:
+                pass  # Read-only checkout: hash everything next time
+        return hashes
+
+    def _build_sql_manifest(self, file_hashes: dict) -> list:
+        """List "dir/file.sql:sha256" entries in the order the Lambda applies them"""
+        manifest = []
+        for directory in self.SQL_DIRS:
+            for path in sorted(file_hashes):
+                if os.path.dirname(path) == directory:
+                    manifest.append(f"{path}:{file_hashes[path]}")
+        return manifest
+
+    def _calculate_sql_fingerprint(self, file_hashes: dict) -> str:
+        """Calculate a fingerprint of SQL files for change detection"""
+        import hashlib
+
+        if not file_hashes:
+            return "no-sql-files"
+        # Relative paths, so same-named files in different directories don't collide
+        combined = "|".join(f"{path}:{digest}" for path, digest in sorted(file_hashes.items()))
+        return hashlib.sha256(combined.encode()).hexdigest()
+
+    def _calculate_directory_fingerprints(self, file_hashes: dict) -> dict:
+        """Fingerprint per top-level SQL directory, e.g. {"migrations": "..."}"""
+        directories = {}
+        for path, digest in file_hashes.items():
+            directory = path.split("/")[0] if "/" in path else "."
+            directories.setdefault(directory, {})[path] = digest
+        return {directory: self._calculate_sql_fingerprint(hashes) for directory, hashes in sorted(directories.items())}
+
+    @property
+    def sql_fingerprint(self) -> str:
+        """Fingerprint of the whole SQL tree (changes trigger the migration custom resource)"""
+        return self._sql_fingerprint
+
+    @property
+    def sql_directory_fingerprints(self) -> dict:
+        """Fingerprint per SQL directory, for resources that depend on one directory only"""
+        return dict(self._sql_directory_fingerprints)
+
+    @property
+    def init_for_rds_fingerprint(self) -> str:
+        return self._sql_directory_fingerprints.get("init-for-rds", "no-sql-files")
+
+    @property
+    def init_scripts_fingerprint(self) -> str:
+        return self._sql_directory_fingerprints.get("init-scripts", "no-sql-files")
+
+    @property
+    def migrations_fingerprint(self) -> str:
+        return self._sql_directory_fingerprints.get("migrations", "no-sql-files")
+
+    @property
+    def sql_lock_findings(self) -> list:
+        """Table locks taken by the SQL files, one dict per statement and table"""
+        return list(self._lock_findings)
+
+    @property
+    def migration_files_applied(self) -> str:
+        """Number of SQL files the last migration run applied"""
+        if self.migration_trigger == "invoke":
+            return Token.as_string(Fn.lookup(Fn.jsondecode(self.migration_invocation.result), "applied", ""))
+        return Token.as_string(Fn.lookup(self.migration_stack.outputs, "Applied", ""))
+
+    @property
+    def migration_duration_ms(self) -> str:
+        """Duration of the last migration run in milliseconds"""
+        if self.migration_trigger == "invoke":
+            return Token.as_string(Fn.lookup(Fn.jsondecode(self.migration_invocation.result), "duration_ms", ""))
+        return Token.as_string(Fn.lookup(self.migration_stack.outputs, "DurationMs", ""))
 
     @property
     def migration_lambda_arn(self) -> str:
@@ -368,27 +557,44 @@ class DatabaseMigrations(Construct):
     def lambda_security_group_id(self) -> str:
         return self.lambda_sg.id
 
+    def _user_secret(self, scope: Construct, id: str, username: str, revision=1):
+        """Secret holding {"username", "password"} with a random password; a new revision generates a new one"""
+        password = Password(
+            scope,
+            f"{id}_password",
+            length=32,
+            special=False,  # The Lambda embeds the password in DDL and connection URIs
+            keepers={"revision": str(revision)}
+        )
+        secret = SecretsmanagerSecret(
+            scope,
+            id,
+            name=f"supabase-db-{username}",
+            description=f"Supabase - Database User {username}",
+            tags={**self.tags, "Username": username}
+        )
+        version = SecretsmanagerSecretVersion(
+            scope,
+            f"{id}_version",
+            secret_id=secret.id,
+            secret_string=Fn.jsonencode({"username": username, "password": password.result}),
+            # The Lambda adds host, port and uri to the secret after setting the password;
+            # a new password (revision bump) still writes a new version
+            lifecycle=TerraformResourceLifecycle(ignore_changes=["secret_string"], replace_triggered_by=[password])
+        )
+        return secret, version
+
     def gen_user_password(self, username: str) -> SecretsmanagerSecret:
         """
         Generate and set password to database user
         Similar to the original CDK implementation
+        (one CloudFormation stack per user; prefer gen_user_passwords for several users)
         """
         # Create a construct scope for the user
         user_construct = Construct(self, f"user_{username}")
         
         # Create user secret with auto-generated password
-        user_secret = SecretsmanagerSecret(
-            user_construct,
-            "secret",
-            name=f"supabase-db-{username}",
-            description=f"Supabase - Database User {username}",
-            generate_secret_string={
-                "exclude_punctuation": True,
-                "secret_string_template": json.dumps({"username": username}),
-                "generate_string_key": "password"
-            },
-            tags={**self.tags, "Username": username}
-        )
+        user_secret, user_secret_version = self._user_secret(user_construct, "secret", username)
         
         # Create CloudFormation custom resource to set user password
         user_password_resource = CloudformationStack(
@@ -416,7 +622,72 @@ class DatabaseMigrations(Construct):
             tags={**self.tags, "Username": username}
         )
         
-        # Ensure user password resource depends on migration completion
-        user_password_resource.add_override("depends_on", [self.migration_stack.name])
+        # Ensure user password resource depends on migration completion and the stored password
+        user_password_resource.add_override("depends_on", [self.migration_trigger_resource.fqn, user_secret_version.fqn])
         
         return user_secret
+
+    def gen_user_passwords(self, usernames: list, revisions: dict = None) -> dict:
+        """
+        Generate and set passwords for several database users at once
+        One secret per user, but a single custom resource and database connection.
+        Bump a user's entry in revisions to set a new password for that user only.
+        Returns {username: SecretsmanagerSecret}
+        """
+        revisions = revisions or {}
+        users_construct = Construct(self, "users")
+
+        user_secrets, secret_versions = {}, []
+        for username in usernames:
+            user_secrets[username], version = self._user_secret(
+                users_construct, f"secret_{username}", username, revisions.get(username, 1)
+            )
+            secret_versions.append(version)
+
+        # The Lambda compares old and new Users on Update and only touches changed entries
+        users_resource = CloudformationStack(
+            users_construct,
+            "passwords_resource",
+            name="supabase-user-passwords",
+            template_body=json.dumps({
+                "AWSTemplateFormatVersion": "2010-09-09",
+                "Resources": {
+                    "UserPasswordsResource": {
+                        "Type": "Custom::DatabaseUserPasswords",
+                        "Properties": {
+                            "ServiceToken": self.user_password_lambda.arn,
+                            "Users": [
+                                {
+                                    "Username": username,
+                                    "SecretId": user_secrets[username].arn,
+                                    "Revision": str(revisions.get(username, 1))
+                                }
+                                for username in usernames
+                            ]
+                        }
+                    }
+                },
+                "Outputs": {
+                    "PhysicalResourceId": {
+                        "Value": {"Ref": "UserPasswordsResource"}
+                    }
+                }
+            }),
+            tags=self.tags
+        )
+
+        # Ensure user passwords are set after migrations created the roles and the passwords are stored
+        users_resource.add_override(
+            "depends_on", [self.migration_trigger_resource.fqn] + [version.fqn for version in secret_versions]
+        )
+
+        LambdaPermission(
+            users_construct,
+            "user_password_lambda_permission",
+            statement_id="AllowCloudFormationInvoke",
+            action="lambda:InvokeFunction",
+            function_name=self.user_password_lambda.function_name,
+            principal="cloudformation.amazonaws.com"
+        )
+
+        return user_secrets
@@ -1,9 +1,19 @@
 from typing import List
 from constructs import Construct
-from cdktf import TerraformModule
+from cdktf import TerraformModule, Fn, Token
 from cdktf_cdktf_provider_aws.security_group import SecurityGroup
 from cdktf_cdktf_provider_aws.vpc_security_group_ingress_rule import VpcSecurityGroupIngressRule
+from cdktf_cdktf_provider_aws.vpc_security_group_egress_rule import VpcSecurityGroupEgressRule
 from cdktf_cdktf_provider_aws.db_parameter_group import DbParameterGroup
+from cdktf_cdktf_provider_aws.db_proxy import DbProxy, DbProxyAuth
+from cdktf_cdktf_provider_aws.db_proxy_default_target_group import (
+    DbProxyDefaultTargetGroup,
+    DbProxyDefaultTargetGroupConnectionPoolConfig,
+)
+from cdktf_cdktf_provider_aws.db_proxy_target import DbProxyTarget
+from cdktf_cdktf_provider_aws.iam_role import IamRole
+from cdktf_cdktf_provider_aws.iam_role_policy import IamRolePolicy
+import json
 
 
 class Rds(Construct):
@@ -15,8 +25,27 @@ class Rds(Construct):
         vpc_id: str,
         private_subnet_ids: List[str],
         eks_node_sg_id: str,
+        enable_proxy: bool = False,
+        proxy_iam_auth: bool = False,
+        proxy_max_connections_percent: int = 90,
+        instance_class: str = "db.t3.medium",
+        replica_count: int = 0,
+        replica_instance_class: str = None,
     ) -> None:
+        """
+        enable_proxy puts an RDS Proxy in front of the instance, so pods and
+        Lambdas share a pool of database connections instead of each opening
+        their own. client_endpoint is the proxy endpoint when it's enabled and
+        the instance address otherwise.
+        proxy_iam_auth makes clients authenticate with IAM tokens instead of
+        the passwords in the registered secrets.
+        replica_count read replicas of replica_instance_class (default: the
+        writer's class) serve reads; reader_endpoints lists their addresses.
+        """
         super().__init__(scope, id)
+        self.db_identifier = db_name
+        self.proxy = None
+        self.replicas = []
 
         # Create security group for RDS
         self.rds_sg = SecurityGroup(
@@ -58,7 +87,7 @@ class Rds(Construct):
         self.rds.add_override("major_engine_version", "14")
         # Use manually created parameter group with pg_tle enabled
         self.rds.add_override("parameter_group_name", "supabase-params-with-tle")
-        self.rds.add_override("instance_class", "db.t3.medium")
+        self.rds.add_override("instance_class", instance_class)
         self.rds.add_override("allocated_storage", 20)
         self.rds.add_override("max_allocated_storage", 100)
         self.rds.add_override("multi_az", True)
@@ -80,7 +109,183 @@ class Rds(Construct):
         self.rds.add_override("storage_encrypted", True)
         self.rds.add_override("tags", {"Project": "supabase-on-eks", "ManagedBy": "cdktf"})
 
+        for index in range(replica_count):
+            self._create_replica(index + 1, replica_instance_class or instance_class)
 
+        if enable_proxy:
+            self._create_proxy(vpc_id, private_subnet_ids, eks_node_sg_id, proxy_iam_auth,
+                               proxy_max_connections_percent)
+
+    def _create_replica(self, number: int, instance_class: str) -> None:
+        """Same-region read replica; it inherits the subnet group, credentials and encryption"""
+        replica = TerraformModule(
+            self,
+            f"rds_replica_{number}",
+            source="terraform-aws-modules/rds/aws",
+        )
+        replica.add_override("identifier", f"{self.db_identifier}-replica-{number}")
+        replica.add_override("replicate_source_db", self.rds.get_string("db_instance_identifier"))
+        replica.add_override("engine", "postgres")
+        replica.add_override("engine_version", "14")
+        replica.add_override("family", "postgres14")
+        replica.add_override("major_engine_version", "14")
+        replica.add_override("parameter_group_name", "supabase-params-with-tle")
+        replica.add_override("instance_class", instance_class)
+        replica.add_override("max_allocated_storage", 100)
+        # The writer is already Multi-AZ; a lost replica is recreated from it
+        replica.add_override("multi_az", False)
+        replica.add_override("manage_master_user_password", False)
+        replica.add_override("create_db_subnet_group", False)
+        replica.add_override("vpc_security_group_ids", [self.rds_sg.id])
+        replica.add_override("deletion_protection", False)
+        replica.add_override("skip_final_snapshot", True)
+        replica.add_override("publicly_accessible", False)
+        replica.add_override("backup_retention_period", 0)
+        replica.add_override("maintenance_window", "Sun:07:00-Sun:08:00")
+        replica.add_override("storage_encrypted", True)
+        replica.add_override("tags", {"Project": "supabase-on-eks", "ManagedBy": "cdktf", "Role": "replica"})
+        self.replicas.append(replica)
+
+    def _create_proxy(
+        self,
+        vpc_id: str,
+        private_subnet_ids: List[str],
+        eks_node_sg_id: str,
+        iam_auth: bool,
+        max_connections_percent: int,
+    ) -> None:
+        """RDS Proxy authenticating with the RDS-managed master secret"""
+        tags = {"Project": "supabase-on-eks", "ManagedBy": "cdktf"}
+
+        self.proxy_sg = SecurityGroup(
+            self,
+            "rds_proxy_security_group",
+            name=f"{self.db_identifier}-rds-proxy-sg",
+            description="Security group for the RDS Proxy",
+            vpc_id=vpc_id,
+            tags={"Name": f"{self.db_identifier}-rds-proxy-sg", "Project": "supabase-on-eks"}
+        )
+
+        # Clients reach the proxy, the proxy reaches the instance
+        VpcSecurityGroupIngressRule(
+            self,
+            "rds_proxy_ingress_from_eks",
+            security_group_id=self.proxy_sg.id,
+            from_port=5432,
+            to_port=5432,
+            ip_protocol="tcp",
+            referenced_security_group_id=eks_node_sg_id,
+            description="Allow PostgreSQL access to the proxy from EKS nodes"
+        )
+        VpcSecurityGroupEgressRule(
+            self,
+            "rds_proxy_egress_to_rds",
+            security_group_id=self.proxy_sg.id,
+            from_port=5432,
+            to_port=5432,
+            ip_protocol="tcp",
+            referenced_security_group_id=self.rds_sg.id,
+            description="Allow the proxy to reach the RDS instance"
+        )
+        VpcSecurityGroupIngressRule(
+            self,
+            "rds_ingress_from_proxy",
+            security_group_id=self.rds_sg.id,
+            from_port=5432,
+            to_port=5432,
+            ip_protocol="tcp",
+            referenced_security_group_id=self.proxy_sg.id,
+            description="Allow PostgreSQL access from the RDS Proxy"
+        )
+
+        # The proxy reads the credentials from Secrets Manager
+        self.proxy_role = IamRole(
+            self,
+            "rds_proxy_role",
+            name=f"{self.db_identifier}-rds-proxy-role",
+            assume_role_policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Action": "sts:AssumeRole",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "rds.amazonaws.com"}
+                    }
+                ]
+            }),
+            tags=tags
+        )
+        self._allow_proxy_secrets("rds_proxy_master_secret_policy", [self.master_user_secret_arn])
+
+        self._proxy_iam_auth = "REQUIRED" if iam_auth else "DISABLED"
+        self._proxy_secret_arns = [self.master_user_secret_arn]
+        self.proxy = DbProxy(
+            self,
+            "rds_proxy",
+            name=f"{self.db_identifier}-proxy",
+            engine_family="POSTGRESQL",
+            role_arn=self.proxy_role.arn,
+            vpc_subnet_ids=Token.as_list(private_subnet_ids),
+            vpc_security_group_ids=[self.proxy_sg.id],
+            # The migration Lambdas connect without TLS; IAM auth needs it
+            require_tls=iam_auth,
+            idle_client_timeout=1800,
+            auth=[self._proxy_auth(arn) for arn in self._proxy_secret_arns],
+            tags=tags
+        )
+
+        target_group = DbProxyDefaultTargetGroup(
+            self,
+            "rds_proxy_target_group",
+            db_proxy_name=self.proxy.name,
+            connection_pool_config=DbProxyDefaultTargetGroupConnectionPoolConfig(
+                # Leave headroom for direct admin connections
+                max_connections_percent=max_connections_percent,
+                max_idle_connections_percent=50,
+                connection_borrow_timeout=120,
+            )
+        )
+
+        self.proxy_target = DbProxyTarget(
+            self,
+            "rds_proxy_target",
+            db_proxy_name=self.proxy.name,
+            target_group_name=target_group.name,
+            db_instance_identifier=self.rds.get_string("db_instance_identifier"),
+        )
+
+    def _proxy_auth(self, secret_arn: str) -> DbProxyAuth:
+        return DbProxyAuth(
+            auth_scheme="SECRETS",
+            secret_arn=secret_arn,
+            iam_auth=self._proxy_iam_auth,
+            client_password_auth_type="POSTGRES_SCRAM_SHA_256",
+        )
+
+    def _allow_proxy_secrets(self, id: str, secret_arns: List[str]) -> None:
+        IamRolePolicy(
+            self,
+            id,
+            name=id,
+            role=self.proxy_role.id,
+            policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Action": ["secretsmanager:GetSecretValue"],
+                        "Resource": secret_arns
+                    },
+                    {
+                        # Secrets encrypted with the default aws/secretsmanager key
+                        "Effect": "Allow",
+                        "Action": ["kms:Decrypt"],
+                        "Resource": "*",
+                        "Condition": {"StringLike": {"kms:ViaService": "secretsmanager.*.amazonaws.com"}}
+                    }
+                ]
+            })
+        )
 
     @property
     def db_endpoint(self) -> str:
@@ -97,7 +302,42 @@ class Rds(Construct):
     @property
     def master_user_secret_arn(self) -> str:
         return self.rds.get_string("db_instance_master_user_secret_arn")
-    
+
+    @property
+    def reader_endpoints(self) -> List[str]:
+        """Addresses of the read replicas (empty without replicas)"""
+        return [replica.get_string("db_instance_address") for replica in self.replicas]
+
+    @property
+    def reader_endpoint(self) -> str:
+        """First replica, or the writer when there are no replicas"""
+        return self.reader_endpoints[0] if self.replicas else self.db_endpoint
+
+    @property
+    def proxy_endpoint(self) -> str:
+        """Proxy endpoint, or a null token when the proxy is disabled"""
+        if not self.proxy:
+            return Token.as_string(Token.null_value())
+        # Referencing the target makes consumers wait until the instance is registered
+        return Token.as_string(Fn.element([self.proxy.endpoint, self.proxy_target.id], 0))
+
+    @property
+    def client_endpoint(self) -> str:
+        """Where clients should connect: the proxy when enabled, else the instance"""
+        return self.proxy_endpoint if self.proxy else self.db_endpoint
+
+    def add_proxy_user_secrets(self, secret_arns: List[str]) -> None:
+        """Let database users other than the master user log in through the proxy.
+
+        Each secret holds {"username": ..., "password": ...}, like the ones
+        DatabaseMigrations.gen_user_passwords creates.
+        """
+        if not self.proxy:
+            return
+        self._allow_proxy_secrets(f"rds_proxy_user_secrets_policy_{len(self._proxy_secret_arns)}", secret_arns)
+        self._proxy_secret_arns.extend(secret_arns)
+        self.proxy.put_auth([self._proxy_auth(arn) for arn in self._proxy_secret_arns])
+
 
     def allow_lambda_access(self, lambda_security_group_id: str) -> None:
         """Allow Lambda functions to access the RDS instance"""
@@ -111,3 +351,14 @@ class Rds(Construct):
             referenced_security_group_id=lambda_security_group_id,
             description="Allow PostgreSQL access from Lambda functions"
         )
+        if self.proxy:
+            VpcSecurityGroupIngressRule(
+                self,
+                "rds_proxy_ingress_from_lambda",
+                security_group_id=self.proxy_sg.id,
+                from_port=5432,
+                to_port=5432,
+                ip_protocol="tcp",
+                referenced_security_group_id=lambda_security_group_id,
+                description="Allow PostgreSQL access to the proxy from Lambda functions"
+            )
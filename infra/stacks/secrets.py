@@ -11,6 +11,8 @@ class Secrets(Construct):
         id: str,
         db_endpoint: str = "",
         s3_bucket_name: str = "",
+        db_direct_endpoint: str = "",
+        db_read_endpoints: list = None,
     ) -> None:
         super().__init__(scope, id)
         
@@ -59,7 +61,9 @@ class Secrets(Construct):
         db_secrets = {
             "username": "supabase",
             "database": "supabase",
-            "host": db_host
+            "host": db_host,
+            # Instance address for clients RDS Proxy can't serve (logical replication, e.g. realtime)
+            "direct_host": db_direct_endpoint or db_host
         }
         ManagedSecret(
             self, 
@@ -68,6 +72,21 @@ class Secrets(Construct):
             secret_string=json.dumps(db_secrets)
         )
 
+        # Read replica hosts for read-heavy services; falls back to the writer without replicas
+        read_hosts = list(db_read_endpoints or []) or [db_host]
+        db_read_secrets = {
+            "username": "supabase",
+            "database": "supabase",
+            "host": read_hosts[0],
+            "hosts": ",".join(read_hosts)
+        }
+        ManagedSecret(
+            self, 
+            "database_read_secret", 
+            name="supabase/database-read", 
+            secret_string=json.dumps(db_read_secrets)
+        )
+
         # Analytics secrets - using Terraform random provider
         analytics_secrets = {
             "logflare_api_key": self.analytics_key.result
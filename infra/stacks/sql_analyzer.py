@@ -0,0 +1,343 @@
+"""
+Static lock-impact analysis of the db-migrations SQL
+
+Classifies each statement by the table lock PostgreSQL takes for it and by
+whether it rewrites or scans the whole table, so DDL that would stall traffic
+on a large table is caught at synth time instead of during a deploy.
+Kept free of cdktf imports so it can be used on its own.
+"""
+
+import re
+
+# Weakest to strongest table lock
+LOCK_LEVELS = [
+    "ACCESS SHARE", "ROW SHARE", "ROW EXCLUSIVE", "SHARE UPDATE EXCLUSIVE",
+    "SHARE", "SHARE ROW EXCLUSIVE", "EXCLUSIVE", "ACCESS EXCLUSIVE",
+]
+# Locks from SHARE up block INSERT/UPDATE/DELETE for as long as they are held
+WRITE_BLOCKING = set(LOCK_LEVELS[LOCK_LEVELS.index("SHARE"):])
+# Put on the statement (or the comment above it) once its impact has been reviewed
+ACKNOWLEDGE_MARKER = "lock-check: ok"
+
+DOLLAR_TAG = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$')
+IDENT = r'(?:"(?:[^"]|"")+"|[A-Za-z_][\w$]*)'
+NAME = rf'{IDENT}(?:\s*\.\s*{IDENT})?'
+# Statements PostgreSQL refuses to run inside a transaction block
+NO_TRANSACTION = re.compile(
+    r'(CREATE\s+(UNIQUE\s+)?INDEX|DROP\s+INDEX|REINDEX\b.*?)\s+CONCURRENTLY\b'
+    r'|ALTER\s+TABLE\b.*\bDETACH\s+PARTITION\b.*\bCONCURRENTLY\b|VACUUM\b', re.I | re.S)
+# Defaults evaluated per row, so ADD COLUMN has to fill every existing row
+VOLATILE_DEFAULT = re.compile(
+    r'\b(gen_random_uuid|uuid_generate_v[14]|random|clock_timestamp|timeofday|nextval|txid_current)\s*\(', re.I)
+
+
+def split_statements(text):
+    """[(line, statement, code)] for the ;-separated statements in text.
+
+    Understands -- and /* */ comments, quoted strings and identifiers, E''
+    escapes and $tag$ dollar quoting, so function bodies stay in one piece.
+    code is the statement without comments and with whitespace collapsed.
+    """
+    statements, comments = [], []
+    start, code_start, has_code, i, n = 0, 0, False, 0, len(text)
+
+    def close(end):
+        pieces, last = [], start
+        for comment_start, comment_end in comments:
+            pieces.append(text[last:comment_start])
+            last = comment_end
+        pieces.append(text[last:end])
+        code = " ".join(" ".join(pieces).split())
+        statements.append((text.count('\n', 0, code_start) + 1, text[start:end].strip(), code))
+
+    while i < n:
+        c = text[i]
+        if text.startswith('--', i):
+            end = text.find('\n', i)
+            comments.append((i, n if end < 0 else end))
+            i = n if end < 0 else end
+            continue
+        if text.startswith('/*', i):
+            comment_start, depth, i = i, 1, i + 2
+            while i < n and depth:
+                if text.startswith('/*', i):
+                    depth, i = depth + 1, i + 2
+                elif text.startswith('*/', i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            comments.append((comment_start, i))
+            continue
+        if c.isspace():
+            i += 1
+            continue
+        if c == ';':
+            if has_code:
+                close(i)
+            start, comments, has_code, i = i + 1, [], False, i + 1
+            continue
+        if not has_code:
+            code_start, has_code = i, True
+        if c == "'":
+            escapes = i > 0 and text[i - 1] in 'eE' and (i < 2 or not (text[i - 2].isalnum() or text[i - 2] == '_'))
+            i += 1
+            while i < n:
+                if escapes and text[i] == '\\':
+                    i += 2
+                elif text[i] == "'":
+                    if text.startswith("''", i):
+                        i += 2
+                    else:
+                        break
+                else:
+                    i += 1
+            i += 1
+        elif c == '"':
+            end = text.find('"', i + 1)
+            i = n if end < 0 else end + 1
+        elif c == '$' and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == '_')) and DOLLAR_TAG.match(text, i):
+            tag = DOLLAR_TAG.match(text, i).group(0)
+            end = text.find(tag, i + len(tag))
+            i = n if end < 0 else end + len(tag)
+        else:
+            i += 1
+    if has_code:
+        close(n)
+    return statements
+
+
+def unquote(identifier):
+    """Quoted identifiers keep their case, unquoted ones fold to lower case"""
+    return identifier[1:-1].replace('""', '"') if identifier.startswith('"') else identifier.lower()
+
+
+def qualified_name(raw, schema):
+    """"schema.table" for a possibly unqualified, possibly quoted name"""
+    parts = [unquote(part) for part in re.findall(IDENT, raw)]
+    return ".".join(parts) if len(parts) > 1 else f"{schema}.{parts[0]}"
+
+
+def split_actions(code):
+    """Top-level comma-separated ALTER TABLE actions"""
+    actions, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(code):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in "'\"":
+            quote = c
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            actions.append(code[start:i].strip())
+            start = i + 1
+    actions.append(code[start:].strip())
+    return [action for action in actions if action]
+
+
+def _operation(operation, lock, rewrite=False, scan=False, note=""):
+    return {"operation": operation, "lock": lock, "rewrite": rewrite, "scan": scan, "note": note}
+
+
+def classify_action(action):
+    """Lock and table impact of one ALTER TABLE action (PostgreSQL 15 rules)"""
+    upper = action.upper()
+    not_valid = "NOT VALID" in upper
+    if re.match(r'ADD\s+(CONSTRAINT\s+\S+\s+)?FOREIGN\s+KEY', upper):
+        return _operation("add foreign key", "SHARE ROW EXCLUSIVE", scan=not not_valid,
+                          note="" if not_valid else "add it NOT VALID, then VALIDATE CONSTRAINT")
+    if re.match(r'ADD\s+(CONSTRAINT\s+\S+\s+)?CHECK\b', upper):
+        return _operation("add check constraint", "ACCESS EXCLUSIVE", scan=not not_valid,
+                          note="" if not_valid else "add it NOT VALID, then VALIDATE CONSTRAINT")
+    if re.match(r'ADD\s+(CONSTRAINT\s+\S+\s+)?(PRIMARY\s+KEY|UNIQUE|EXCLUDE)\b', upper):
+        using_index = "USING INDEX" in upper
+        return _operation("add unique constraint", "ACCESS EXCLUSIVE", scan=not using_index,
+                          note="" if using_index else "build the index CONCURRENTLY, then ADD ... USING INDEX")
+    if upper.startswith("ADD"):
+        rewrite = bool(VOLATILE_DEFAULT.search(action)) or bool(re.search(r'\b(BIG|SMALL)?SERIAL\b', upper)) \
+            or bool(re.search(r'GENERATED\s+ALWAYS\s+AS\s*\(.*\)\s*STORED', upper))
+        note = "volatile default fills every row" if rewrite else ""
+        if not rewrite and "NOT NULL" in upper and "DEFAULT" not in upper:
+            note = "NOT NULL without a default fails on a non-empty table"
+        return _operation("add column", "ACCESS EXCLUSIVE", rewrite=rewrite, note=note)
+    if re.match(r'ALTER\s+(COLUMN\s+)?\S+\s+(SET\s+DATA\s+)?TYPE\b', upper):
+        return _operation("alter column type", "ACCESS EXCLUSIVE", rewrite=True,
+                          note="rewrites the table unless the new type is binary compatible")
+    if re.match(r'ALTER\s+(COLUMN\s+)?\S+\s+SET\s+NOT\s+NULL', upper):
+        return _operation("set not null", "ACCESS EXCLUSIVE", scan=True,
+                          note="add a NOT VALID CHECK (col IS NOT NULL) and validate it first")
+    if re.match(r'ALTER\s+(COLUMN\s+)?\S+\s+(SET\s+STATISTICS|SET\s*\(|RESET\s*\()', upper):
+        return _operation("set column options", "SHARE UPDATE EXCLUSIVE")
+    if re.match(r'VALIDATE\s+CONSTRAINT', upper):
+        return _operation("validate constraint", "SHARE UPDATE EXCLUSIVE", scan=True)
+    if re.match(r'SET\s+(LOGGED|UNLOGGED|TABLESPACE|ACCESS\s+METHOD)\b', upper):
+        return _operation(" ".join(upper.split()[:2]).lower(), "ACCESS EXCLUSIVE", rewrite=True)
+    if re.match(r'(SET|RESET)\s*\(', upper) or re.match(r'(CLUSTER\s+ON|SET\s+WITHOUT\s+CLUSTER)\b', upper):
+        return _operation("set storage options", "SHARE UPDATE EXCLUSIVE")
+    if re.match(r'(ENABLE|DISABLE)\s+((ALWAYS|REPLICA)\s+)?TRIGGER\b', upper):
+        return _operation("enable/disable trigger", "SHARE ROW EXCLUSIVE")
+    if re.match(r'ATTACH\s+PARTITION', upper):
+        return _operation("attach partition", "SHARE UPDATE EXCLUSIVE", scan=True)
+    if re.match(r'DETACH\s+PARTITION\s+.*\bCONCURRENTLY\b', upper):
+        return _operation("detach partition", "SHARE UPDATE EXCLUSIVE")
+    words = upper.split()
+    return _operation(" ".join(words[:2]).lower() if words else "alter table", "ACCESS EXCLUSIVE")
+
+
+def classify_statement(code, schema="public"):
+    """[(table or None, operation)] for the table-level locks code takes"""
+    upper = code.upper()
+    match = re.match(rf'ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({NAME})\s*\*?\s*(.*)$', code, re.I | re.S)
+    if match and not upper.startswith("ALTER TABLE ALL IN"):
+        table = qualified_name(match.group(1), schema)
+        actions = match.group(2)
+        if re.match(r'RENAME\b|SET\s+SCHEMA\b', actions, re.I):
+            return [(table, _operation(" ".join(actions.split()[:2]).lower(), "ACCESS EXCLUSIVE"))]
+        return [(table, classify_action(action)) for action in split_actions(actions)]
+
+    match = re.match(rf'CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?'
+                     rf'(?:{IDENT}\s+)?ON\s+(?:ONLY\s+)?({NAME})', code, re.I)
+    if match:
+        table = qualified_name(match.group(3), schema)
+        if match.group(2):
+            return [(table, _operation("create index concurrently", "SHARE UPDATE EXCLUSIVE", scan=True))]
+        return [(table, _operation("create index", "SHARE", scan=True, note="use CREATE INDEX CONCURRENTLY"))]
+
+    if re.match(r'DROP\s+INDEX\s+(?!CONCURRENTLY)', code, re.I):
+        return [(None, _operation("drop index", "ACCESS EXCLUSIVE", note="use DROP INDEX CONCURRENTLY"))]
+
+    match = re.match(rf'REINDEX\s+(?:\([^)]*\)\s*)?(TABLE|INDEX)\s+(CONCURRENTLY\s+)?({NAME})', code, re.I)
+    if match and not match.group(2):
+        table = qualified_name(match.group(3), schema) if match.group(1).upper() == "TABLE" else None
+        return [(table, _operation("reindex", "SHARE", scan=True, note="use REINDEX ... CONCURRENTLY"))]
+
+    match = re.match(r'(TRUNCATE|DROP\s+TABLE)\s+(?:TABLE\s+)?(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?(.*?)(?:\s+(?:CASCADE|RESTRICT|'
+                     r'RESTART\s+IDENTITY|CONTINUE\s+IDENTITY))*$', code, re.I | re.S)
+    if match:
+        operation = " ".join(match.group(1).lower().split())
+        return [(qualified_name(name, schema), _operation(operation, "ACCESS EXCLUSIVE"))
+                for name in re.findall(NAME, match.group(2))]
+
+    match = re.match(rf'LOCK\s+(?:TABLE\s+)?(?:ONLY\s+)?({NAME})(?:\s+IN\s+(.+?)\s+MODE)?', code, re.I)
+    if match:
+        lock = " ".join(match.group(2).upper().split()) if match.group(2) else "ACCESS EXCLUSIVE"
+        return [(qualified_name(match.group(1), schema), _operation("lock table", lock))]
+
+    match = re.match(rf'VACUUM\s+(\([^)]*\)|(?:(?:FULL|FREEZE|VERBOSE|ANALYZE)\s+)+)({NAME})', code, re.I)
+    if match and re.search(r'\bFULL\b', match.group(1), re.I):
+        return [(qualified_name(match.group(2), schema), _operation("vacuum full", "ACCESS EXCLUSIVE", rewrite=True))]
+
+    match = re.match(rf'CLUSTER\s+(?:VERBOSE\s+)?({NAME})', code, re.I)
+    if match:
+        return [(qualified_name(match.group(1), schema), _operation("cluster", "ACCESS EXCLUSIVE", rewrite=True))]
+
+    match = re.match(rf'CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+.*?\s+ON\s+({NAME})', code, re.I | re.S)
+    if match:
+        return [(qualified_name(match.group(1), schema), _operation("create trigger", "SHARE ROW EXCLUSIVE"))]
+
+    match = re.match(rf'(DROP\s+TRIGGER|(?:CREATE|ALTER|DROP)\s+POLICY)\s+(?:IF\s+EXISTS\s+)?{IDENT}\s+ON\s+({NAME})',
+                     code, re.I)
+    if match:
+        operation = " ".join(match.group(1).lower().split())
+        return [(qualified_name(match.group(2), schema), _operation(operation, "ACCESS EXCLUSIVE"))]
+
+    match = re.match(rf'REFRESH\s+MATERIALIZED\s+VIEW\s+(CONCURRENTLY\s+)?({NAME})', code, re.I)
+    if match:
+        lock = "EXCLUSIVE" if match.group(1) else "ACCESS EXCLUSIVE"
+        return [(qualified_name(match.group(2), schema), _operation("refresh materialized view", lock, scan=True))]
+
+    match = re.match(rf'(UPDATE|DELETE\s+FROM)\s+(?:ONLY\s+)?({NAME})(.*)$', code, re.I | re.S)
+    if match and not re.search(r'\bWHERE\b', match.group(3), re.I):
+        return [(qualified_name(match.group(2), schema),
+                 _operation(f"{match.group(1).split()[0].lower()} without where", "ROW EXCLUSIVE", scan=True,
+                            note="writes every row in one transaction; backfill in batches"))]
+    return []
+
+
+def analyze_sql(text, path=""):
+    """Findings for one SQL file.
+
+    Tables created by a plain CREATE TABLE earlier in the same file are new and
+    empty, so statements against them are skipped.
+    """
+    findings, created, schema = [], set(), "public"
+    statements = split_statements(text)
+    # The Lambda sends a file as one query, which runs in an implicit transaction
+    single_statement = len(statements) == 1
+    for line, statement, code in statements:
+        match = re.match(r'SET\s+(?:LOCAL\s+|SESSION\s+)?search_path\s*(?:TO|=)\s*(.+)$', code, re.I)
+        if match:
+            schemas = [unquote(s) for s in re.findall(IDENT, match.group(1)) if s not in ('"$user"', 'DEFAULT', 'default')]
+            schema = schemas[0] if schemas else schema
+            continue
+        match = re.match(rf'CREATE\s+(?:(?:GLOBAL\s+|LOCAL\s+)?(?:TEMP|TEMPORARY)\s+|UNLOGGED\s+)?TABLE\s+({NAME})',
+                         code, re.I)
+        if match:
+            # Not IF NOT EXISTS: that table may already exist and hold data
+            created.add(qualified_name(match.group(1), schema))
+            continue
+        classified = classify_statement(code, schema)
+        fails = not single_statement and bool(NO_TRANSACTION.match(code))
+        if fails:
+            # Certain to fail at deploy, whatever the table: report it once even if nothing else was classified
+            table, operation = classified[0] if classified else \
+                (None, _operation(" ".join(code.split()[:3]).lower(), "SHARE UPDATE EXCLUSIVE"))
+            operation["note"] = "can't run inside the file's implicit transaction; give it a file of its own"
+            classified = [(table, operation)]
+        for table, operation in classified:
+            if table in created and not fails:
+                continue
+            findings.append({
+                "file": path,
+                "line": line,
+                "table": table,
+                **operation,
+                "fails": fails,
+                "acknowledged": ACKNOWLEDGE_MARKER in statement.lower(),
+                "statement": code if len(code) <= 120 else code[:117] + "...",
+            })
+    return findings
+
+
+def blocks_traffic(finding):
+    """ACCESS EXCLUSIVE, a rewrite, or a full scan while writes are blocked"""
+    return finding["lock"] == "ACCESS EXCLUSIVE" or finding["rewrite"] or \
+        (finding["scan"] and finding["lock"] in WRITE_BLOCKING)
+
+
+def check(findings, hot_tables, allow=()):
+    """(violations, warnings) for the findings on hot_tables.
+
+    Violations block traffic on a hot table or can't run in the file's
+    transaction at all (on any table, acknowledged or not); warnings touch a
+    hot table with a lesser lock or scan. Files in allow are left out.
+    """
+    hot = {name.lower() for name in hot_tables}
+    violations, warnings = [], []
+    for finding in findings:
+        if finding["file"] in allow:
+            continue
+        if finding["fails"]:
+            violations.append(finding)
+            continue
+        if finding["acknowledged"] or (finding["table"] or "").lower() not in hot:
+            continue
+        if blocks_traffic(finding):
+            violations.append(finding)
+        elif finding["scan"] or finding["lock"] in WRITE_BLOCKING:
+            warnings.append(finding)
+    return violations, warnings
+
+
+def describe(finding):
+    """One-line summary, e.g. "migrations/x.sql:12 create index on auth.users (SHARE, full scan)" """
+    impact = [finding["lock"]]
+    if finding["rewrite"]:
+        impact.append("table rewrite")
+    elif finding["scan"]:
+        impact.append("full scan")
+    target = f" on {finding['table']}" if finding["table"] else ""
+    text = f"{finding['file']}:{finding['line']} {finding['operation']}{target} ({', '.join(impact)})"
+    return f"{text}: {finding['note']}" if finding["note"] else text
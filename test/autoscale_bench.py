@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Autoscaling Reaction-Time Benchmark
+- Open-loop load: --rate for --baseline seconds, a step to --peak-rate for
+  --hold seconds, then an optional --cooldown back at --rate
+- Polls the Kubernetes API (kubectl proxy, a bearer token, or the stand-in's
+  fake cluster) for deployment replicas, HPA decisions, pending pods and nodes
+- Reports, per deployment, the time from the load step to the HPA scaling out,
+  to the first new pod Ready and to all new pods Ready, and when new nodes
+  were created and joined Ready
+- Splits request latency into baseline / scaling / scaled phases to show the
+  penalty paid while scale-out is in progress
+
+Usage:
+    kubectl proxy &    # Kubernetes API on http://127.0.0.1:8001
+    python autoscale_bench.py --scenarios postgrest_read --rate 20 --peak-rate 400 --baseline 60 --hold 600
+    python autoscale_bench.py --workload workloads/peak.yaml --api https://<endpoint> --token "$KUBE_TOKEN" --insecure
+
+    # Offline, against the stand-in's simulated HPAs / cluster-autoscaler
+    python standin.py --fake-k8s --pod-start-s 5 --node-start-s 20 --hpa-sync-s 5 &
+    python autoscale_bench.py --api http://127.0.0.1:54321 --rate 20 --peak-rate 300 --baseline 10 --hold 90
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+
+import profiles
+import results
+import runner
+import scenarios
+import workload
+from harness import Config, HarnessClient
+from stats import EndpointStats, RunStats
+
+
+class KubeApi:
+    """Read-only Kubernetes API client for the objects that show scale-out"""
+
+    def __init__(self, url, token=None, namespace='supabase', release='supabase', insecure=False, timeout=10):
+        self.url = url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self.namespace = namespace
+        self.selector = f"app.kubernetes.io/instance={release}"
+        self.prefix = f"{release}-"
+        self.insecure = insecure
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(ssl=False if self.insecure else None),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def items(self, path, **params):
+        async with self.session.get(f"{self.url}{path}", params=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"GET {path}: HTTP {response.status} {(await response.text())[:200]}")
+            return (await response.json()).get('items', [])
+
+    def short(self, name):
+        """supabase-supabase-rest -> rest"""
+        while name.startswith(self.prefix):
+            name = name[len(self.prefix):]
+        return name
+
+    async def snapshot(self):
+        """{'deployments': {name: {desired, ready}}, 'hpas': {name: {desired, cpu}}, 'nodes': {name: ready}, 'pending': n}"""
+        namespace = self.namespace
+        deployments, hpas, nodes, pending = await asyncio.gather(
+            self.items(f"/apis/apps/v1/namespaces/{namespace}/deployments", labelSelector=self.selector),
+            self.items(f"/apis/autoscaling/v2/namespaces/{namespace}/horizontalpodautoscalers"),
+            self.items("/api/v1/nodes"),
+            self.items(f"/api/v1/namespaces/{namespace}/pods", labelSelector=self.selector,
+                       fieldSelector="status.phase=Pending"),
+        )
+        snapshot = {"deployments": {}, "hpas": {}, "nodes": {}, "pending": len(pending)}
+        for item in deployments:
+            snapshot["deployments"][self.short(item['metadata']['name'])] = {
+                "desired": (item.get('spec') or {}).get('replicas', 0),
+                "ready": (item.get('status') or {}).get('readyReplicas') or 0,
+            }
+        for item in hpas:
+            status = item.get('status') or {}
+            cpu = None
+            for metric in status.get('currentMetrics') or []:
+                resource = metric.get('resource') or {}
+                if resource.get('name') == 'cpu':
+                    cpu = (resource.get('current') or {}).get('averageUtilization')
+            target = item['spec']['scaleTargetRef']['name']
+            snapshot["hpas"][self.short(target)] = {"desired": status.get('desiredReplicas'), "cpu": cpu}
+        for item in nodes:
+            conditions = (item.get('status') or {}).get('conditions') or []
+            snapshot["nodes"][item['metadata']['name']] = any(
+                c.get('type') == 'Ready' and c.get('status') == 'True' for c in conditions)
+        return snapshot
+
+
+async def poll(api, interval, started, polls, errors):
+    """Append (seconds since the load started, snapshot) every interval until cancelled"""
+    while True:
+        try:
+            polls.append((time.perf_counter() - started, await api.snapshot()))
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        await asyncio.sleep(interval)
+
+
+def first(polls, after, condition):
+    """Time of the first poll at or after `after` where condition(snapshot) holds, else None"""
+    for t, snapshot in polls:
+        if t >= after and condition(snapshot):
+            return t
+    return None
+
+
+def at(polls, t):
+    """Last snapshot taken at or before t (or the first one)"""
+    chosen = polls[0][1]
+    for when, snapshot in polls:
+        if when > t:
+            break
+        chosen = snapshot
+    return chosen
+
+
+def reaction(polls, step_at, hold_end):
+    """Scale-out timings relative to the load step; returns (deployments, nodes, scaled_at)"""
+    before = at(polls, step_at)
+    during = [(t, s) for t, s in polls if step_at <= t <= hold_end]
+    deployments = {}
+    for name, start in before['deployments'].items():
+        peak_desired = max([s['deployments'].get(name, start)['desired'] for _, s in during] or [start['desired']])
+        row = {"before": start['ready'], "desired": peak_desired,
+               "peak_ready": max([s['deployments'].get(name, start)['ready'] for _, s in during] or [start['ready']])}
+        scaled = first(polls, step_at, lambda s: s['deployments'].get(name, start)['desired'] > start['desired'])
+        row['hpa'] = scaled
+        row['first_ready'] = first(polls, step_at, lambda s: s['deployments'].get(name, start)['ready'] > start['ready'])
+        row['all_ready'] = first(polls, step_at, lambda s: s['deployments'].get(name, start)['ready'] >= peak_desired) \
+            if scaled is not None else None
+        deployments[name] = row
+
+    nodes = {"before": sum(before['nodes'].values()), "new": {}}
+    for t, snapshot in polls:
+        if t < step_at:
+            continue
+        for name, ready in snapshot['nodes'].items():
+            if name in before['nodes']:
+                continue
+            node = nodes['new'].setdefault(name, {"seen": t, "ready": None})
+            if ready and node['ready'] is None:
+                node['ready'] = t
+    nodes['peak_pending'] = max([s['pending'] for _, s in during] or [0])
+
+    # Scale-out is over once every scaled deployment is fully Ready and every new node joined
+    finished = [row['all_ready'] for row in deployments.values() if row['hpa'] is not None]
+    finished += [node['ready'] for node in nodes['new'].values()]
+    scaled_at = None
+    if finished and None not in finished:
+        scaled_at = max(finished)
+    elif finished:
+        scaled_at = hold_end
+    return deployments, nodes, scaled_at
+
+
+def phase_of(start, step_at, scaled_at, hold_end):
+    if start < step_at:
+        return 'baseline'
+    if start >= hold_end:
+        return 'cooldown'
+    if scaled_at is not None and start < scaled_at:
+        return 'scaling'
+    return 'scaled'
+
+
+def phases(stages, profile, scaled_at):
+    """Merge the fixed windows into baseline / scaling / scaled / cooldown RunStats"""
+    hold_end = profile.step_at + profile.hold
+    merged = {}
+    for label, (_, stats) in stages.items():
+        name = phase_of(float(label), profile.step_at, scaled_at, hold_end)
+        merged.setdefault(name, RunStats()).merge(stats)
+    return {name: merged[name] for name in ('baseline', 'scaling', 'scaled', 'cooldown') if name in merged}
+
+
+def seconds(value, step_at):
+    return f"+{value - step_at:.1f}s" if value is not None else "-"
+
+
+def print_report(args, profile, polls, stages, deployments, nodes, scaled_at, series):
+    step_at = profile.step_at
+    print("\n" + "=" * 100)
+    print(f"📊 AUTOSCALING REACTION (load step {args.rate:g} → {args.peak_rate:g} req/s at {step_at:g}s)")
+    print("=" * 100)
+    print(f"{'Deployment':<22} {'ready before':>12} {'desired':>8} {'peak ready':>10} "
+          f"{'HPA scaled':>11} {'first Ready':>12} {'all Ready':>10}")
+    print("-" * 100)
+    for name, row in sorted(deployments.items(), key=lambda item: (item[1]['hpa'] is None, item[0])):
+        print(f"{name[:22]:<22} {row['before']:>12} {row['desired']:>8} {row['peak_ready']:>10} "
+              f"{seconds(row['hpa'], step_at):>11} {seconds(row['first_ready'], step_at):>12} "
+              f"{seconds(row['all_ready'], step_at):>10}")
+    print("-" * 100)
+    print(f"🖥️  Nodes Ready before the step: {nodes['before']}   new nodes: {len(nodes['new'])}   "
+          f"peak pending pods: {nodes['peak_pending']}")
+    for name, node in sorted(nodes['new'].items(), key=lambda item: item[1]['seen']):
+        print(f"   {name:<40} created {seconds(node['seen'], step_at):>9}   Ready {seconds(node['ready'], step_at):>9}")
+    if scaled_at is None:
+        print("💤 Nothing scaled out - raise --peak-rate or --hold")
+    elif scaled_at >= step_at + profile.hold and not all(
+            row['all_ready'] for row in deployments.values() if row['hpa'] is not None):
+        print("⚠️  Scale-out hadn't finished when the load step ended")
+    else:
+        print(f"✅ Scale-out finished {seconds(scaled_at, step_at)} after the load step")
+
+    print(f"\n{'Window':<8} {'target':>7} {'achieved':>9} {'err%':>6} {'p50 ms':>8} {'p99 ms':>8}  "
+          f"{'pending':>7} {'nodes':>5}  ready replicas")
+    print("-" * 100)
+    scaling = [name for name, row in sorted(deployments.items()) if row['hpa'] is not None]
+    windows = sorted(stages.items(), key=lambda item: float(item[0]))
+    for index, (label, (rate, stats)) in enumerate(windows):
+        start = float(label)
+        end = float(windows[index + 1][0]) if index + 1 < len(windows) else profile.duration
+        merged = EndpointStats()
+        for endpoint in stats.endpoints.values():
+            merged.merge(endpoint)
+        snapshot = at(polls, end)
+        replicas = " ".join(f"{name}={snapshot['deployments'].get(name, {}).get('ready', '?')}" for name in scaling)
+        print(f"{start:>7g}s {rate:>7.0f} {merged.requests / max(end - start, 1e-9):>9.1f} {merged.error_rate * 100:>5.1f}% "
+              f"{merged.latency.percentile(50) / 1000:>8.1f} {merged.latency.percentile(99) / 1000:>8.1f}  "
+              f"{snapshot['pending']:>7} {sum(snapshot['nodes'].values()):>5}  {replicas}")
+
+    print(f"\n{'Phase':<10} {'reqs':>8} {'err%':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'p99 vs baseline':>16}")
+    print("-" * 70)
+    baseline_p99 = None
+    for name, stats in series.items():
+        merged = EndpointStats()
+        for endpoint in stats.endpoints.values():
+            merged.merge(endpoint)
+        p99 = merged.latency.percentile(99)
+        baseline_p99 = p99 if name == 'baseline' else baseline_p99
+        versus = f"{results.change(baseline_p99, p99):+.0f}%" if baseline_p99 and name != 'baseline' else '-'
+        print(f"{name:<10} {merged.requests:>8} {merged.error_rate * 100:>6.2f}% "
+              f"{merged.latency.percentile(50) / 1000:>8.1f} {p99 / 1000:>8.1f} {merged.latency.max / 1000:>8.1f} "
+              f"{versus:>16}")
+    print("💡 scaling = from the load step until every scaled deployment and new node was Ready")
+
+
+async def run(args, profile):
+    config = Config()
+    config.validate()
+    steps = workload.resolve(args, 'open')
+    stages, polls, errors = {}, [], []
+    async with KubeApi(args.api, token=args.token, namespace=args.namespace, release=args.release,
+                       insecure=args.insecure) as api:
+        try:
+            await api.snapshot()
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            raise SystemExit(f"❌ Kubernetes API at {args.api} not usable ({type(e).__name__}: {e})\n"
+                             f"💡 Run `kubectl proxy`, or pass --api/--token (or --api <stand-in URL> with --fake-k8s)")
+        async with HarnessClient(config, pool_size=args.pool_size, timeout=args.timeout) as client:
+            if not args.skip_setup:
+                await scenarios.setup(client)
+            started = time.perf_counter()
+            poller = asyncio.create_task(poll(api, args.poll_interval, started, polls, errors))
+            try:
+                sent, peak = await runner.open_loop(client, steps, profile, args.max_in_flight, stages)
+                # Keep watching nodes that are still joining after the load stopped
+                await asyncio.sleep(args.settle)
+            finally:
+                poller.cancel()
+    for _, stats in stages.values():
+        stats.finish()
+    return stages, polls, errors, sent, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HPA / cluster-autoscaler reaction-time benchmark")
+    parser.add_argument('--scenarios', default='postgrest_read',
+                        help="Comma separated scenarios or groups (%s)" % ', '.join(scenarios.GROUPS))
+    parser.add_argument('--workload', default=None, help="Workload file whose mix replaces --scenarios")
+    parser.add_argument('--rate', type=float, default=20, help="Baseline and cooldown rate in req/s")
+    parser.add_argument('--peak-rate', type=float, default=300, help="Rate after the load step")
+    parser.add_argument('--baseline', type=float, default=60, help="Seconds at --rate before the step")
+    parser.add_argument('--hold', type=float, default=600, help="Seconds at --peak-rate")
+    parser.add_argument('--cooldown', type=float, default=0, help="Seconds back at --rate after the step")
+    parser.add_argument('--window', type=float, default=5, help="Latency window in seconds")
+    parser.add_argument('--settle', type=float, default=0, help="Seconds to keep polling after the load stops")
+    parser.add_argument('--poll-interval', type=float, default=2, help="Seconds between Kubernetes API polls")
+    parser.add_argument('--api', default=os.getenv('KUBE_API', 'http://127.0.0.1:8001'),
+                        help="Kubernetes API URL (default: kubectl proxy)")
+    parser.add_argument('--token', default=os.getenv('KUBE_TOKEN'), help="Bearer token for --api")
+    parser.add_argument('--insecure', action='store_true', help="Don't verify the API server certificate")
+    parser.add_argument('--namespace', default='supabase')
+    parser.add_argument('--release', default='supabase', help="Helm release (app.kubernetes.io/instance)")
+    parser.add_argument('--max-in-flight', type=int, default=2000,
+                        help="Cap on concurrent requests; queued requests keep their scheduled start")
+    parser.add_argument('--pool-size', type=int, default=200, help="Max pooled keep-alive connections")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't create test_items / test-bucket")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    profile = profiles.WindowedStep(args.rate, args.peak_rate, args.baseline, args.hold,
+                                    cooldown=args.cooldown, window=args.window)
+    print("🚀 Starting autoscaling reaction benchmark")
+    print(f"URL: {Config().url}   Kubernetes API: {args.api}   namespace: {args.namespace}")
+    print(f"Load: {args.rate:g} req/s for {args.baseline:g}s → {args.peak_rate:g} req/s for {args.hold:g}s"
+          + (f" → {args.rate:g} req/s for {args.cooldown:g}s" if args.cooldown else "")
+          + f"   Scenarios: {args.workload or args.scenarios}")
+    print("-" * 50)
+
+    stages, polls, errors, sent, peak = asyncio.run(run(args, profile))
+    if errors:
+        print(f"⚠️  {len(errors)} Kubernetes API polls failed, e.g. {errors[0]}")
+    if not polls:
+        raise SystemExit("❌ No successful Kubernetes API polls")
+
+    hold_end = profile.step_at + profile.hold
+    deployments, nodes, scaled_at = reaction(polls, profile.step_at, hold_end)
+    series = phases(stages, profile, scaled_at)
+    print_report(args, profile, polls, stages, deployments, nodes, scaled_at, series)
+    print(f"\n📨 Scheduled: {sent}   🔝 Peak in flight: {peak['in_flight']}   "
+          f"🐢 Sends >10ms behind schedule: {peak['late']}")
+    results.save('autoscale-bench', args, series, url=Config().url, extra={
+        "step_at": profile.step_at, "scaled_at": scaled_at, "deployments": deployments, "nodes": nodes,
+        "polls": [{"t": t, **snapshot} for t, snapshot in polls], "sent": sent, "peak": peak,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Multi-process load runner
+- Starts N worker processes, each with its own event loop and connection pool
+- Splits concurrency / arrival rate / step budget evenly across workers
+- Workers stream cumulative RunStats snapshots while running and their
+  final results at the end; the parent merges them into one report
+"""
+
+import asyncio
+import copy
+import multiprocessing
+import queue as queue_module
+import time
+
+import runner
+import scenarios
+from harness import Config, HarnessClient
+from stats import RunStats
+
+# Open-loop arguments that are rates and get divided across workers
+RATE_ARGUMENTS = ('rate', 'step_rate', 'to_rate', 'peak_rate')
+
+
+def share(total, parts, index):
+    """index-th of parts near-equal integer shares of total"""
+    return total // parts + (1 if index < total % parts else 0)
+
+
+def worker_arguments(mode, args, index, processes):
+    """Copy of the CLI arguments with this worker's share of the load"""
+    worker_args = copy.copy(args)
+    worker_args.skip_setup = True
+    if mode == 'closed':
+        worker_args.concurrency = max(1, share(args.concurrency, processes, index))
+        if args.requests:
+            worker_args.requests = share(args.requests, processes, index)
+    else:
+        for name in RATE_ARGUMENTS:
+            setattr(worker_args, name, getattr(args, name) / processes)
+        worker_args.max_in_flight = max(1, share(args.max_in_flight, processes, index))
+    return worker_args
+
+
+def _worker(mode, args, index, results):
+    """Process entry point: run one share of the load and report back"""
+    try:
+        result = asyncio.run(runner.MODES[mode](args, lambda snapshot: results.put(('interim', index, snapshot))))
+        results.put(('final', index, result))
+    except BaseException as e:
+        results.put(('failed', index, f"{type(e).__name__}: {e}"))
+
+
+def merge_results(mode, results):
+    """Combine per-worker results into what a single process run would return"""
+    if mode == 'closed':
+        merged = RunStats()
+        for stats in results:
+            merged.merge(stats)
+        return merged
+
+    stages, sent, peak = {}, 0, {'in_flight': 0, 'late': 0}
+    for worker_stages, worker_sent, worker_peak in results:
+        for label, (rate, stats) in worker_stages.items():
+            if label in stages:
+                stages[label] = (stages[label][0] + rate, stages[label][1].merge(stats))
+            else:
+                stages[label] = (rate, stats)
+        sent += worker_sent
+        peak['in_flight'] += worker_peak['in_flight']
+        peak['late'] += worker_peak['late']
+    return stages, sent, peak
+
+
+def run_processes(mode, args, processes, on_interim=None):
+    """Run mode in processes workers; on_interim(merged RunStats, workers reporting) during the run"""
+    if not args.skip_setup:
+        asyncio.run(_setup())
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(mode, worker_arguments(mode, args, i, processes), i, results),
+                        daemon=True)
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    latest, finals, failures = {}, {}, {}
+    last_emit = time.monotonic()
+    while len(finals) + len(failures) < processes:
+        if on_interim and latest and time.monotonic() - last_emit >= args.progress_interval:
+            merged = RunStats()
+            for stats in latest.values():
+                merged.merge(stats)
+            on_interim(merged, len(latest))
+            last_emit = time.monotonic()
+
+        try:
+            kind, index, payload = results.get(timeout=0.5)
+        except queue_module.Empty:
+            if not any(process.is_alive() for process in workers):
+                break
+            continue
+
+        if kind == 'interim':
+            latest[index] = payload
+        elif kind == 'final':
+            finals[index] = payload
+        else:
+            failures[index] = payload
+
+    for process in workers:
+        process.join(timeout=5)
+
+    for index, error in sorted(failures.items()):
+        print(f"❌ Worker {index} failed: {error}")
+    if not finals:
+        raise SystemExit("❌ No worker finished successfully")
+    return merge_results(mode, [finals[i] for i in sorted(finals)])
+
+
+async def _setup():
+    """Create test_items / test-bucket once, before the workers start"""
+    config = Config()
+    config.validate()
+    async with HarnessClient(config) as client:
+        await scenarios.setup(client)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Database Failover Probe
+- Keeps a steady open-loop PostgREST + auth workload running
+- Triggers a failover after --trigger-at seconds: a shell command (e.g. an RDS
+  Multi-AZ forced failover), the stand-in's simulated database restart
+  (--standin), or by hand when neither is given
+- Reports per service (rest, auth, storage ...):
+  - error window: first to last failed request after the trigger
+  - reconnect time: trigger to the first success after the last failure
+  - latency spike: peak window p99 / max against the pre-trigger p99, and
+    when latency settled back under --settle-factor x that p99
+The numbers are what client retry budgets and connection pool timeouts
+(PostgREST db-pool-acquisition-timeout, GoTrue / Storage pool settings)
+have to cover.
+
+Usage:
+    python failover_probe.py --trigger-cmd "aws rds reboot-db-instance --db-instance-identifier supabase --force-failover"
+    python failover_probe.py --rate 100 --duration 300 --trigger-at 60     # failover from the console at 60s
+
+    # Offline, against the stand-in's simulated database restart
+    python standin.py --failover-down-s 10 &
+    python failover_probe.py --standin --duration 60 --trigger-at 10
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+import profiles
+import results
+import runner
+import scenarios
+import workload
+from harness import Config, HarnessClient
+from stats import EndpointStats, RunStats
+
+
+class Timeline(RunStats):
+    """RunStats that also keeps every request with its (scheduled) start"""
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def record(self, name, seconds, ok, status=None, nbytes=0, error=None, **kwargs):
+        super().record(name, seconds, ok, status=status, nbytes=nbytes, error=error, **kwargs)
+        self.events.append({"start": time.perf_counter() - seconds, "endpoint": name, "seconds": seconds,
+                            "ok": ok, "status": status, "error": error})
+
+
+def service_of(endpoint):
+    """'GET /rest/v1/test_items (user)' -> 'rest'"""
+    parts = endpoint.split()
+    path = parts[1] if len(parts) > 1 else endpoint
+    segments = path.strip('/').split('/')
+    return segments[0] if segments and segments[0] else 'other'
+
+
+async def trigger(args, url, started, log):
+    """Start the failover at --trigger-at; stores the trigger time (relative to the run) in log"""
+    await asyncio.sleep(max(0.0, started + args.trigger_at - time.perf_counter()))
+    log['at'] = time.perf_counter() - started
+    if args.standin:
+        body = {"down_s": args.down_s} if args.down_s is not None else {}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{url}/_standin/failover", json=body) as response:
+                log['how'] = f"stand-in restart {await response.text()}"
+                if response.status != 200:
+                    raise SystemExit(f"❌ Stand-in refused the failover ({response.status}); is it test/standin.py?")
+    elif args.trigger_cmd:
+        log['how'] = args.trigger_cmd
+        process = await asyncio.create_subprocess_shell(args.trigger_cmd, stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.STDOUT)
+        output, _ = await process.communicate()
+        log['returncode'] = process.returncode
+        log['output'] = output.decode(errors='replace').strip()[-500:]
+        log['command_s'] = time.perf_counter() - started - log['at']
+    else:
+        log['how'] = 'manual'
+        print(f"\n👉 {log['at']:.0f}s: trigger the failover now "
+              f"(console, or aws rds reboot-db-instance --force-failover)\n")
+
+
+def windows(events, size, origin):
+    """{window start relative to origin: EndpointStats} for the events of one service"""
+    buckets = {}
+    for event in events:
+        start = (event['start'] - origin) // size * size
+        buckets.setdefault(start, EndpointStats()).record(event['seconds'], event['ok'],
+                                                          status=event['status'], error=event['error'])
+    return buckets
+
+
+def analyze(events, trigger_at, size, settle_factor, settle_windows):
+    """Error window, reconnect time and latency spike of one service (times relative to the trigger)"""
+    before = EndpointStats()
+    for event in events:
+        if event['start'] < trigger_at:
+            before.record(event['seconds'], event['ok'], status=event['status'], error=event['error'])
+    after = [event for event in events if event['start'] >= trigger_at]
+    failures = [event for event in after if not event['ok']]
+    row = {"baseline_p99_ms": before.latency.percentile(99) / 1000, "requests": len(after),
+           "failed": len(failures), "first_error": None, "last_error": None, "error_window": 0.0,
+           "reconnect": None, "kinds": {}, "peak_p99_ms": 0.0, "max_ms": 0.0, "settled": None}
+    if failures:
+        row['first_error'] = failures[0]['start'] - trigger_at
+        row['last_error'] = failures[-1]['start'] - trigger_at
+        row['error_window'] = row['last_error'] - row['first_error']
+        recovered = [event for event in after if event['ok'] and event['start'] > failures[-1]['start']]
+        row['reconnect'] = recovered[0]['start'] - trigger_at if recovered else None
+        for event in failures:
+            kind = event['error'] or f"HTTP {event['status']}"
+            row['kinds'][kind] = row['kinds'].get(kind, 0) + 1
+
+    buckets = sorted(windows(after, size, trigger_at).items())
+    threshold = before.latency.percentile(99) * settle_factor
+    calm = 0
+    for start, stats in buckets:
+        row['peak_p99_ms'] = max(row['peak_p99_ms'], stats.latency.percentile(99) / 1000)
+        row['max_ms'] = max(row['max_ms'], stats.latency.max / 1000)
+        # Settled: settle_windows windows in a row without errors and with p99 under the threshold
+        if stats.errors or stats.latency.percentile(99) > threshold:
+            calm = 0
+        else:
+            calm += 1
+            if calm == settle_windows and row['settled'] is None:
+                row['settled'] = start - (settle_windows - 1) * size
+    return row
+
+
+def seconds(value):
+    return f"+{value:.1f}s" if value is not None else "-"
+
+
+def print_report(args, log, services, timeline, trigger_at):
+    print("\n" + "=" * 100)
+    print(f"📊 FAILOVER PROBE (trigger at {trigger_at:.1f}s: {log.get('how', '-')})")
+    print("=" * 100)
+    if 'returncode' in log:
+        print(f"🔧 Command exited {log['returncode']} after {log['command_s']:.1f}s"
+              + (f": {log['output'].splitlines()[-1]}" if log['output'] else ""))
+    print(f"{'Service':<10} {'reqs':>7} {'failed':>7} {'first err':>10} {'last err':>9} {'window':>8} "
+          f"{'reconnect':>10} {'base p99':>9} {'peak p99':>9} {'max ms':>8} {'settled':>8}")
+    print("-" * 100)
+    for name, row in sorted(services.items()):
+        print(f"{name:<10} {row['requests']:>7} {row['failed']:>7} {seconds(row['first_error']):>10} "
+              f"{seconds(row['last_error']):>9} {row['error_window']:>7.1f}s {seconds(row['reconnect']):>10} "
+              f"{row['baseline_p99_ms']:>9.1f} {row['peak_p99_ms']:>9.1f} {row['max_ms']:>8.1f} "
+              f"{seconds(row['settled']):>8}")
+    print("-" * 100)
+    for name, row in sorted(services.items()):
+        if row['kinds']:
+            kinds = ", ".join(f"{kind} x{count}" for kind, count in sorted(row['kinds'].items(), key=lambda i: -i[1]))
+            print(f"❌ {name}: {kinds}")
+    if not any(row['failed'] for row in services.values()):
+        print("✅ No failed requests after the trigger")
+
+    # Per-window view around the failover, one column per service
+    names = sorted(services)
+    end = max([row['settled'] or row['reconnect'] or row['last_error'] or 0 for row in services.values()] or [0])
+    print(f"\n{'Window':>8}  " + "  ".join(f"{name + ' ok/err p99':>22}" for name in names))
+    print("-" * (10 + 24 * len(names)))
+    per_service = {name: windows(events, args.window, trigger_at) for name, events in timeline.items()}
+    start = -3 * args.window
+    while start <= end + 3 * args.window:
+        cells = []
+        for name in names:
+            stats = per_service[name].get(start)
+            cells.append(f"{stats.requests - stats.errors:>6}/{stats.errors:<5} {stats.latency.percentile(99) / 1000:>8.1f}ms"
+                         if stats else f"{'-':>22}")
+        print(f"{start:>+7g}s  " + "  ".join(cells))
+        start += args.window
+    longest = max([row['reconnect'] or 0 for row in services.values()] or [0])
+    if longest:
+        print(f"💡 Retries need to cover ~{longest:.0f}s after a failover; reconnect = trigger to first success "
+              f"after the last failure")
+
+
+async def run(args, profile):
+    config = Config()
+    config.validate()
+    steps = workload.resolve(args, 'open')
+    timeline = Timeline()
+    # One stage for the whole run, recorded into the Timeline
+    stages = {profile.stage(0): (args.rate, timeline)}
+    log = {}
+    async with HarnessClient(config, pool_size=args.pool_size, timeout=args.timeout) as client:
+        if not args.skip_setup:
+            await scenarios.setup(client)
+        started = time.perf_counter()
+        timeline.started = time.time()
+        failover = asyncio.create_task(trigger(args, config.url, started, log))
+        try:
+            sent, peak = await runner.open_loop(client, steps, profile, args.max_in_flight, stages)
+            await failover
+        finally:
+            failover.cancel()
+    timeline.finish()
+    for event in timeline.events:
+        event['start'] -= started
+    return timeline, log, sent, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database failover error window / reconnect probe")
+    parser.add_argument('--scenarios', default='postgrest_read,postgrest_create,auth_login',
+                        help="Comma separated scenarios or groups (%s)" % ', '.join(scenarios.GROUPS))
+    parser.add_argument('--workload', default=None, help="Workload file whose mix replaces --scenarios")
+    parser.add_argument('--rate', type=float, default=50, help="Steady arrival rate in req/s")
+    parser.add_argument('--duration', type=float, default=180, help="Seconds of load in total")
+    parser.add_argument('--trigger-at', type=float, default=30, help="Seconds into the run to fail over")
+    trigger_group = parser.add_mutually_exclusive_group()
+    trigger_group.add_argument('--trigger-cmd', default=None,
+                               help="Shell command that starts the failover (e.g. aws rds reboot-db-instance ...)")
+    trigger_group.add_argument('--standin', action='store_true',
+                               help="Restart the stand-in's simulated database (POST /_standin/failover)")
+    parser.add_argument('--down-s', type=float, default=None,
+                        help="Stand-in database downtime (default: its --failover-down-s)")
+    parser.add_argument('--window', type=float, default=1, help="Latency window in seconds")
+    parser.add_argument('--settle-factor', type=float, default=2,
+                        help="Latency counts as settled under this multiple of the pre-trigger p99")
+    parser.add_argument('--settle-windows', type=int, default=3,
+                        help="Consecutive calm windows needed to count as settled")
+    parser.add_argument('--max-in-flight', type=int, default=2000,
+                        help="Cap on concurrent requests; queued requests keep their scheduled start")
+    parser.add_argument('--pool-size', type=int, default=100, help="Max pooled keep-alive connections")
+    parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't create test_items / test-bucket")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    if args.trigger_at >= args.duration:
+        raise SystemExit("❌ --trigger-at must be inside --duration")
+
+    profile = profiles.ConstantRate(args.rate, args.duration)
+    print("🚀 Starting failover probe")
+    print(f"URL: {Config().url}   Load: {args.rate:g} req/s for {args.duration:g}s   "
+          f"Scenarios: {args.workload or args.scenarios}")
+    print(f"Failover at {args.trigger_at:g}s: "
+          + ("stand-in database restart" if args.standin else args.trigger_cmd or "manual"))
+    print("-" * 50)
+
+    timeline, log, sent, peak = asyncio.run(run(args, profile))
+    trigger_at = log['at']
+    by_service = {}
+    for event in sorted(timeline.events, key=lambda e: e['start']):
+        if not event['endpoint'].startswith('setup'):
+            by_service.setdefault(service_of(event['endpoint']), []).append(event)
+    services = {name: analyze(events, trigger_at, args.window, args.settle_factor, args.settle_windows)
+                for name, events in by_service.items()}
+    print_report(args, log, services, by_service, trigger_at)
+    print(f"\n📨 Scheduled: {sent}   🔝 Peak in flight: {peak['in_flight']}   "
+          f"🐢 Sends >10ms behind schedule: {peak['late']}")
+
+    # before / failover (trigger until every service settled) / after, for results.py compare
+    recovered = max([row['settled'] if row['settled'] is not None else args.duration - trigger_at
+                     for row in services.values()] or [0])
+    series = {}
+    for event in timeline.events:
+        if event['endpoint'].startswith('setup'):
+            continue
+        offset = event['start'] - trigger_at
+        name = 'before' if offset < 0 else 'failover' if offset < recovered else 'after'
+        series.setdefault(name, RunStats()).record(event['endpoint'], event['seconds'], event['ok'],
+                                                   status=event['status'], error=event['error'])
+    bounds = {'before': (0, trigger_at), 'failover': (trigger_at, trigger_at + recovered),
+              'after': (trigger_at + recovered, args.duration)}
+    for name, stats in series.items():
+        stats.started, stats.finished = (timeline.started + offset for offset in bounds[name])
+    series = {name: series[name] for name in ('before', 'failover', 'after') if name in series}
+    results.save('failover-probe', args, series, url=Config().url, extra={
+        "trigger": log, "services": services, "sent": sent, "peak": peak,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Simulated HPAs and cluster-autoscaler for the offline stand-in
+- Deployments, HPA bounds/targets and the node group come from
+  helm/supabase/values.yaml and infra/stacks/eks.py (via results.py)
+- "CPU" is the stand-in's own request rate per Ready pod against --pod-capacity
+- HPAs re-evaluate every --hpa-sync-s with the 10% tolerance and a scale-down window
+- New pods need a free node slot, then take --pod-start-s to become Ready;
+  pods pending longer than --ca-delay-s make the autoscaler add nodes,
+  which join Ready after --node-start-s
+- Saturated components answer slower (M/M/1 wait on --service-ms)
+Served as the read-only Kubernetes API subset autoscale_bench.py polls.
+"""
+
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+import results
+
+# Deployments the stand-in's routes load, by path prefix; Kong sits in front of all of them
+COMPONENTS = {'/auth/v1': 'auth', '/rest/v1': 'rest', '/storage/v1': 'storage', '/realtime/v1': 'realtime'}
+RELEASE = 'supabase'
+
+
+def timestamp(wall):
+    return datetime.fromtimestamp(wall, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FakeCluster:
+    """Autoscaling model driven by observed traffic"""
+
+    def __init__(self, pod_capacity=50.0, service_ms=5.0, pod_start_s=20.0, node_start_s=90.0,
+                 pods_per_node=4, hpa_sync_s=15.0, scale_down_s=300.0, ca_delay_s=10.0):
+        self.pod_capacity = pod_capacity
+        self.service_ms = service_ms
+        self.pod_start_s = pod_start_s
+        self.node_start_s = node_start_s
+        self.pods_per_node = pods_per_node
+        self.hpa_sync_s = hpa_sync_s
+        self.scale_down_s = scale_down_s
+        self.ca_delay_s = ca_delay_s
+
+        components = results.helm_summary().get('components') or {}
+        group = ((results.infra_sizing().get('eks') or {}).get('eks_managed_node_groups') or {}).get('default') or {}
+        self.max_nodes = int(group.get('max_size', 4))
+        self.deployments = {}
+        for name in ('kong',) + tuple(COMPONENTS.values()):
+            values = components.get(name) or {}
+            scaling = values.get('autoscaling') or {}
+            hpa = bool(scaling.get('enabled'))
+            replicas = int(scaling.get('minReplicas', 1) if hpa else values.get('replicaCount', 1))
+            self.deployments[name] = {
+                "hpa": hpa, "min": replicas, "max": int(scaling.get('maxReplicas', replicas)) if hpa else replicas,
+                "target": float(scaling.get('targetCPUUtilizationPercentage', 80)), "desired": replicas,
+                "requests": 0, "window_requests": 0, "rate": 0.0, "utilization": 0.0, "low_since": None,
+            }
+
+        now = time.monotonic()
+        self.nodes, self.pods, self.sequence = [], [], 0
+        for _ in range(int(group.get('desired_size', 2))):
+            self.add_node(now, ready_at=now)
+        for name, deployment in self.deployments.items():
+            for _ in range(deployment['desired']):
+                self.add_pod(name, now, ready_at=now)
+        self.schedule(now)
+        self.last_tick = self.last_sync = now
+        self.task = None
+
+    # --- Model -----------------------------------------------------------
+
+    def wall(self, monotonic):
+        return time.time() - (time.monotonic() - monotonic)
+
+    def add_node(self, now, ready_at=None):
+        self.sequence += 1
+        self.nodes.append({"name": f"ip-10-0-{self.sequence // 250}-{self.sequence % 250}.ec2.internal",
+                           "created": now, "ready_at": ready_at if ready_at is not None else now + self.node_start_s})
+
+    def add_pod(self, component, now, ready_at=None):
+        self.sequence += 1
+        self.pods.append({"name": f"{RELEASE}-{RELEASE}-{component}-{self.sequence:05x}", "component": component,
+                          "node": None, "created": now, "pending_since": now, "ready_at": ready_at})
+
+    def ready_pods(self, component, now):
+        return [p for p in self.pods if p['component'] == component and p['node']
+                and p['ready_at'] is not None and p['ready_at'] <= now]
+
+    def schedule(self, now):
+        """Bind pending pods to Ready nodes with a free slot"""
+        load = {}
+        for pod in self.pods:
+            if pod['node']:
+                load[pod['node']] = load.get(pod['node'], 0) + 1
+        for pod in self.pods:
+            if pod['node']:
+                continue
+            for node in self.nodes:
+                if node['ready_at'] <= now and load.get(node['name'], 0) < self.pods_per_node:
+                    pod['node'] = node['name']
+                    if pod['ready_at'] is None or pod['ready_at'] < now:
+                        pod['ready_at'] = now + self.pod_start_s
+                    load[node['name']] = load.get(node['name'], 0) + 1
+                    break
+
+    def autoscale_nodes(self, now):
+        """cluster-autoscaler: add nodes for pods pending longer than ca_delay_s (no scale-down)"""
+        stuck = [p for p in self.pods if not p['node'] and now - p['pending_since'] >= self.ca_delay_s]
+        booting = [n for n in self.nodes if n['ready_at'] > now]
+        needed = math.ceil(len(stuck) / self.pods_per_node) - len(booting)
+        for _ in range(max(0, min(needed, self.max_nodes - len(self.nodes)))):
+            self.add_node(now)
+
+    def sync_hpas(self, now, elapsed):
+        for name, deployment in self.deployments.items():
+            ready = len(self.ready_pods(name, now))
+            rate = deployment['window_requests'] / max(elapsed, 1e-9)
+            deployment['window_requests'] = 0
+            deployment['utilization'] = rate / (max(ready, 1) * self.pod_capacity) * 100
+            if not deployment['hpa'] or not ready:
+                continue
+            ratio = deployment['utilization'] / deployment['target']
+            proposal = min(deployment['max'], max(deployment['min'], math.ceil(ready * ratio)))
+            if ratio > 1.1 and proposal > deployment['desired']:
+                deployment['desired'], deployment['low_since'] = proposal, None
+            elif ratio < 0.9 and proposal < deployment['desired']:
+                deployment['low_since'] = deployment['low_since'] or now
+                if now - deployment['low_since'] >= self.scale_down_s:
+                    deployment['desired'], deployment['low_since'] = proposal, None
+            else:
+                deployment['low_since'] = None
+
+    def reconcile(self, now):
+        """ReplicaSet controller: create or delete (newest first) pods to match desired"""
+        for name, deployment in self.deployments.items():
+            pods = [p for p in self.pods if p['component'] == name]
+            for _ in range(deployment['desired'] - len(pods)):
+                self.add_pod(name, now)
+            for pod in sorted(pods, key=lambda p: p['created'], reverse=True)[:max(0, len(pods) - deployment['desired'])]:
+                self.pods.remove(pod)
+
+    def tick(self):
+        now = time.monotonic()
+        elapsed = now - self.last_tick
+        for deployment in self.deployments.values():
+            deployment['rate'] = deployment['requests'] / max(elapsed, 1e-9)
+            deployment['requests'] = 0
+        self.last_tick = now
+        if now - self.last_sync >= self.hpa_sync_s:
+            self.sync_hpas(now, now - self.last_sync)
+            self.last_sync = now
+        self.reconcile(now)
+        self.schedule(now)
+        self.autoscale_nodes(now)
+
+    async def run(self, app):
+        async def loop():
+            while True:
+                await asyncio.sleep(1)
+                self.tick()
+
+        self.task = asyncio.create_task(loop())
+
+    async def close(self, app):
+        if self.task:
+            self.task.cancel()
+
+    # --- Traffic ---------------------------------------------------------
+
+    def component(self, path):
+        for prefix, name in COMPONENTS.items():
+            if path.startswith(prefix):
+                return name
+        return None
+
+    def observe(self, path):
+        for name in ('kong', self.component(path)):
+            if name:
+                self.deployments[name]['requests'] += 1
+                self.deployments[name]['window_requests'] += 1
+
+    def penalty_ms(self, path):
+        """Queueing delay at the current per-pod load (kong plus the backing component)"""
+        now, delay = time.monotonic(), 0.0
+        for name in ('kong', self.component(path)):
+            if not name:
+                continue
+            load = self.deployments[name]['rate'] / (max(len(self.ready_pods(name, now)), 1) * self.pod_capacity)
+            load = min(load, 0.95)
+            delay += self.service_ms * load / (1 - load)
+        return delay
+
+    # --- Kubernetes API --------------------------------------------------
+
+    def routes(self):
+        return [
+            web.get('/api/v1/nodes', self.list_nodes),
+            web.get('/api/v1/namespaces/{namespace}/pods', self.list_pods),
+            web.get('/apis/apps/v1/namespaces/{namespace}/deployments', self.list_deployments),
+            web.get('/apis/autoscaling/v2/namespaces/{namespace}/horizontalpodautoscalers', self.list_hpas),
+        ]
+
+    @staticmethod
+    def listing(kind, items):
+        return web.json_response({"kind": f"{kind}List", "apiVersion": "v1", "metadata": {}, "items": items})
+
+    async def list_nodes(self, request):
+        now = time.monotonic()
+        return self.listing('Node', [{
+            "metadata": {"name": n['name'], "creationTimestamp": timestamp(self.wall(n['created']))},
+            "status": {"conditions": [{"type": "Ready", "status": "True" if n['ready_at'] <= now else "False"}]},
+        } for n in self.nodes])
+
+    async def list_pods(self, request):
+        now = time.monotonic()
+        phase = request.query.get('fieldSelector', '').partition('status.phase=')[2]
+        items = []
+        for pod in self.pods:
+            running = pod['node'] is not None
+            if phase and phase != ('Running' if running else 'Pending'):
+                continue
+            items.append({"metadata": {"name": pod['name'], "labels": {"app.kubernetes.io/instance": RELEASE}},
+                          "spec": {"nodeName": pod['node']},
+                          "status": {"phase": 'Running' if running else 'Pending', "conditions": [
+                              {"type": "Ready", "status": "True" if running and pod['ready_at'] <= now else "False"}]}})
+        return self.listing('Pod', items)
+
+    async def list_deployments(self, request):
+        now = time.monotonic()
+        return self.listing('Deployment', [{
+            "metadata": {"name": f"{RELEASE}-{RELEASE}-{name}", "labels": {"app.kubernetes.io/instance": RELEASE}},
+            "spec": {"replicas": d['desired']},
+            "status": {"replicas": sum(1 for p in self.pods if p['component'] == name),
+                       "readyReplicas": len(self.ready_pods(name, now))},
+        } for name, d in self.deployments.items()])
+
+    async def list_hpas(self, request):
+        return self.listing('HorizontalPodAutoscaler', [{
+            "metadata": {"name": f"{RELEASE}-{RELEASE}-{name}"},
+            "spec": {"scaleTargetRef": {"kind": "Deployment", "name": f"{RELEASE}-{RELEASE}-{name}"},
+                     "minReplicas": d['min'], "maxReplicas": d['max']},
+            "status": {"currentReplicas": sum(1 for p in self.pods if p['component'] == name),
+                       "desiredReplicas": d['desired'], "currentMetrics": [{"type": "Resource", "resource": {
+                           "name": "cpu", "current": {"averageUtilization": round(d['utilization'])}}}]},
+        } for name, d in self.deployments.items() if d['hpa']])
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Async HTTP harness shared by the Supabase load tools
+- Reads the same .env as test_api.py (SUPABASE_URL, anonKey, serviceKey)
+- One pooled keep-alive aiohttp session per process
+- Every request is timed and recorded per endpoint in RunStats, split into
+  queue / DNS / connect (TCP + TLS) / TTFB / transfer phases with aiohttp
+  trace hooks, plus whether the keep-alive connection was reused
+- Open-loop runs set the scheduled start per task, so latency includes
+  the time a request waited behind a slow server (no coordinated omission)
+- With the JWT secret configured, authenticated-role tokens are minted
+  locally per virtual user instead of going through signup (jwt_mint.py)
+"""
+
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from jwt_mint import TokenCache
+from stats import RunStats
+
+# Load environment variables
+load_dotenv()
+
+# Per-task overrides set by the open-loop scheduler (loadgen.py): when the
+# request was supposed to start, and which RunStats it belongs to
+scheduled_start = contextvars.ContextVar('scheduled_start', default=None)
+current_stats = contextvars.ContextVar('current_stats', default=None)
+
+# Synthetic user keys handed out to virtual users in this process
+_synthetic_users = itertools.count()
+
+
+class Config:
+    """Connection settings for a Supabase deployment"""
+
+    def __init__(self, url=None, anon_key=None, service_key=None, jwt_secret=None):
+        self.url = (url or os.getenv('SUPABASE_URL') or '').rstrip('/')
+        self.anon_key = anon_key or os.getenv('anonKey')
+        self.service_key = service_key or os.getenv('serviceKey')
+        # `secret` is the key name in the supabase-jwt Kubernetes secret
+        self.jwt_secret = jwt_secret or os.getenv('JWT_SECRET') or os.getenv('secret')
+
+    def validate(self):
+        missing = [name for name, value in (
+            ('SUPABASE_URL', self.url),
+            ('anonKey', self.anon_key),
+            ('serviceKey', self.service_key),
+        ) if not value]
+        if missing:
+            raise SystemExit(f"❌ Missing configuration: {', '.join(missing)} (see test/README.md)")
+
+
+class Result:
+    """Status and body of a completed request"""
+
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+
+def _mark(name):
+    """Trace hook that stores when it fired in the request's trace context"""
+    async def hook(session, context, params):
+        # Requests made on client.session directly don't pass a context
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx[name] = time.perf_counter()
+    return hook
+
+
+def trace_config():
+    """aiohttp TraceConfig feeding phase_times()"""
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_queued_start.append(_mark('queue_start'))
+    trace.on_connection_queued_end.append(_mark('queue_end'))
+    trace.on_dns_resolvehost_start.append(_mark('dns_start'))
+    trace.on_dns_resolvehost_end.append(_mark('dns_end'))
+    trace.on_connection_create_start.append(_mark('connect_start'))
+    trace.on_connection_create_end.append(_mark('connect_end'))
+    trace.on_connection_reuseconn.append(_mark('reused'))
+    trace.on_request_headers_sent.append(_mark('headers_sent'))
+    trace.on_request_end.append(_mark('response_start'))
+    return trace
+
+
+def phase_times(marks, body_end):
+    """Phase durations (seconds) from the trace marks of one request"""
+    phases = {}
+    if 'queue_end' in marks:
+        phases['queue'] = marks['queue_end'] - marks['queue_start']
+    dns = marks['dns_end'] - marks['dns_start'] if 'dns_end' in marks else 0.0
+    if 'dns_end' in marks:
+        phases['dns'] = dns
+    if 'connect_end' in marks:
+        # The connector resolves the host inside connection creation; TLS is
+        # part of the same create_connection call and can't be split out
+        phases['connect'] = marks['connect_end'] - marks['connect_start'] - dns
+    if 'response_start' in marks:
+        phases['ttfb'] = marks['response_start'] - marks.get('headers_sent', marks['response_start'])
+        phases['transfer'] = body_end - marks['response_start']
+    return phases
+
+
+class HarnessClient:
+    """Pooled aiohttp client that records the latency of every request"""
+
+    def __init__(self, config, stats=None, pool_size=100, timeout=10, expected_interval=None):
+        self.config = config
+        self.stats = stats if stats is not None else RunStats()
+        # Closed-loop coordinated-omission correction (seconds between intended sends)
+        self.expected_interval = expected_interval
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+        self.tokens = TokenCache(config.jwt_secret) if config.jwt_secret else None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[trace_config()],
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def headers(self, service=False, content_type='application/json', token=None):
+        """Default Supabase headers (anon key, or service key with bearer auth)"""
+        key = self.config.service_key if service else self.config.anon_key
+        headers = {'apikey': key}
+        if service or token:
+            headers['Authorization'] = f'Bearer {token or key}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        return headers
+
+    def user_token(self, state):
+        """Locally minted authenticated-role JWT for the virtual user that owns state"""
+        if self.tokens is None:
+            raise SystemExit("❌ Minting user tokens needs the JWT secret (JWT_SECRET or `secret` in .env)")
+        if 'user' not in state:
+            state['user'] = f"{os.getpid()}-{next(_synthetic_users)}"
+        return self.tokens.token(state['user'])
+
+    async def request(self, endpoint, method, path, ok=(200,), service=False,
+                      headers=None, json=None, data=None, content_type='application/json',
+                      token=None):
+        """Send a request and record it under endpoint; returns Result or None on transport errors"""
+        request_headers = self.headers(service=service, content_type=content_type, token=token)
+        if headers:
+            request_headers.update(headers)
+
+        stats = current_stats.get() or self.stats
+        start = time.perf_counter()
+        # Only the first request of a step inherits the scheduled start
+        scheduled = scheduled_start.get()
+        scheduled_start.set(None)
+        since = scheduled if scheduled is not None else start
+        marks = {}
+        try:
+            async with self.session.request(method, f"{self.config.url}{path}",
+                                            headers=request_headers, json=json, data=data,
+                                            trace_request_ctx=marks) as response:
+                body = await response.read()
+                end = time.perf_counter()
+                stats.record(endpoint, end - since, response.status in ok,
+                             status=response.status, nbytes=len(body),
+                             service_seconds=end - start, expected_interval=self.expected_interval,
+                             phases=phase_times(marks, end), reused='reused' in marks)
+                return Result(response.status, body, response.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            end = time.perf_counter()
+            stats.record(endpoint, end - since, False, error=type(e).__name__,
+                         service_seconds=end - start, expected_interval=self.expected_interval)
+            return None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Local JWT minting for synthetic users
+- HS256 tokens signed with the `secret` field of the supabase/jwt secret
+  (infra/stacks/secrets.py), the same key GoTrue and PostgREST verify with
+- role=authenticated, aud=authenticated, sub derived from the user key
+- TokenCache keeps one token per synthetic user and re-mints it before expiry
+
+PostgREST and Storage accept these like GoTrue-issued tokens, so scenarios
+that only need an authenticated identity skip signup and bcrypt entirely.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+# Fixed namespace so the same user key always maps to the same sub
+USER_NAMESPACE = uuid.UUID('5b6c0f9e-3c7a-4d8e-9a51-1f2e3d4c5b6a')
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def user_id(key):
+    """Stable uuid (the JWT sub / auth.uid()) for a synthetic user key"""
+    return str(uuid.uuid5(USER_NAMESPACE, str(key)))
+
+
+def mint(secret, sub, role='authenticated', ttl=3600, email=None, now=None):
+    """Sign an HS256 access token; returns (token, expires_at)"""
+    issued = int(now if now is not None else time.time())
+    claims = {
+        "aud": "authenticated",
+        "sub": sub,
+        "role": role,
+        "iat": issued,
+        "exp": issued + ttl,
+    }
+    if email:
+        claims["email"] = email
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(',', ':')).encode())
+    payload = _b64(json.dumps(claims, separators=(',', ':')).encode())
+    signing_input = header + b'.' + payload
+    signature = _b64(hmac.new(secret.encode(), signing_input, hashlib.sha256).digest())
+    return (signing_input + b'.' + signature).decode(), issued + ttl
+
+
+class TokenCache:
+    """One token per synthetic user, re-minted once it is within refresh_margin of expiring"""
+
+    def __init__(self, secret, ttl=3600, refresh_margin=300):
+        if refresh_margin >= ttl:
+            raise ValueError("refresh_margin must be shorter than ttl")
+        self.secret = secret
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.tokens = {}
+        self.minted = 0
+
+    def token(self, key):
+        now = time.time()
+        cached = self.tokens.get(key)
+        if cached and cached[1] - now > self.refresh_margin:
+            return cached[0]
+        token, expires = mint(self.secret, user_id(key), ttl=self.ttl,
+                              email=f"synthetic-{key}@example.com", now=now)
+        self.tokens[key] = (token, expires)
+        self.minted += 1
+        return token
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Supabase Load Generator
+- Drives the test_api.py scenarios from many concurrent asyncio workers
+- Pooled keep-alive connections (one aiohttp session per process)
+- Stops after a fixed duration or a fixed number of scenario steps
+- Reports throughput, error rate and p50/p90/p99/max per endpoint
+- Open-loop mode sends at a target arrival rate (constant, step, linear,
+  spike) and measures latency from each request's scheduled start
+- --processes N splits the load over N worker processes (past the GIL)
+- `run` takes a workload file (workload.py): weighted mix, think times,
+  sessions and feeders, with the load shape in the file
+
+Usage:
+    python loadgen.py closed --concurrency 50 --duration 60 --scenarios rest
+    python loadgen.py open --profile step --rate 50 --step-rate 50 --steps 6 --scenarios postgrest_read
+    python loadgen.py open --rate 2000 --duration 120 --processes 8 --scenarios postgrest_read
+    python loadgen.py run workloads/peak.yaml --duration 120
+"""
+
+import argparse
+import asyncio
+import time
+
+import distributed
+import profiles
+import results
+import runner
+import scenarios
+import workload
+from harness import Config
+from stats import EndpointStats
+
+
+class ProgressPrinter:
+    """on_interval / on_interim callback printing a one-line running total"""
+
+    def __init__(self):
+        self.last_requests, self.last_time = 0, time.monotonic()
+
+    def __call__(self, stats, workers=None):
+        now, requests = time.monotonic(), stats.total_requests
+        rate = (requests - self.last_requests) / max(1e-9, now - self.last_time)
+        p99 = 0
+        for endpoint in stats.endpoints.values():
+            p99 = max(p99, endpoint.latency.percentile(99))
+        print(f"   ⏱️  {stats.elapsed:6.1f}s  requests={requests}  errors={stats.total_errors}  "
+              f"current={rate:.1f} req/s  worst p99={p99 / 1000:.1f}ms"
+              + (f"  ({workers} workers reporting)" if workers else ""))
+        self.last_requests, self.last_time = requests, now
+
+
+def execute(mode, args):
+    """Run mode in this process, or fanned out over --processes workers"""
+    if args.processes > 1:
+        return distributed.run_processes(mode, args, args.processes, on_interim=ProgressPrinter())
+    return asyncio.run(runner.MODES[mode](args, ProgressPrinter()))
+
+
+def report_closed(stats):
+    stats.print_report("CLOSED-LOOP LOAD TEST SUMMARY")
+
+
+def report_open(args, stages, sent, peak):
+    stats = runner.merge_stages(stages)
+    stats.print_report("OPEN-LOOP LOAD TEST SUMMARY")
+    print_stage_report(stages, stage_durations(profiles.from_args(args)))
+    print(f"\n📨 Scheduled: {sent}   🔝 Peak in flight: {peak['in_flight']}   "
+          f"🐢 Sends >10ms behind schedule: {peak['late']}")
+    if peak['late']:
+        print("⚠️  The generator fell behind its schedule; latencies still count from the scheduled start,"
+              " but the client may be the bottleneck - try more --processes")
+
+
+def print_banner(mode, args):
+    print(f"🚀 Starting Supabase {mode}-loop load test")
+    print(f"URL: {Config().url}")
+    if args.workload:
+        mix = workload.Workload(args.workload)
+        print(f"Workload: {mix.name} - {mix.description}".rstrip(' -'))
+        print(f"Mix: {mix.describe()}")
+    if mode == 'closed':
+        print(f"{'' if args.workload else 'Scenarios: %s  ' % args.scenarios}Concurrency: {args.concurrency}  "
+              f"{'Duration: %ss' % args.duration if args.duration else 'Steps: %s' % args.requests}  "
+              f"Processes: {args.processes}")
+    else:
+        print(f"{'' if args.workload else 'Scenarios: %s  ' % args.scenarios}Profile: {args.profile}  "
+              f"Duration: {profiles.from_args(args).duration:g}s  Max in flight: {args.max_in_flight}  "
+              f"Processes: {args.processes}")
+    print("-" * 50)
+
+
+def print_stage_report(stages, stage_windows):
+    """Target vs achieved rate and latency per stage, to spot the knee of the curve"""
+    print("\n" + "=" * 100)
+    print("📈 RATE STAGES (latency measured from scheduled start)")
+    print("=" * 100)
+    print(f"{'Stage':<36} {'target':>8} {'achieved':>9} {'err%':>7} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'svc p99':>8} {'max ms':>8}")
+    print("-" * 100)
+    for label, (rate, stats) in stages.items():
+        merged = EndpointStats()
+        for endpoint in stats.endpoints.values():
+            merged.merge(endpoint)
+        window = stage_windows.get(label) or stats.elapsed
+        print(f"{label:<36} {rate:>8.0f} {merged.requests / window:>9.1f} {merged.error_rate * 100:>6.2f}% "
+              f"{merged.latency.percentile(50) / 1000:>8.1f} {merged.latency.percentile(99) / 1000:>8.1f} "
+              f"{merged.service.percentile(99) / 1000:>8.1f} {merged.latency.max / 1000:>8.1f}")
+
+
+def stage_durations(profile):
+    """Seconds of schedule that belong to each stage label"""
+    durations, tick, t = {}, 0.05, 0.0
+    while t < profile.duration:
+        label = profile.stage(t)
+        durations[label] = durations.get(label, 0.0) + tick
+        t += tick
+    return durations
+
+
+def add_common_arguments(parser):
+    parser.add_argument('--scenarios', default='all',
+                        help="Comma separated scenarios or groups (%s)" % ', '.join(scenarios.GROUPS))
+    parser.add_argument('--duration', type=float, default=None, help="Run time in seconds")
+    parser.add_argument('--pool-size', type=int, default=100, help="Max pooled keep-alive connections")
+    parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument('--progress-interval', type=float, default=5, help="Seconds between progress lines")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't create test_items / test-bucket")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Worker processes, each with its own event loop (load is split evenly)")
+    parser.add_argument('--workload', default=None, help="Workload file with a weighted mix (replaces --scenarios)")
+    results.add_arguments(parser)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supabase load generator")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    closed = modes.add_parser('closed', help="N concurrent workers, each sending back-to-back")
+    add_common_arguments(closed)
+    closed.add_argument('--concurrency', type=int, default=10, help="Concurrent workers")
+    closed.add_argument('--requests', type=int, default=None, help="Total scenario steps (instead of --duration)")
+    closed.add_argument('--expected-interval-ms', type=float, default=None,
+                        help="Correct for coordinated omission assuming one send per worker every N ms")
+
+    open_mode = modes.add_parser('open', help="Constant arrival rate, independent of response times")
+    add_common_arguments(open_mode)
+    open_mode.add_argument('--profile', choices=['constant', 'step', 'linear', 'spike'], default='constant')
+    open_mode.add_argument('--rate', type=float, default=10, help="Start (or constant / base) rate in req/s")
+    open_mode.add_argument('--max-in-flight', type=int, default=1000,
+                           help="Cap on concurrent requests; queued requests keep their scheduled start")
+    open_mode.add_argument('--step-rate', type=float, default=10, help="step: rate added per step")
+    open_mode.add_argument('--step-duration', type=float, default=30, help="step: seconds per step")
+    open_mode.add_argument('--steps', type=int, default=5, help="step: number of steps")
+    open_mode.add_argument('--to-rate', type=float, default=100, help="linear: final rate")
+    open_mode.add_argument('--window', type=float, default=10, help="linear: report window in seconds")
+    open_mode.add_argument('--peak-rate', type=float, default=100, help="spike: burst rate")
+    open_mode.add_argument('--spike-at', type=float, default=30, help="spike: seconds before the burst")
+    open_mode.add_argument('--spike-duration', type=float, default=10, help="spike: burst length in seconds")
+
+    run = modes.add_parser('run', help="Run a workload file (workloads/*.yaml); later options override it")
+    run.add_argument('workload_file')
+    run.add_argument('overrides', nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+    if args.mode == 'run':
+        args = parser.parse_args(workload.Workload(args.workload_file).arguments() + args.overrides)
+    Config().validate()
+    if args.mode == 'closed':
+        if not args.duration and not args.requests:
+            args.duration = 30
+        print_banner('closed', args)
+        stats = execute('closed', args)
+        report_closed(stats)
+        results.save('loadgen-closed', args, {'run': stats}, url=Config().url)
+    elif args.mode == 'open':
+        if not args.duration:
+            args.duration = 60
+        print_banner('open', args)
+        stages, sent, peak = execute('open', args)
+        report_open(args, stages, sent, peak)
+        series = {label: stats for label, (rate, stats) in stages.items()}
+        series['run'] = runner.merge_stages(stages)
+        results.save('loadgen-open', args, series, url=Config().url, extra={
+            "sent": sent, "peak": peak, "stage_rates": {label: rate for label, (rate, _) in stages.items()}
+        })
+
+
+if __name__ == "__main__":
+    main()
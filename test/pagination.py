@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Streaming paginated iterators for the Supabase admin and storage APIs
+- iter_users walks /auth/v1/admin/users page by page (?page=&per_page=)
+- iter_storage_objects walks /storage/v1/object/list/<bucket> (limit/offset)
+- At most the current page and one prefetched page are held in memory
+- Callers can stop early: the generator just stops requesting pages
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def iter_pages(fetch_page, page_size, prefetch=True):
+    """Yield pages from fetch_page(index) until a short or empty page.
+
+    With prefetch the next page is requested in a background thread while
+    the caller works through the current one.
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        index = 0
+        future = pool.submit(fetch_page, index)
+        while True:
+            page = future.result()
+            full = len(page) >= page_size
+            if full and prefetch:
+                future = pool.submit(fetch_page, index + 1)
+            if page:
+                yield page
+            if not full:
+                return
+            index += 1
+            if not prefetch:
+                future = pool.submit(fetch_page, index)
+
+
+def _service_session(service_key):
+    session = requests.Session()
+    session.headers.update({
+        'apikey': service_key,
+        'Authorization': f'Bearer {service_key}',
+        'Content-Type': 'application/json'
+    })
+    return session
+
+
+def iter_user_pages(supabase_url, service_key, per_page=100, prefetch=True, timeout=10):
+    """Pages (lists) of users from the GoTrue admin API"""
+    session = _service_session(service_key)
+
+    def fetch(index):
+        response = session.get(f"{supabase_url}/auth/v1/admin/users",
+                               params={'page': index + 1, 'per_page': per_page}, timeout=timeout)
+        response.raise_for_status()
+        return response.json().get('users', [])
+
+    with session:
+        yield from iter_pages(fetch, per_page, prefetch=prefetch)
+
+
+def iter_users(supabase_url, service_key, per_page=100, prefetch=True, timeout=10):
+    """Users from the GoTrue admin API, one at a time"""
+    for page in iter_user_pages(supabase_url, service_key, per_page=per_page, prefetch=prefetch, timeout=timeout):
+        yield from page
+
+
+def iter_storage_pages(supabase_url, service_key, bucket, prefix="", limit=100, prefetch=True, timeout=10):
+    """Pages (lists) of objects under prefix in a storage bucket, sorted by name"""
+    session = _service_session(service_key)
+
+    def fetch(index):
+        response = session.post(f"{supabase_url}/storage/v1/object/list/{bucket}", json={
+            "prefix": prefix,
+            "limit": limit,
+            "offset": index * limit,
+            "sortBy": {"column": "name", "order": "asc"}
+        }, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    with session:
+        yield from iter_pages(fetch, limit, prefetch=prefetch)
+
+
+def iter_storage_objects(supabase_url, service_key, bucket, prefix="", limit=100, prefetch=True, timeout=10):
+    """Objects under prefix in a storage bucket, one at a time"""
+    for page in iter_storage_pages(supabase_url, service_key, bucket, prefix=prefix, limit=limit,
+                                   prefetch=prefetch, timeout=timeout):
+        yield from page
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Page-size benchmark for the paginated listing helpers
+- Walks admin users and storage objects with several page sizes
+- With and without prefetching the next page
+- Reports wall time, pages, items/s, time to first item and peak Python memory
+- Per-page wait times go to the results file (results.py)
+
+Usage:
+    python paging_bench.py --target users --page-sizes 50,200,1000
+    python paging_bench.py --target storage --prefix bench- --max-items 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import results
+from harness import Config
+from pagination import iter_storage_pages, iter_user_pages
+from scenarios import TEST_BUCKET
+from stats import RunStats
+
+
+def walk(pages, max_items=None, stats=None):
+    """Consume pages; returns (items, pages, first item seconds, total seconds).
+
+    With stats, the wait for each page (as seen by the consumer, so prefetched
+    pages are fast) is recorded under the 'pages' endpoint.
+    """
+    start = last = time.perf_counter()
+    first, items, count = None, 0, 0
+    for page in pages:
+        now = time.perf_counter()
+        if first is None:
+            first = now - start
+        if stats is not None:
+            stats.record('pages', now - last, True)
+        last = now
+        count += 1
+        items += len(page)
+        if max_items and items >= max_items:
+            pages.close()
+            break
+    return items, count, first or 0.0, time.perf_counter() - start
+
+
+def run_case(make_pages, max_items, stats=None):
+    tracemalloc.start()
+    try:
+        items, pages, first, total = walk(make_pages(), max_items, stats)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return items, pages, first, total, peak
+
+
+def case_name(target, size, prefetch):
+    return f"{target} page {size}{' prefetch' if prefetch else ''}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page sizes for paginated listings")
+    parser.add_argument('--target', choices=['users', 'storage', 'both'], default='both')
+    parser.add_argument('--page-sizes', default='50,100,500,1000', help="Comma separated page sizes")
+    parser.add_argument('--max-items', type=int, default=None, help="Stop after this many items")
+    parser.add_argument('--bucket', default=TEST_BUCKET)
+    parser.add_argument('--prefix', default="", help="Storage prefix to list")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    config = Config()
+    config.validate()
+    page_sizes = [int(size) for size in args.page_sizes.split(',') if size.strip()]
+    targets = ['users', 'storage'] if args.target == 'both' else [args.target]
+
+    print("🚀 Starting pagination benchmark")
+    print(f"URL: {config.url}")
+    print("-" * 50)
+
+    rows, series = [], {}
+    for target in targets:
+        for size in page_sizes:
+            for prefetch in (False, True):
+                if target == 'users':
+                    make_pages = lambda: iter_user_pages(config.url, config.service_key,
+                                                         per_page=size, prefetch=prefetch)
+                else:
+                    make_pages = lambda: iter_storage_pages(config.url, config.service_key, args.bucket,
+                                                            prefix=args.prefix, limit=size, prefetch=prefetch)
+                stats = RunStats()
+                try:
+                    rows.append((target, size, prefetch) + run_case(make_pages, args.max_items, stats))
+                except Exception as e:
+                    print(f"❌ {target} page size {size}: {e}")
+                    continue
+                stats.finish()
+                series[case_name(target, size, prefetch)] = stats
+
+    print("\n" + "=" * 96)
+    print("📊 PAGINATION SUMMARY")
+    print("=" * 96)
+    print(f"{'Target':<8} {'page':>6} {'prefetch':>9} {'items':>9} {'pages':>6} {'first ms':>9} "
+          f"{'total s':>8} {'items/s':>10} {'peak KB':>9}")
+    print("-" * 96)
+    for target, size, prefetch, items, pages, first, total, peak in rows:
+        print(f"{target:<8} {size:>6} {'yes' if prefetch else 'no':>9} {items:>9} {pages:>6} "
+              f"{first * 1000:>9.1f} {total:>8.2f} {items / total if total else 0:>10.0f} {peak / 1024:>9.0f}")
+
+    results.save('paging-bench', args, series, url=config.url, extra={
+        case_name(target, size, prefetch): {"items": items, "pages": pages, "first": first, "total": total,
+                                            "peak_bytes": peak}
+        for target, size, prefetch, items, pages, first, total, peak in rows
+    })
+
+
+if __name__ == "__main__":
+    main()
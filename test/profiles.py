@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Arrival-rate profiles for the open-loop load generator
+Each profile gives the target rate (req/s) at t seconds into the run and a
+stage label, so results can be reported per rate level to find the knee.
+Labels don't contain the rate, so workers running a share of the rate
+(--processes) produce the same labels as the whole run.
+"""
+
+import math
+
+
+class ConstantRate:
+    def __init__(self, rate, duration):
+        self.start_rate = rate
+        self.duration = duration
+
+    def rate(self, t):
+        return self.start_rate
+
+    def stage(self, t):
+        return "constant"
+
+
+class StepRate:
+    """rate, rate + step, rate + 2*step ... each held for step_duration seconds"""
+
+    def __init__(self, rate, step_rate, step_duration, steps):
+        self.start_rate = rate
+        self.step_rate = step_rate
+        self.step_duration = step_duration
+        self.steps = steps
+        self.duration = step_duration * steps
+
+    def rate(self, t):
+        step = min(int(t // self.step_duration), self.steps - 1)
+        return self.start_rate + step * self.step_rate
+
+    def stage(self, t):
+        step = min(int(t // self.step_duration), self.steps - 1)
+        return f"step {step + 1}"
+
+
+class LinearRate:
+    """Ramp linearly from rate to to_rate, reported in fixed windows"""
+
+    def __init__(self, rate, to_rate, duration, window=10):
+        self.start_rate = rate
+        self.to_rate = to_rate
+        self.duration = duration
+        self.window = window
+
+    def rate(self, t):
+        fraction = min(max(t / self.duration, 0.0), 1.0)
+        return self.start_rate + (self.to_rate - self.start_rate) * fraction
+
+    def stage(self, t):
+        window_start = int(t // self.window) * self.window
+        window_end = min(window_start + self.window, self.duration)
+        return f"{window_start:g}-{window_end:g}s"
+
+
+class SpikeRate:
+    """Base rate with a burst to peak_rate between spike_at and spike_at + spike_duration"""
+
+    def __init__(self, rate, peak_rate, duration, spike_at, spike_duration):
+        self.start_rate = rate
+        self.peak_rate = peak_rate
+        self.duration = duration
+        self.spike_at = spike_at
+        self.spike_duration = spike_duration
+
+    def _phase(self, t):
+        if t < self.spike_at:
+            return 0
+        if t < self.spike_at + self.spike_duration:
+            return 1
+        return 2
+
+    def rate(self, t):
+        return self.peak_rate if self._phase(t) == 1 else self.start_rate
+
+    def stage(self, t):
+        return ["before spike", "spike", "after spike"][self._phase(t)]
+
+
+class WindowedStep:
+    """rate for baseline seconds, peak_rate for hold, back to rate for cooldown; stages are fixed windows.
+
+    Used by autoscale_bench.py, which assigns the windows to scale-out phases after the run.
+    """
+
+    def __init__(self, rate, peak_rate, baseline, hold, cooldown=0.0, window=5.0):
+        self.start_rate = rate
+        self.peak_rate = peak_rate
+        self.step_at = baseline
+        self.hold = hold
+        self.duration = baseline + hold + cooldown
+        self.window = window
+
+    def rate(self, t):
+        return self.peak_rate if self.step_at <= t < self.step_at + self.hold else self.start_rate
+
+    def stage(self, t):
+        # Windows are aligned to the step, so none straddles it
+        start = self.step_at + math.floor((t - self.step_at) / self.window) * self.window
+        return f"{max(0.0, start):g}"
+
+
+def from_args(args):
+    """Build a profile from the loadgen.py open-mode arguments"""
+    if args.profile == 'constant':
+        return ConstantRate(args.rate, args.duration)
+    if args.profile == 'step':
+        return StepRate(args.rate, args.step_rate, args.step_duration, args.steps)
+    if args.profile == 'linear':
+        return LinearRate(args.rate, args.to_rate, args.duration, window=args.window)
+    if args.profile == 'spike':
+        return SpikeRate(args.rate, args.peak_rate, args.duration,
+                         spike_at=args.spike_at, spike_duration=args.spike_duration)
+    raise SystemExit(f"❌ Unknown profile '{args.profile}'")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+PostgREST Query-Shape Benchmark
+Seeds test_items (test/sql/bench_queries.sql) and times a set of read shapes:
+- filters:     equality on name, range on id (indexed) and created_at (not)
+- ordering:    order on an unindexed column, offset vs keyset pagination deep in the table
+- embedding:   test_items with their test_item_tags
+- counting:    Prefer: count=exact | planned | estimated
+- projection:  select=* vs select=id,name
+- format:      JSON vs CSV (Accept: text/csv)
+
+For every shape the equivalent SQL is explained through the bench_explain RPC
+and the report flags sequential scans and full-table counts.
+
+Usage:
+    python query_bench.py --rows 100000 --iterations 50
+    python query_bench.py --shapes offset-deep,keyset-deep --analyze
+"""
+
+import argparse
+import asyncio
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import results
+import scenarios
+from harness import Config, HarnessClient
+from stats import RunStats
+
+TABLE_PATH = '/rest/v1/test_items'
+PAGE = 50
+# Seq Scans on smaller relations than this are not worth flagging
+SEQ_SCAN_ROWS = 1000
+
+
+class Shape:
+    """One PostgREST request plus the SQL it roughly turns into"""
+
+    def __init__(self, name, query, sql=None, headers=None):
+        self.name = name
+        self.query = query
+        self.sql = sql
+        self.headers = headers or {}
+        self.total = None
+        self.plan = None
+
+
+def build_shapes(rows, depth_row):
+    """Shapes for a table of rows rows; depth_row is the row 90% of the way through it"""
+    depth = int(rows * 0.9)
+    depth_id, name = depth_row['id'], depth_row['name']
+    day = date.today() - timedelta(days=30)
+    return [
+        Shape('eq-name', f"select=*&name=eq.{quote(name)}",
+              f"SELECT * FROM test_items WHERE name = '{name}'"),
+        Shape('range-id', f"select=*&id=gte.{depth_id}&id=lt.{depth_id + 100}",
+              f"SELECT * FROM test_items WHERE id >= {depth_id} AND id < {depth_id + 100}"),
+        Shape('range-created-at', f"select=*&created_at=gte.{day}&created_at=lt.{day + timedelta(days=1)}",
+              f"SELECT * FROM test_items WHERE created_at >= '{day}' AND created_at < '{day + timedelta(days=1)}'"),
+        Shape('order-created-at', f"select=*&order=created_at.desc&limit={PAGE}",
+              f"SELECT * FROM test_items ORDER BY created_at DESC LIMIT {PAGE}"),
+        Shape('offset-deep', f"select=id,name&order=id&limit={PAGE}&offset={depth}",
+              f"SELECT id, name FROM test_items ORDER BY id LIMIT {PAGE} OFFSET {depth}"),
+        Shape('keyset-deep', f"select=id,name&order=id&id=gt.{depth_id}&limit={PAGE}",
+              f"SELECT id, name FROM test_items WHERE id > {depth_id} ORDER BY id LIMIT {PAGE}"),
+        Shape('embed-tags', f"select=id,name,test_item_tags(tag)&order=id&limit={PAGE}",
+              "SELECT i.id, i.name, (SELECT json_agg(t.tag) FROM test_item_tags t WHERE t.item_id = i.id) "
+              f"FROM test_items i ORDER BY i.id LIMIT {PAGE}"),
+        Shape('count-exact', "select=id&limit=1", "SELECT count(*) FROM test_items",
+              headers={'Prefer': 'count=exact'}),
+        # planned/estimated only read planner statistics, there is no count query to explain
+        Shape('count-planned', "select=id&limit=1", headers={'Prefer': 'count=planned'}),
+        Shape('count-estimated', "select=id&limit=1", headers={'Prefer': 'count=estimated'}),
+        Shape('select-all-1000', "select=*&order=id&limit=1000",
+              "SELECT * FROM test_items ORDER BY id LIMIT 1000"),
+        Shape('select-id-name-1000', "select=id,name&order=id&limit=1000",
+              "SELECT id, name FROM test_items ORDER BY id LIMIT 1000"),
+        Shape('csv-1000', "select=*&order=id&limit=1000",
+              "SELECT * FROM test_items ORDER BY id LIMIT 1000", headers={'Accept': 'text/csv'}),
+    ]
+
+
+def plan_nodes(node):
+    """Depth-first walk over an EXPLAIN (FORMAT JSON) plan tree"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def plan_warnings(shape):
+    if not shape.plan:
+        return []
+    warnings = []
+    for node in plan_nodes(shape.plan['Plan']):
+        rows = node.get('Actual Rows', node.get('Plan Rows', 0)) * node.get('Actual Loops', 1)
+        scanned = rows + node.get('Rows Removed by Filter', 0)
+        if node['Node Type'] == 'Seq Scan' and (scanned >= SEQ_SCAN_ROWS or node.get('Plan Rows', 0) >= SEQ_SCAN_ROWS):
+            where = " with filter" if 'Filter' in node else ""
+            warnings.append(f"Seq Scan on {node.get('Relation Name')}{where}")
+        if node['Node Type'] == 'Sort' and node.get('Plan Rows', 0) >= SEQ_SCAN_ROWS:
+            warnings.append(f"Sort over {node['Plan Rows']} rows")
+    if shape.headers.get('Prefer') == 'count=exact' and warnings:
+        warnings.insert(0, "count=exact scans the whole result set")
+    return warnings
+
+
+class QueryBench:
+    def __init__(self, client, iterations, concurrency):
+        self.client = client
+        self.iterations = iterations
+        self.concurrency = concurrency
+
+    async def rpc(self, name, body):
+        result = await self.client.request(f'setup: rpc {name}', 'POST', f'/rest/v1/rpc/{name}',
+                                           service=True, json=body)
+        return result.json() if result and result.status == 200 else None
+
+    async def table_rows(self):
+        """Exact test_items row count, or None when the probe fails"""
+        result = await self.client.request('setup: GET /rest/v1/test_items', 'GET', f"{TABLE_PATH}?select=id&limit=1",
+                                           service=True, ok=(200, 206), headers={'Prefer': 'count=exact'})
+        total = result.headers.get('Content-Range', '*').rpartition('/')[2] if result else '*'
+        return None if total == '*' else int(total)
+
+    async def depth_row(self, rows):
+        """id and name of the row 90% of the way through the table, the starting point for keyset pages"""
+        result = await self.client.request('setup: GET /rest/v1/test_items', 'GET',
+                                           f"{TABLE_PATH}?select=id,name&order=id&limit=1&offset={int(rows * 0.9)}",
+                                           service=True)
+        page = result.json() if result and result.status == 200 else []
+        return page[0] if page else {"id": 1, "name": "Bench Item 1"}
+
+    async def fetch(self, shape, endpoint=None):
+        result = await self.client.request(endpoint or shape.name, 'GET', f"{TABLE_PATH}?{shape.query}",
+                                           service=True, ok=(200, 206), headers=shape.headers)
+        if result and 'Content-Range' in result.headers:
+            total = result.headers['Content-Range'].rpartition('/')[2]
+            shape.total = None if total == '*' else int(total)
+
+    async def time_shape(self, shape, warmup):
+        for _ in range(warmup):
+            await self.fetch(shape, endpoint=f'setup: warmup {shape.name}')
+        remaining = iter(range(self.iterations))
+
+        async def worker():
+            for _ in remaining:
+                await self.fetch(shape)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def explain(self, shape, analyze):
+        if shape.sql:
+            plan = await self.rpc('bench_explain', {"query": shape.sql, "with_analyze": analyze})
+            shape.plan = plan[0] if plan else None
+
+
+async def run(args):
+    config = Config()
+    config.validate()
+
+    print("🚀 Starting PostgREST query-shape benchmark")
+    print(f"URL: {config.url}")
+    print(f"Rows: {args.rows}  Iterations: {args.iterations}  Concurrency: {args.concurrency}")
+    print("-" * 50)
+
+    stats = RunStats()
+    async with HarnessClient(config, stats=stats, pool_size=max(args.concurrency, 10), timeout=args.timeout) as client:
+        bench = QueryBench(client, args.iterations, args.concurrency)
+        rows = None
+        if not args.skip_setup:
+            await scenarios.setup(client)
+            await scenarios.install_sql(client, 'bench_queries.sql')
+            rows = await bench.rpc('bench_seed_items', {"target": args.rows})
+            print(f"🌱 test_items rows: {rows if rows is not None else 'unknown (seed RPC failed)'}")
+        # Size the shapes from the real table: it may hold more rows than --rows (e.g. after seed.py)
+        if rows is None:
+            rows = await bench.table_rows()
+            print(f"📏 test_items rows: {rows if rows is not None else f'unknown, assuming --rows {args.rows}'}")
+        rows = args.rows if rows is None else rows
+
+        shapes = build_shapes(rows, await bench.depth_row(rows))
+        if args.shapes:
+            wanted = [name.strip() for name in args.shapes.split(',') if name.strip()]
+            unknown = set(wanted) - {shape.name for shape in shapes}
+            if unknown:
+                raise SystemExit(f"❌ Unknown shape(s) {', '.join(sorted(unknown))}. "
+                                 f"Available: {', '.join(shape.name for shape in shapes)}")
+            shapes = [shape for shape in shapes if shape.name in wanted]
+
+        for shape in shapes:
+            print(f"🔎 {shape.name}...")
+            await bench.time_shape(shape, args.warmup)
+            await bench.explain(shape, args.analyze)
+
+    stats.finish()
+    print_report(shapes, stats)
+    results.save('query-bench', args, {'run': stats}, url=config.url, extra={
+        shape.name: {"total": shape.total, "warnings": plan_warnings(shape),
+                     "cost": shape.plan['Plan']['Total Cost'] if shape.plan else None}
+        for shape in shapes
+    })
+    return shapes, stats
+
+
+def print_report(shapes, stats):
+    print("\n" + "=" * 100)
+    print("📊 QUERY-SHAPE SUMMARY")
+    print("=" * 100)
+    print(f"{'Shape':<22} {'reqs':>6} {'err%':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'KB/resp':>8} {'count':>9}  {'plan cost':>10}")
+    print("-" * 100)
+    for shape in shapes:
+        s = stats.endpoints.get(shape.name)
+        if not s:
+            continue
+        h = s.latency
+        count = f"{shape.total:>9}" if shape.total is not None else f"{'-':>9}"
+        cost = f"{shape.plan['Plan']['Total Cost']:>10.0f}" if shape.plan else f"{'n/a':>10}"
+        print(f"{shape.name:<22} {s.requests:>6} {s.error_rate * 100:>6.2f}% {h.percentile(50) / 1000:>8.1f} "
+              f"{h.percentile(90) / 1000:>8.1f} {h.percentile(99) / 1000:>8.1f} "
+              f"{s.bytes / s.requests / 1024 if s.requests else 0:>8.1f} {count}  {cost}")
+
+    flagged = [(shape.name, plan_warnings(shape)) for shape in shapes]
+    flagged = [(name, warnings) for name, warnings in flagged if warnings]
+    if flagged:
+        print("\n⚠️  Plan warnings (equivalent SQL via bench_explain):")
+        for name, warnings in flagged:
+            print(f"   {name:<22} {'; '.join(warnings)}")
+    elif not any(shape.plan for shape in shapes):
+        print("\n💡 No plans captured: install test/sql/bench_queries.sql for the bench_explain RPC")
+    else:
+        print("\n✅ No sequential scans or large sorts in the captured plans")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PostgREST query-shape benchmark")
+    parser.add_argument('--rows', type=int, default=100000,
+                        help="Seed test_items up to this many rows; shapes are sized from the actual table")
+    parser.add_argument('--iterations', type=int, default=30, help="Timed requests per shape")
+    parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per shape")
+    parser.add_argument('--concurrency', type=int, default=1, help="Requests in flight per shape")
+    parser.add_argument('--shapes', default=None, help="Comma separated subset of shape names")
+    parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE instead of plain EXPLAIN")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't install SQL or seed rows")
+    results.add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
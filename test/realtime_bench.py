@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Realtime Websocket Fan-out Benchmark
+- Opens thousands of websocket subscribers across one or more processes
+- Subscribers join postgres_changes on test_items (or a broadcast channel)
+- Once every subscriber has joined, writes are sent through PostgREST (or the
+  broadcast REST API) carrying their send time
+- Reports connection setup rate and latency, client memory per connection,
+  delivery ratio, end-to-end delivery latency and drops during the run
+
+Send and receive timestamps come from the same host's wall clock, so the
+publisher and all subscriber processes must run on one machine.
+
+Usage:
+    python realtime_bench.py --subscribers 2000 --processes 4 --messages 100 --rate 10
+    python realtime_bench.py --mode broadcast --channels 10 --subscribers 5000 --processes 8
+    python realtime_bench.py --subscribers 1000 --hold 400 --heartbeat 0   # probe the ALB idle timeout
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import time
+import uuid
+
+import aiohttp
+
+import results
+import scenarios
+from distributed import share
+from harness import Config, HarnessClient
+from stats import LatencyHistogram, RunStats
+
+EVENT_NAME = 'bench'
+
+
+def rss_bytes():
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def raise_file_limit():
+    """Thousands of sockets per process need more than the usual 1024 descriptors"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def websocket_url(config):
+    base = config.url.replace('https://', 'wss://', 1).replace('http://', 'ws://', 1)
+    return f"{base}/realtime/v1/websocket?apikey={config.anon_key}&vsn=1.0.0"
+
+
+def join_message(args, channel, ref, token):
+    if args.mode == 'postgres':
+        config = {"postgres_changes": [{
+            "event": "INSERT", "schema": "public", "table": "test_items",
+            "filter": f"name=eq.{args.run_name}"
+        }]}
+    else:
+        config = {"broadcast": {"self": False}}
+    return {"topic": f"realtime:{channel}", "event": "phx_join", "ref": str(ref),
+            "payload": {"config": config, "access_token": token}}
+
+
+def sent_at(message):
+    """Send timestamp carried by a postgres_changes or broadcast message, or None"""
+    event = message.get('event')
+    payload = message.get('payload') or {}
+    if event == 'postgres_changes':
+        record = (payload.get('data') or {}).get('record') or {}
+        try:
+            return float(record.get('description'))
+        except (TypeError, ValueError):
+            return None
+    if event == 'broadcast' and payload.get('event') == EVENT_NAME:
+        return (payload.get('payload') or {}).get('sent')
+    return None
+
+
+class Subscribers:
+    """All websocket subscribers of one process"""
+
+    def __init__(self, args, count, offset, token):
+        self.args = args
+        self.token = token
+        self.count = count
+        self.offset = offset
+        self.sockets = []
+        self.connect = LatencyHistogram()
+        self.delivery = LatencyHistogram()
+        self.failed = 0
+        self.received = 0
+        self.ref = 0
+
+    def next_ref(self):
+        self.ref += 1
+        return self.ref
+
+    async def open_one(self, session, url, number):
+        channel = f"{self.args.run_name}-{number % self.args.channels}"
+        start = time.perf_counter()
+        try:
+            ws = await session.ws_connect(url, heartbeat=None, autoping=True, max_msg_size=0)
+            ref = str(self.next_ref())
+            await ws.send_json(join_message(self.args, channel, ref, self.token))
+            while True:
+                message = await asyncio.wait_for(ws.receive_json(), timeout=self.args.join_timeout)
+                if message.get('event') == 'phx_reply' and message.get('ref') == ref:
+                    break
+            if (message.get('payload') or {}).get('status') != 'ok':
+                await ws.close()
+                raise RuntimeError(f"join refused: {message.get('payload')}")
+        except Exception:
+            self.failed += 1
+            return None
+        self.connect.record((time.perf_counter() - start) * 1_000_000)
+        return ws
+
+    async def open_all(self, session, url, rate):
+        """Open count sockets at up to rate new connections per second"""
+        interval = 1 / rate if rate else 0
+        started = time.perf_counter()
+        tasks = []
+        for i in range(self.count):
+            if interval:
+                delay = started + i * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.open_one(session, url, self.offset + i)))
+        self.sockets = [ws for ws in await asyncio.gather(*tasks) if ws is not None]
+        return time.perf_counter() - started
+
+    async def listen(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            sent = sent_at(json.loads(msg.data))
+            if sent is not None:
+                self.delivery.record(max(time.time() - sent, 0) * 1_000_000)
+                self.received += 1
+
+    async def heartbeat(self):
+        while self.args.heartbeat:
+            await asyncio.sleep(self.args.heartbeat)
+            for ws in self.sockets:
+                if not ws.closed:
+                    try:
+                        await ws.send_json({"topic": "phoenix", "event": "heartbeat", "payload": {},
+                                            "ref": str(self.next_ref())})
+                    except ConnectionError:
+                        pass
+
+
+async def subscribe(args, count, offset, index, reports, stop):
+    raise_file_limit()
+    config = Config()
+    subscribers = Subscribers(args, count, offset, config.anon_key)
+    url = websocket_url(config)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as session:
+        rss_before = rss_bytes()
+        seconds = await subscribers.open_all(session, url, args.connect_rate / args.processes)
+        rss_after = rss_bytes()
+        reports.put(('ready', index, {
+            "connected": len(subscribers.sockets),
+            "failed": subscribers.failed,
+            "seconds": seconds,
+            "connect": subscribers.connect,
+            "rss_per_connection": (rss_after - rss_before) / max(len(subscribers.sockets), 1),
+        }))
+
+        listeners = [asyncio.create_task(subscribers.listen(ws)) for ws in subscribers.sockets]
+        heartbeat = asyncio.create_task(subscribers.heartbeat())
+        while not stop.is_set():
+            await asyncio.sleep(0.2)
+        still_open = sum(1 for ws in subscribers.sockets if not ws.closed)
+        heartbeat.cancel()
+        for ws in subscribers.sockets:
+            await ws.close()
+        await asyncio.gather(*listeners, heartbeat, return_exceptions=True)
+
+    reports.put(('final', index, {
+        "received": subscribers.received,
+        "delivery": subscribers.delivery,
+        "dropped": len(subscribers.sockets) - still_open,
+    }))
+
+
+def _subscriber_worker(args, count, offset, index, reports, stop):
+    try:
+        asyncio.run(subscribe(args, count, offset, index, reports, stop))
+    except BaseException as e:
+        reports.put(('failed', index, f"{type(e).__name__}: {e}"))
+
+
+async def publish(args):
+    """Send args.messages writes at args.rate per second, each stamped with its send time"""
+    config = Config()
+    async with HarnessClient(config, pool_size=20, timeout=args.timeout) as client:
+        interval = 1 / args.rate
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.messages):
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(publish_one(client, args)))
+        await asyncio.gather(*tasks)
+    return client.stats
+
+
+async def publish_one(client, args):
+    if args.mode == 'postgres':
+        await client.request('POST /rest/v1/test_items', 'POST', '/rest/v1/test_items',
+                             service=True, ok=(200, 201), headers={'Prefer': 'return=minimal'},
+                             json={"name": args.run_name, "description": repr(time.time())})
+    else:
+        sent = time.time()
+        await client.request('POST /realtime/v1/api/broadcast', 'POST', '/realtime/v1/api/broadcast',
+                             service=True, ok=(200, 202), json={"messages": [
+                                 {"topic": f"{args.run_name}-{channel}", "event": EVENT_NAME,
+                                  "payload": {"sent": sent}}
+                                 for channel in range(args.channels)
+                             ]})
+
+
+async def setup(args):
+    config = Config()
+    async with HarnessClient(config) as client:
+        await scenarios.setup(client)
+        if args.mode == 'postgres':
+            await scenarios.install_sql(client, 'bench_realtime.sql')
+
+
+async def cleanup(args):
+    config = Config()
+    async with HarnessClient(config) as client:
+        await client.request('DELETE /rest/v1/test_items', 'DELETE', f'/rest/v1/test_items?name=eq.{args.run_name}',
+                             service=True, ok=(200, 204))
+
+
+def collect(reports, workers, kind, expected, timeout):
+    """Wait for one kind of message from every worker; failures are reported and skipped"""
+    collected, deadline = {}, time.monotonic() + timeout
+    while len(collected) < expected and time.monotonic() < deadline:
+        try:
+            message_kind, index, payload = reports.get(timeout=0.5)
+        except queue_module.Empty:
+            if not any(process.is_alive() for process in workers):
+                break
+            continue
+        if message_kind == 'failed':
+            print(f"❌ Subscriber process {index} failed: {payload}")
+            expected -= 1
+        elif message_kind == kind:
+            collected[index] = payload
+    return collected
+
+
+def run(args):
+    config = Config()
+    config.validate()
+    args.run_name = f"realtime-bench-{uuid.uuid4().hex[:8]}"
+
+    print("🚀 Starting realtime fan-out benchmark")
+    print(f"URL: {config.url}")
+    print(f"Mode: {args.mode}  Subscribers: {args.subscribers}  Channels: {args.channels}  "
+          f"Processes: {args.processes}")
+    print("-" * 50)
+
+    if not args.skip_setup:
+        asyncio.run(setup(args))
+
+    context = multiprocessing.get_context('spawn')
+    reports, stop = context.Queue(), context.Event()
+    workers, offset = [], 0
+    for i in range(args.processes):
+        count = share(args.subscribers, args.processes, i)
+        workers.append(context.Process(target=_subscriber_worker,
+                                       args=(args, count, offset, i, reports, stop), daemon=True))
+        offset += count
+    for process in workers:
+        process.start()
+
+    print(f"🔌 Opening {args.subscribers} connections...")
+    ready = collect(reports, workers, 'ready', args.processes, args.connect_timeout)
+    connected = sum(r['connected'] for r in ready.values())
+    print(f"✅ {connected} subscribed, {sum(r['failed'] for r in ready.values())} failed")
+
+    publish_stats = None
+    if connected:
+        if args.hold:
+            print(f"⏸️  Holding idle connections for {args.hold:.0f}s (heartbeat every {args.heartbeat or 'never'}s)")
+            time.sleep(args.hold)
+        print(f"📣 Publishing {args.messages} messages at {args.rate}/s...")
+        publish_stats = asyncio.run(publish(args))
+        time.sleep(args.drain)
+    stop.set()
+    finals = collect(reports, workers, 'final', len(ready), 30)
+    for process in workers:
+        process.join(timeout=5)
+
+    if not args.skip_setup and args.mode == 'postgres':
+        asyncio.run(cleanup(args))
+
+    connect, delivery = print_report(args, ready, finals, publish_stats)
+    results.save('realtime-bench', args, {
+        'run': results.from_histograms(connect=connect, delivery=delivery),
+        'publish': publish_stats or RunStats(),
+    }, url=config.url, extra={
+        "connected": sum(r['connected'] for r in ready.values()),
+        "failed": sum(r['failed'] for r in ready.values()),
+        "received": sum(f['received'] for f in finals.values()),
+        "dropped": sum(f['dropped'] for f in finals.values()),
+        "rss_per_connection": [r['rss_per_connection'] for r in ready.values()],
+    })
+
+
+def print_report(args, ready, finals, publish_stats):
+    connect = LatencyHistogram()
+    delivery = LatencyHistogram()
+    for r in ready.values():
+        connect.merge(r['connect'])
+    for f in finals.values():
+        delivery.merge(f['delivery'])
+    connected = sum(r['connected'] for r in ready.values())
+    failed = sum(r['failed'] for r in ready.values())
+    setup_seconds = max((r['seconds'] for r in ready.values()), default=0)
+    memory = [r['rss_per_connection'] for r in ready.values() if r['connected']]
+    received = sum(f['received'] for f in finals.values())
+    dropped = sum(f['dropped'] for f in finals.values())
+    sent = publish_stats.total_requests - publish_stats.total_errors if publish_stats else 0
+    # Every subscriber should see every row (postgres) or message (broadcast goes to all channels)
+    expected = sent * connected
+
+    print("\n" + "=" * 80)
+    print("📊 REALTIME FAN-OUT SUMMARY")
+    print("=" * 80)
+    print(f"🔌 Connections: {connected} ok, {failed} failed in {setup_seconds:.1f}s "
+          f"({connected / setup_seconds if setup_seconds else 0:.0f}/s)")
+    print(f"   connect+join ms  p50 {connect.percentile(50) / 1000:.1f}  p99 {connect.percentile(99) / 1000:.1f}  "
+          f"max {connect.max / 1000:.1f}")
+    if memory:
+        print(f"💾 Client memory: {sum(memory) / len(memory) / 1024:.1f} KB RSS per connection")
+    print(f"📣 Published: {sent} ok of {args.messages}")
+    print(f"📬 Delivered: {received} of {expected} expected "
+          f"({received / expected * 100 if expected else 0:.2f}%)")
+    print(f"   delivery ms  p50 {delivery.percentile(50) / 1000:.1f}  p90 {delivery.percentile(90) / 1000:.1f}  "
+          f"p99 {delivery.percentile(99) / 1000:.1f}  max {delivery.max / 1000:.1f}")
+    print(f"🔻 Connections dropped during the run: {dropped}")
+    if dropped and not args.heartbeat:
+        print("💡 With --heartbeat 0 drops after --hold usually mean the ALB idle timeout closed them")
+    if publish_stats and publish_stats.total_errors:
+        publish_stats.print_report("PUBLISH REQUESTS")
+    return connect, delivery
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Realtime websocket fan-out benchmark")
+    parser.add_argument('--mode', choices=['postgres', 'broadcast'], default='postgres',
+                        help="postgres_changes on test_items, or broadcast channels")
+    parser.add_argument('--subscribers', type=int, default=1000, help="Websocket connections in total")
+    parser.add_argument('--channels', type=int, default=1, help="Channels the subscribers are spread over")
+    parser.add_argument('--processes', type=int, default=1, help="Subscriber processes")
+    parser.add_argument('--connect-rate', type=float, default=200, help="New connections per second (0: no limit)")
+    parser.add_argument('--messages', type=int, default=50, help="Writes / broadcasts to publish")
+    parser.add_argument('--rate', type=float, default=5, help="Publish rate per second")
+    parser.add_argument('--hold', type=float, default=0, help="Seconds to hold idle connections before publishing")
+    parser.add_argument('--heartbeat', type=float, default=25, help="Phoenix heartbeat interval (0: none)")
+    parser.add_argument('--drain', type=float, default=5, help="Seconds to wait for deliveries after publishing")
+    parser.add_argument('--join-timeout', type=float, default=10, help="Seconds to wait for a join reply")
+    parser.add_argument('--connect-timeout', type=float, default=600, help="Seconds to wait for all subscribers")
+    parser.add_argument('--timeout', type=float, default=10, help="Publish request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't create fixtures or clean up rows")
+    results.add_arguments(parser)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
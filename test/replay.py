@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Kong Access Log Replay
+- Reads Kong access logs: raw lines (kubectl logs, with or without --timestamps)
+  or Vector/Logflare JSON exports whose event_message holds the nginx line
+- Understands nginx "combined" and the chart's "supabase_timed" format, which adds
+  a millisecond timestamp, request body size and Kong's request/upstream time
+- Replays the requests open-loop with the original inter-arrival times,
+  compressed by --speedup, and latency counted from each scheduled start
+- Compares replay latency, errors and status codes per route with the logged ones
+
+Usage:
+    kubectl logs -n supabase deploy/supabase-kong --since=1h --timestamps > kong.log
+    python replay.py kong.log --speedup 2
+    python replay.py export.json.gz --methods all --by-shape --auth user --limit 50000
+    python replay.py kong.log --dry-run
+
+Only GET/HEAD are replayed by default. Request bodies are not logged, so
+writes (--methods all) get a synthetic body of the logged size.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+
+import results
+from harness import Config, HarnessClient, current_stats, scheduled_start
+from stats import RunStats
+
+# Optional `kubectl logs --timestamps` prefix, then nginx "combined"
+COMBINED = re.compile(
+    r'^(?:(?P<stamp>\d{4}-\d\d-\d\dT\S+) )?(?P<client>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)(?: [^"]*)?" (?P<status>\d{3}) (?P<size>\d+|-)'
+    r'(?: "[^"]*" "(?:[^"\\]|\\.)*")?(?P<rest>.*)$'
+)
+# What supabase_timed (helm/supabase/values.yaml, kong.environment) appends to combined
+TIMED = re.compile(r'^ (?P<msec>\d+\.\d+) (?P<length>\d+|-) (?P<request_time>\d+\.\d+) (?P<upstream>[-\d., :]+)$')
+ID_SEGMENT = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)$', re.I)
+STORAGE_OPERATIONS = {'list', 'public', 'sign', 'authenticated', 'info', 'move', 'copy'}
+FILTER = re.compile(r'^(not\.)?(eq|neq|gt|gte|lt|lte|like|ilike|is|in|cs|cd|fts|plfts)\.')
+
+
+class Entry:
+    """One logged request"""
+
+    def __init__(self, at, method, path, status, client=None, length=None, request_time=None, precise=False):
+        self.at = at
+        self.method = method
+        self.path = path
+        self.status = status
+        self.client = client
+        self.length = length
+        self.request_time = request_time
+        # False when only whole-second timestamps were logged
+        self.precise = precise
+
+
+def route(path):
+    """Route template for a logged path: no query, ids collapsed, storage object names dropped"""
+    segments = urlsplit(path).path.rstrip('/').split('/')
+    if segments[1:4] == ['storage', 'v1', 'object']:
+        keep = segments[:4]
+        if len(segments) > 4 and segments[4] in STORAGE_OPERATIONS:
+            keep.append(segments[4])
+        return '/'.join(keep)
+    if segments[1:5] == ['storage', 'v1', 'upload', 'resumable']:
+        return '/'.join(segments[:5])
+    return '/'.join('{id}' if ID_SEGMENT.match(s) else s for s in segments) or '/'
+
+
+def shape(path):
+    """Query shape: parameter names, with the PostgREST operator for filters ('id=eq&limit&select')"""
+    parts = set()
+    for key, value in parse_qsl(urlsplit(path).query, keep_blank_values=True):
+        match = FILTER.match(value)
+        parts.add(f"{key}={(match.group(1) or '') + match.group(2)}" if match else key)
+    return '&'.join(sorted(parts))
+
+
+def parse_line(line):
+    """Entry from a raw access log line, or None"""
+    match = COMBINED.match(line.strip())
+    if not match:
+        return None
+    size = match.group('size')
+    at = datetime.strptime(match.group('time'), '%d/%b/%Y:%H:%M:%S %z').timestamp()
+    entry = Entry(at, match.group('method'), match.group('path'), int(match.group('status')),
+                  client=match.group('client'), length=int(size) if size != '-' else None)
+    timed = TIMED.match(match.group('rest'))
+    if timed:
+        entry.at, entry.precise = float(timed.group('msec')), True
+        entry.length = int(timed.group('length')) if timed.group('length') != '-' else 0
+        entry.request_time = float(timed.group('request_time'))
+    elif match.group('stamp'):
+        entry.at, entry.precise = datetime.fromisoformat(match.group('stamp')[:26].rstrip('Z')
+                                                         + '+00:00').timestamp(), True
+    return entry
+
+
+def parse_timestamp(value):
+    """Vector / Logflare timestamp: ISO string or epoch seconds, ms or µs"""
+    if isinstance(value, (int, float)):
+        return value / 1e6 if value > 1e14 else value / 1e3 if value > 1e11 else float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+def parse_record(record):
+    """Entry from an exported JSON event (the kong_logs transform in the Vector config)"""
+    message = record.get('event_message') or record.get('message')
+    entry = parse_line(message) if message else None
+    metadata = record.get('metadata') or {}
+    if isinstance(metadata, list):
+        metadata = metadata[0] if metadata else {}
+    request, response = metadata.get('request') or {}, metadata.get('response') or {}
+    if entry is None:
+        if not request.get('method') or not request.get('path') or record.get('severity'):
+            return None
+        entry = Entry(parse_timestamp(record['timestamp']), request['method'], request['path'],
+                      int(response.get('status_code') or 0))
+    if not entry.precise and record.get('timestamp') is not None:
+        at = parse_timestamp(record['timestamp'])
+        entry.at, entry.precise = at, at != int(at)
+    if entry.request_time is None and response.get('request_time') is not None:
+        entry.request_time = float(response['request_time'])
+    if request.get('content_length') is not None:
+        entry.length = int(request['content_length'])
+    return entry
+
+
+def read_entries(paths):
+    """Parse every file; returns (entries sorted by time, unparsed line count)"""
+    entries, unparsed = [], 0
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            text = f.read()
+        if text.lstrip().startswith('['):
+            records, lines = json.loads(text), []
+        else:
+            records, lines = [], text.splitlines()
+        for line in lines:
+            if not line.strip():
+                continue
+            if line.lstrip().startswith('{'):
+                records.append(json.loads(line))
+                continue
+            entry = parse_line(line)
+            if entry is None:
+                unparsed += 1
+            else:
+                entries.append(entry)
+        for record in records:
+            entry = parse_record(record)
+            if entry is None:
+                unparsed += 1
+            else:
+                entries.append(entry)
+    entries.sort(key=lambda e: e.at)
+    spread(entries)
+    return entries, unparsed
+
+
+def spread(entries):
+    """Spread requests logged with whole-second timestamps evenly over their second"""
+    by_second = {}
+    for entry in entries:
+        if not entry.precise:
+            by_second.setdefault(entry.at, []).append(entry)
+    for second, group in by_second.items():
+        for i, entry in enumerate(group):
+            entry.at = second + (i + 0.5) / len(group)
+    if by_second:
+        entries.sort(key=lambda e: e.at)
+
+
+def select(entries, args):
+    """Apply the method / path / window filters; returns (kept, skipped Counter)"""
+    methods = None if args.methods == 'all' else {m.strip().upper() for m in args.methods.split(',')}
+    start = entries[0].at + args.start if entries else 0
+    end = start + args.window if args.window else None
+    kept, skipped = [], Counter()
+    for entry in entries:
+        if entry.at < start or (end is not None and entry.at >= end):
+            skipped['outside window'] += 1
+        elif entry.status == 101:
+            skipped['websocket upgrades'] += 1
+        elif methods is not None and entry.method not in methods:
+            skipped[f'{entry.method} (see --methods)'] += 1
+        elif args.include and not any(entry.path.startswith(prefix) for prefix in args.include):
+            skipped['not --include'] += 1
+        elif any(entry.path.startswith(prefix) for prefix in args.exclude or []):
+            skipped['--exclude'] += 1
+        else:
+            kept.append(entry)
+        if args.limit and len(kept) >= args.limit:
+            break
+    return kept, skipped
+
+
+def label(entry, by_shape=False):
+    name = f"{entry.method} {route(entry.path)}"
+    query = shape(entry.path) if by_shape else ''
+    return f"{name}?{query}" if query else name
+
+
+def original_stats(entries, by_shape):
+    """The logged traffic as a RunStats; Kong's request_time is the latency"""
+    stats = RunStats()
+    for entry in entries:
+        name = label(entry, by_shape)
+        if entry.request_time is None:
+            stats.endpoint(name).requests += 1
+            stats.endpoint(name).errors += entry.status >= 500
+            continue
+        stats.record(name, entry.request_time, entry.status < 500, status=entry.status)
+    if entries:
+        stats.started, stats.finished = entries[0].at, max(entries[-1].at, entries[0].at + 1e-3)
+    return stats
+
+
+def body(entry):
+    """Synthetic body of the logged size for replayed writes"""
+    size = entry.length or 0
+    if entry.method in ('GET', 'HEAD', 'DELETE', 'OPTIONS') or not size:
+        return None, 'application/json'
+    if entry.path.startswith('/storage/v1/'):
+        return b'r' * size, 'application/octet-stream'
+    padding = max(0, size - len('{"name":"replay","description":""}'))
+    return json.dumps({"name": "replay", "description": "r" * padding}).encode(), 'application/json'
+
+
+async def replay(client, entries, args, stats):
+    """Send each entry at its original offset / speedup; returns (mismatches, peak)"""
+    slots = asyncio.Semaphore(args.max_in_flight)
+    pending = set()
+    peak = {'in_flight': 0, 'late': 0}
+    counters = {'in_flight': 0}
+    mismatches = Counter()
+    # One virtual user per logged client address (--auth user)
+    states = {}
+
+    async def fire(entry, intended):
+        scheduled_start.set(intended)
+        current_stats.set(stats)
+        data, content_type = body(entry)
+        token = client.user_token(states.setdefault(entry.client, {})) if args.auth == 'user' else None
+        name = label(entry, args.by_shape)
+        async with slots:
+            counters['in_flight'] += 1
+            peak['in_flight'] = max(peak['in_flight'], counters['in_flight'])
+            try:
+                result = await client.request(name, entry.method, entry.path, ok=range(100, 500),
+                                              service=args.auth == 'service', data=data,
+                                              content_type=content_type, token=token)
+            finally:
+                counters['in_flight'] -= 1
+        if result is None or result.status != entry.status:
+            mismatches[name] += 1
+
+    first = entries[0].at
+    start = time.perf_counter()
+    for entry in entries:
+        intended = start + (entry.at - first) / args.speedup
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -0.01:
+            peak['late'] += 1
+        task = asyncio.create_task(fire(entry, intended))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+    return mismatches, peak
+
+
+def print_mix(entries, skipped, unparsed, by_shape):
+    span = entries[-1].at - entries[0].at if len(entries) > 1 else 0
+    timed = sum(1 for e in entries if e.request_time is not None)
+    print(f"📜 Requests to replay: {len(entries)} over {span:.1f}s "
+          f"({len(entries) / max(span, 1e-9):.1f} req/s)   with Kong timings: {timed}   unparsed lines: {unparsed}")
+    for reason, count in skipped.most_common():
+        print(f"   skipped {count:>7}  {reason}")
+    if entries and not all(e.precise for e in entries):
+        print("⚠️  Some entries only have whole-second timestamps; they are spread evenly within their second")
+    if timed < len(entries):
+        print("⚠️  Entries without request_time can't be compared - use the supabase_timed Kong log format")
+    mix = Counter(label(e, by_shape) for e in entries)
+    print(f"\n{'Route':<60} {'share':>7} {'reqs':>8}")
+    print("-" * 77)
+    for name, count in mix.most_common(20):
+        print(f"{name[:60]:<60} {count / len(entries) * 100:>6.1f}% {count:>8}")
+    if len(mix) > 20:
+        print(f"   ... and {len(mix) - 20} more")
+
+
+def print_report(original, replayed, mismatches, peak, args):
+    print("\n" + "=" * 118)
+    print(f"📊 REPLAY VS ORIGINAL (speedup x{args.speedup:g})")
+    print("=" * 118)
+    print(f"{'Route':<44} {'reqs':>7} {'orig p50':>9} {'orig p99':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'Δp50':>7} {'p(lat)':>8} {'err% o/r':>12} {'status≠':>8}")
+    print("-" * 118)
+    for name in sorted(replayed.endpoints, key=lambda n: -replayed.endpoints[n].requests):
+        new, base = replayed.endpoints[name], original.endpoints.get(name)
+        h = new.latency
+        if base is not None and base.latency.total:
+            _, p = results.mann_whitney(base.latency, h)
+            before = (f"{base.latency.percentile(50) / 1000:>9.1f} {base.latency.percentile(99) / 1000:>9.1f} ")
+            delta = f"{results.change(base.latency.percentile(50), h.percentile(50)):>+6.0f}% {p:>8.1e}"
+        else:
+            before, delta = f"{'-':>9} {'-':>9} ", f"{'-':>7} {'-':>8}"
+        errors = f"{(base.error_rate if base else 0) * 100:.1f}/{new.error_rate * 100:.1f}"
+        print(f"{name[:44]:<44} {new.requests:>7} {before}{h.percentile(50) / 1000:>8.1f} "
+              f"{h.percentile(99) / 1000:>8.1f} {delta} {errors:>12} {mismatches.get(name, 0):>8}")
+    print("-" * 118)
+    print(f"⏱️  Original span: {original.elapsed:.1f}s   Replay: {replayed.elapsed:.1f}s   "
+          f"📨 Requests: {replayed.total_requests}   🔝 Peak in flight: {peak['in_flight']}   "
+          f"🐢 Sends >10ms behind schedule: {peak['late']}")
+    print("💡 orig = Kong request_time (first request byte in to last response byte out);"
+          " replay latency also includes the client-to-ALB round trip")
+    if peak['late']:
+        print("⚠️  The replayer fell behind the log's schedule; lower --speedup or raise --max-in-flight")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Kong access logs and compare latency with the originals")
+    parser.add_argument('logs', nargs='+', help="Raw Kong log files or Vector/Logflare JSON exports (.gz ok)")
+    parser.add_argument('--speedup', type=float, default=1.0, help="Compress inter-arrival times by this factor")
+    parser.add_argument('--methods', default='GET,HEAD', help="Methods to replay, or 'all' (writes get synthetic bodies)")
+    parser.add_argument('--include', action='append', metavar='PREFIX', help="Only replay these path prefixes")
+    parser.add_argument('--exclude', action='append', metavar='PREFIX', help="Skip these path prefixes")
+    parser.add_argument('--start', type=float, default=0, help="Skip this many seconds from the start of the log")
+    parser.add_argument('--window', type=float, default=None, help="Replay this many seconds of the log")
+    parser.add_argument('--limit', type=int, default=None, help="Replay at most this many requests")
+    parser.add_argument('--auth', choices=['anon', 'service', 'user'], default='anon',
+                        help="Credentials: anon key, service key, or a minted user token per logged client")
+    parser.add_argument('--by-shape', action='store_true', help="Group by route and query shape")
+    parser.add_argument('--max-in-flight', type=int, default=1000,
+                        help="Cap on concurrent requests; queued requests keep their scheduled start")
+    parser.add_argument('--pool-size', type=int, default=100, help="Max pooled keep-alive connections")
+    parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument('--dry-run', action='store_true', help="Print the request mix and exit")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    if args.speedup <= 0:
+        parser.error("--speedup must be positive")
+
+    print("🎞️  Kong access log replay")
+    entries, unparsed = read_entries(args.logs)
+    entries, skipped = select(entries, args)
+    if not entries:
+        raise SystemExit(f"❌ No requests to replay ({unparsed} unparsed lines, skipped: {dict(skipped)})")
+    print_mix(entries, skipped, unparsed, args.by_shape)
+    if args.dry_run:
+        return
+
+    config = Config()
+    config.validate()
+    span = (entries[-1].at - entries[0].at) / args.speedup
+    print(f"\n🚀 Replaying against {config.url} at x{args.speedup:g} (~{span:.1f}s)...")
+    original = original_stats(entries, args.by_shape)
+    replayed = RunStats()
+
+    async def run():
+        async with HarnessClient(config, pool_size=args.pool_size, timeout=args.timeout) as client:
+            replayed.started = time.time()
+            outcome = await replay(client, entries, args, replayed)
+            replayed.finish()
+            return outcome
+
+    mismatches, peak = asyncio.run(run())
+    replayed.print_report("REPLAYED TRAFFIC")
+    print_report(original, replayed, mismatches, peak, args)
+    results.save('replay', args, {'original': original, 'replay': replayed}, url=config.url, extra={
+        "speedup": args.speedup, "peak": peak, "status_mismatches": dict(mismatches),
+        "skipped": dict(skipped), "unparsed": unparsed,
+    })
+
+
+if __name__ == "__main__":
+    main()
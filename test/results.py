@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Benchmark result store and run-to-run comparison
+- save() writes one compact JSON file per benchmark run: histograms and
+  counters (RunStats.to_dict), the command line, environment, git SHA, the
+  Helm values that matter for performance and the infra sizing (stack
+  arguments from infra/main.py and module overrides)
+- `python results.py compare BASE NEW` flags statistically significant
+  latency (Mann-Whitney U on the histograms) and throughput (Poisson rate
+  test) changes per series and endpoint; exits 1 on a regression
+
+Usage:
+    python results.py list
+    python results.py show results/20260101-120000-loadgen-closed.json.gz
+    python results.py compare results/base.json.gz results/new.json.gz --alpha 0.01 --min-change 5
+"""
+
+import argparse
+import ast
+import glob
+import gzip
+import hashlib
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from stats import RunStats
+
+FORMAT_VERSION = 1
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HELM_VALUES = os.path.join(REPO_ROOT, 'helm', 'supabase', 'values.yaml')
+# Stacks whose constructor arguments and add_override() values describe capacity
+SIZING_STACKS = ('eks', 'rds')
+# Helm environment variables worth keeping with a result (pool sizes, limits, timeouts)
+TUNING_KEYWORDS = ('POOL', 'MAX', 'LIMIT', 'TIMEOUT', 'WORKERS', 'SIZE', 'CONN')
+DEFAULT_DIR = os.getenv('BENCH_RESULTS_DIR') or 'results'
+
+
+def add_arguments(parser):
+    """--results-dir / --label / --no-results for the benchmark CLIs"""
+    parser.add_argument('--results-dir', default=DEFAULT_DIR, help="Where results files are written")
+    parser.add_argument('--label', default=None, help="Free-form label stored with the results (e.g. 'db.r6g.large')")
+    parser.add_argument('--no-results', action='store_true', help="Don't write a results file")
+
+
+def git_info():
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], cwd=REPO_ROOT, capture_output=True, text=True,
+                                  timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+    return {"sha": git('rev-parse', 'HEAD') or None,
+            "branch": git('rev-parse', '--abbrev-ref', 'HEAD') or None,
+            "dirty": bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def helm_summary(path=HELM_VALUES):
+    """Replicas, image tags, resources, autoscaling and tuning env per chart component"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        raw = f.read()
+    summary = {"sha256": hashlib.sha256(raw).hexdigest(), "components": {}}
+    try:
+        import yaml
+    except ImportError:
+        return summary
+    values = yaml.safe_load(raw) or {}
+    for name, component in values.items():
+        if not isinstance(component, dict) or 'image' not in component:
+            continue
+        environment = component.get('environment') or {}
+        summary["components"][name] = {
+            "enabled": component.get('enabled'),
+            "replicaCount": component.get('replicaCount'),
+            "image": (component.get('image') or {}).get('tag'),
+            "resources": component.get('resources'),
+            "autoscaling": component.get('autoscaling'),
+            "tuning": {key: value for key, value in environment.items()
+                       if any(word in key for word in TUNING_KEYWORDS)},
+        }
+    return summary
+
+
+_UNRESOLVED = object()
+
+
+def _resolve(node, names):
+    """Literal value of an AST node, looking up plain names in names.
+
+    Returns _UNRESOLVED for anything computed; dicts drop the entries that
+    can't be resolved, so only values known before synth are recorded.
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return names.get(node.id, _UNRESOLVED)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_resolve(item, names) for item in node.elts]
+        return _UNRESOLVED if _UNRESOLVED in items else items
+    if isinstance(node, ast.Dict):
+        resolved = {}
+        for key, value in zip(node.keys, node.values):
+            key, value = _resolve(key, names) if key is not None else _UNRESOLVED, _resolve(value, names)
+            if key is not _UNRESOLVED and value is not _UNRESOLVED:
+                resolved[str(key)] = value
+        return resolved
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            part = _resolve(value.value if isinstance(value, ast.FormattedValue) else value, names)
+            if part is _UNRESOLVED:
+                return _UNRESOLVED
+            parts.append(str(part))
+        return "".join(parts)
+    return _UNRESOLVED
+
+
+def _stack_calls(path, classes):
+    """{class: {keyword: value}} for the keyword arguments of each class call in main.py
+
+    Computed arguments map to _UNRESOLVED, so they hide the parameter's default.
+    """
+    calls = {}
+    if not os.path.exists(path):
+        return calls
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        # Plain constants like project = "supabase-on-eks" feed f-strings in the calls
+        names = {}
+        for node in function.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                value = _resolve(node.value, names)
+                if value is not _UNRESOLVED:
+                    names[node.targets[0].id] = value
+        for node in ast.walk(function):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in classes:
+                keywords = {keyword.arg: _resolve(keyword.value, names) for keyword in node.keywords if keyword.arg}
+                calls[node.func.id] = keywords
+    return calls
+
+
+def _construct_id(node):
+    """Construct id as written, f-string fields kept as {name}: "rds_replica_{number}" """
+    if isinstance(node, ast.JoinedStr):
+        return "".join(f"{{{ast.unparse(value.value)}}}" if isinstance(value, ast.FormattedValue) else str(value.value)
+                       for value in node.values)
+    return node.value if isinstance(node, ast.Constant) else ast.unparse(node)
+
+
+def _stack_class(tree):
+    """The construct class of a stack module and its __init__"""
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and item.name == '__init__':
+                    return node, item
+    return None, None
+
+
+def infra_sizing():
+    """Capacity settings per stack: the constructor arguments main.py passes (over the
+    defaults) and the add_override() values of each Terraform module call"""
+    stacks = {}
+    for stack in SIZING_STACKS:
+        path = os.path.join(REPO_ROOT, 'infra', 'stacks', f'{stack}.py')
+        if os.path.exists(path):
+            with open(path) as f:
+                cls, init = _stack_class(ast.parse(f.read()))
+            if cls is not None:
+                stacks[stack] = (cls, init)
+    calls = _stack_calls(os.path.join(REPO_ROOT, 'infra', 'main.py'), {cls.name for cls, _ in stacks.values()})
+
+    sizing = {}
+    for stack, (cls, init) in stacks.items():
+        arguments = init.args
+        defaults = dict(zip([arg.arg for arg in arguments.args][-len(arguments.defaults):], arguments.defaults)) \
+            if arguments.defaults else {}
+        parameters = {name: _resolve(value, {}) for name, value in defaults.items()}
+        parameters = {name: value for name, value in parameters.items() if value is not _UNRESOLVED}
+        parameters.update(calls.get(cls.name, {}))
+        parameters = {name: value for name, value in parameters.items() if value is not _UNRESOLVED}
+
+        # Module variable -> construct id, e.g. self.rds -> "rds"
+        modules, overrides = {}, {}
+        for method in cls.body:
+            if not isinstance(method, ast.FunctionDef):
+                continue
+            # Names only resolve against the constructor's parameters inside __init__
+            names = parameters if method is init else {}
+            for node in ast.walk(method):
+                if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                        and isinstance(node.value.func, ast.Name) and node.value.func.id == 'TerraformModule'
+                        and len(node.value.args) >= 2):
+                    modules[ast.unparse(node.targets[0])] = _construct_id(node.value.args[1])
+            for node in ast.walk(method):
+                if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and node.func.attr == 'add_override' and len(node.args) == 2
+                        and isinstance(node.args[0], ast.Constant)):
+                    module = modules.get(ast.unparse(node.func.value), ast.unparse(node.func.value))
+                    value = _resolve(node.args[1], names)
+                    if value is not _UNRESOLVED:
+                        overrides.setdefault(module, {})[node.args[0].value] = value
+        sizing[stack] = {"parameters": parameters, "modules": overrides}
+    return sizing
+
+
+def environment(url=None):
+    return {
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "url": url,
+    }
+
+
+def from_histograms(**histograms):
+    """RunStats with one endpoint per LatencyHistogram, for tools that don't record requests"""
+    stats = RunStats()
+    for name, histogram in histograms.items():
+        endpoint = stats.endpoint(name)
+        endpoint.latency = histogram
+        endpoint.requests = histogram.total
+    stats.finish()
+    return stats
+
+
+def save(tool, args, series, extra=None, url=None):
+    """Write one run's results; series maps a name to RunStats. Returns the path or None"""
+    if getattr(args, 'no_results', False):
+        return None
+    created = datetime.now(timezone.utc)
+    document = {
+        "version": FORMAT_VERSION,
+        "tool": tool,
+        "label": getattr(args, 'label', None),
+        "created": created.isoformat(),
+        "argv": sys.argv[1:],
+        "args": {key: value for key, value in vars(args).items()
+                 if isinstance(value, (str, int, float, bool, type(None)))},
+        "git": git_info(),
+        "environment": environment(url),
+        "helm": helm_summary(),
+        "sizing": infra_sizing(),
+        "series": {name: stats.to_dict() for name, stats in series.items()},
+        "extra": extra or {},
+    }
+    directory = getattr(args, 'results_dir', None) or DEFAULT_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{created.strftime('%Y%m%d-%H%M%S')}-{tool}.json.gz")
+    with gzip.open(path, 'wt') as f:
+        json.dump(document, f, separators=(',', ':'))
+    print(f"\n💾 Results saved to {path}")
+    return path
+
+
+def load(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        document = json.load(f)
+    document["series"] = {name: RunStats.from_dict(s) for name, s in document["series"].items()}
+    return document
+
+
+# --- Significance tests -----------------------------------------------------
+
+def mann_whitney(base, new):
+    """Two-sided Mann-Whitney U on two LatencyHistograms (ties per bucket).
+
+    Returns (z, p): z > 0 means new tends to be slower than base.
+    """
+    n1, n2 = base.total, new.total
+    if not n1 or not n2:
+        return 0.0, 1.0
+    rank, rank_sum, ties = 0, 0.0, 0.0
+    for index in sorted(set(base.counts) | set(new.counts)):
+        c1, c2 = base.counts.get(index, 0), new.counts.get(index, 0)
+        tied = c1 + c2
+        rank_sum += c2 * (rank + (tied + 1) / 2)
+        ties += tied ** 3 - tied
+        rank += tied
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))) if n > 1 else 0
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (u - n1 * n2 / 2) / math.sqrt(variance)
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+
+def rate_test(count1, seconds1, count2, seconds2):
+    """Two-sided test that two Poisson rates are equal (conditional binomial, normal approximation).
+
+    Returns (z, p): z > 0 means the second rate is higher.
+    """
+    n = count1 + count2
+    if not n or seconds1 <= 0 or seconds2 <= 0:
+        return 0.0, 1.0
+    share = seconds2 / (seconds1 + seconds2)
+    sd = math.sqrt(n * share * (1 - share))
+    if sd == 0:
+        return 0.0, 1.0
+    z = (count2 - n * share) / sd
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+
+def proportion_test(errors1, total1, errors2, total2):
+    """Two-sided two-proportion z-test; z > 0 means the second error rate is higher"""
+    if not total1 or not total2:
+        return 0.0, 1.0
+    pooled = (errors1 + errors2) / (total1 + total2)
+    sd = math.sqrt(pooled * (1 - pooled) * (1 / total1 + 1 / total2))
+    if sd == 0:
+        return 0.0, 1.0
+    z = (errors2 / total2 - errors1 / total1) / sd
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+
+def change(base, new):
+    return (new - base) / base * 100 if base else 0.0
+
+
+def compare_endpoint(base, new, base_seconds, new_seconds, alpha, min_change):
+    """Verdict and numbers for one endpoint present in both runs"""
+    z, p_latency = mann_whitney(base.latency, new.latency)
+    p50 = change(base.latency.percentile(50), new.latency.percentile(50))
+    p99 = change(base.latency.percentile(99), new.latency.percentile(99))
+    rate_z, p_rate = rate_test(base.requests, base_seconds, new.requests, new_seconds)
+    rate = change(base.requests / base_seconds, new.requests / new_seconds)
+
+    findings = []
+    if p_latency < alpha and max(p50, p99) >= min_change and z > 0:
+        findings.append('latency')
+    if p_rate < alpha and rate <= -min_change:
+        findings.append('throughput')
+    error_z, p_errors = proportion_test(base.errors, base.requests, new.errors, new.requests)
+    if p_errors < alpha and error_z > 0:
+        findings.append('errors')
+    improved = (p_latency < alpha and z < 0 and min(p50, p99) <= -min_change) or \
+               (p_rate < alpha and rate >= min_change)
+    return {"p50": p50, "p99": p99, "p_latency": p_latency, "rate": rate, "p_rate": p_rate,
+            "regressions": findings, "improved": improved and not findings}
+
+
+def compare(base_doc, new_doc, alpha=0.01, min_change=5.0):
+    """Compare every (series, endpoint) present in both runs; returns rows"""
+    rows = []
+    for series, base_stats in base_doc["series"].items():
+        new_stats = new_doc["series"].get(series)
+        if new_stats is None:
+            continue
+        for endpoint, base in base_stats.endpoints.items():
+            new = new_stats.endpoints.get(endpoint)
+            if new is None or not base.requests or not new.requests:
+                continue
+            result = compare_endpoint(base, new, base_stats.elapsed, new_stats.elapsed, alpha, min_change)
+            rows.append((series, endpoint, base, new, result))
+    return rows
+
+
+def describe(document, path):
+    git = document.get("git") or {}
+    label = f" [{document['label']}]" if document.get("label") else ""
+    return (f"{os.path.basename(path)}{label}: {document['tool']} at {document['created'][:19]} "
+            f"git {(git.get('sha') or '?')[:10]}{'+dirty' if git.get('dirty') else ''}")
+
+
+def diff_metadata(base_doc, new_doc):
+    """Helm and sizing differences between two runs, as 'path: old -> new' lines"""
+    lines = []
+
+    def walk(prefix, old, new):
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key in sorted(set(old) | set(new)):
+                walk(f"{prefix}.{key}" if prefix else key, old.get(key), new.get(key))
+        elif old != new:
+            lines.append(f"{prefix}: {old} -> {new}")
+
+    walk('sizing', base_doc.get("sizing") or {}, new_doc.get("sizing") or {})
+    walk('helm', (base_doc.get("helm") or {}).get("components") or {},
+         (new_doc.get("helm") or {}).get("components") or {})
+    return lines
+
+
+def print_comparison(base_path, new_path, alpha, min_change):
+    base_doc, new_doc = load(base_path), load(new_path)
+    print("🔬 Comparing benchmark runs")
+    print(f"   base: {describe(base_doc, base_path)}")
+    print(f"   new:  {describe(new_doc, new_path)}")
+    changes = diff_metadata(base_doc, new_doc)
+    if changes:
+        print("\n🛠️  Infra / chart changes:")
+        for line in changes[:30]:
+            print(f"   {line}")
+
+    rows = compare(base_doc, new_doc, alpha, min_change)
+    print("\n" + "=" * 110)
+    print(f"📊 COMPARISON (alpha {alpha}, min change {min_change:g}%)")
+    print("=" * 110)
+    print(f"{'Series / endpoint':<44} {'p50 Δ':>8} {'p99 Δ':>8} {'p(lat)':>8} {'rate Δ':>8} {'p(rate)':>8}  verdict")
+    print("-" * 110)
+    regressions = 0
+    for series, endpoint, base, new, result in rows:
+        if result["regressions"]:
+            verdict = "❌ " + ", ".join(result["regressions"])
+            regressions += 1
+        elif result["improved"]:
+            verdict = "🟢 better"
+        else:
+            verdict = "✅ same"
+        name = f"{series} / {endpoint}" if series != 'run' else endpoint
+        print(f"{name[:44]:<44} {result['p50']:>+7.1f}% {result['p99']:>+7.1f}% {result['p_latency']:>8.3g} "
+              f"{result['rate']:>+7.1f}% {result['p_rate']:>8.3g}  {verdict}")
+    if not rows:
+        print("⚠️  No series/endpoints in common")
+    print("-" * 110)
+    print(f"{'❌' if regressions else '✅'} {regressions} regression(s) in {len(rows)} comparison(s)")
+    return regressions
+
+
+def print_show(path):
+    document = load(path)
+    print(describe(document, path))
+    print(f"   argv: {' '.join(document.get('argv') or [])}")
+    for name, stats in document["series"].items():
+        stats.print_report(f"{document['tool']} / {name}")
+
+
+def print_list(directory):
+    paths = sorted(glob.glob(os.path.join(directory, '*.json*')))
+    if not paths:
+        print(f"No results in {directory}")
+    for path in paths:
+        try:
+            print(describe(load(path), path))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  {os.path.basename(path)}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark results: list, show and compare runs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help="List stored results")
+    list_parser.add_argument('--results-dir', default=DEFAULT_DIR)
+    show = commands.add_parser('show', help="Print the report of a stored run")
+    show.add_argument('path')
+    compare_parser = commands.add_parser('compare', help="Flag significant regressions between two runs")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--alpha', type=float, default=0.01, help="Significance level")
+    compare_parser.add_argument('--min-change', type=float, default=5.0,
+                                help="Ignore significant changes smaller than this many percent")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print_list(args.results_dir)
+    elif args.command == 'show':
+        print_show(args.path)
+    else:
+        sys.exit(1 if print_comparison(args.base, args.new, args.alpha, args.min_change) else 0)
+
+
+if __name__ == "__main__":
+    main()
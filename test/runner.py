@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Load-run execution for one process (one event loop, one connection pool)
+- Closed loop: N workers, each sending back-to-back
+- Open loop: arrival-rate schedule from a profile, latency from scheduled start
+Both accept an on_interval callback that receives a RunStats snapshot every
+progress interval; loadgen.py prints it, distributed.py ships it to the parent.
+"""
+
+import asyncio
+import time
+
+import profiles
+import scenarios
+import workload
+from harness import Config, HarnessClient, current_stats, scheduled_start
+from stats import RunStats
+
+
+class StopCondition:
+    """Shared duration / step budget for all workers in a run"""
+
+    def __init__(self, duration=None, max_steps=None):
+        self.deadline = time.monotonic() + duration if duration else None
+        self.max_steps = max_steps
+        self.issued = 0
+
+    def take(self):
+        """Claim one step; False once the run is over"""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        if self.max_steps is not None:
+            if self.issued >= self.max_steps:
+                return False
+            self.issued += 1
+        return True
+
+
+async def every(interval, snapshot, callback):
+    """Call callback(snapshot()) every interval seconds until cancelled"""
+    if not callback or not interval:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        callback(snapshot())
+
+
+async def closed_loop(client, steps, concurrency, stop):
+    """Each worker runs the next step as soon as its previous one finished"""
+
+    async def worker(worker_id):
+        state = {}
+        position = worker_id % len(steps)
+        while stop.take():
+            await steps[position](client, state)
+            position = (position + 1) % len(steps)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def open_loop(client, steps, profile, max_in_flight, stages):
+    """Start steps at the profile's arrival rate regardless of how fast responses come back.
+
+    Each request is stamped with its intended start time; if the server (or
+    the max_in_flight cap) delays it, that wait is part of its latency.
+    """
+    slots = asyncio.Semaphore(max_in_flight)
+    pending = set()
+    peak = {'in_flight': 0, 'late': 0}
+    counters = {'in_flight': 0}
+    # Virtual users: each in-flight step gets exclusive use of one state dict
+    idle_states = []
+
+    async def fire(step, intended, stats):
+        scheduled_start.set(intended)
+        current_stats.set(stats)
+        state = idle_states.pop() if idle_states else {}
+        try:
+            async with slots:
+                counters['in_flight'] += 1
+                peak['in_flight'] = max(peak['in_flight'], counters['in_flight'])
+                try:
+                    await step(client, state)
+                finally:
+                    counters['in_flight'] -= 1
+        finally:
+            idle_states.append(state)
+
+    start = time.perf_counter()
+    offset, sent = 0.0, 0
+    while offset < profile.duration:
+        intended = start + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -0.01:
+            peak['late'] += 1
+
+        label = profile.stage(offset)
+        if label not in stages:
+            stages[label] = (profile.rate(offset), RunStats())
+        task = asyncio.create_task(fire(steps[sent % len(steps)], intended, stages[label][1]))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        sent += 1
+
+        rate = profile.rate(offset)
+        offset += 1.0 / rate if rate > 0 else 0.1
+
+    if pending:
+        await asyncio.gather(*pending)
+    return sent, peak
+
+
+def merge_stages(stages):
+    """One RunStats for all stages of an open-loop run"""
+    merged = RunStats()
+    for _, stats in stages.values():
+        merged.merge(stats)
+    return merged
+
+
+async def run_closed(args, on_interval=None):
+    """Closed-loop run in this process; returns RunStats"""
+    config = Config()
+    config.validate()
+    steps = workload.resolve(args, 'closed')
+    stats = RunStats()
+
+    expected_interval = args.expected_interval_ms / 1000 if args.expected_interval_ms else None
+    async with HarnessClient(config, pool_size=args.pool_size, timeout=args.timeout,
+                             expected_interval=expected_interval) as client:
+        if not args.skip_setup:
+            await scenarios.setup(client)
+
+        client.stats = stats
+        stats.started = time.time()
+
+        def snapshot():
+            # A copy made on the event loop: the caller may pickle it in another thread while requests keep recording
+            copy = RunStats().merge(stats)
+            copy.started = stats.started
+            return copy
+
+        progress = asyncio.create_task(every(args.progress_interval, snapshot, on_interval))
+        try:
+            await closed_loop(client, steps, args.concurrency,
+                              StopCondition(duration=args.duration, max_steps=args.requests))
+        finally:
+            progress.cancel()
+        stats.finish()
+    return stats
+
+
+async def run_open(args, on_interval=None):
+    """Open-loop run in this process; returns (stages, sent, peak)"""
+    config = Config()
+    config.validate()
+    steps = workload.resolve(args, 'open')
+    profile = profiles.from_args(args)
+
+    stages = {}
+    async with HarnessClient(config, pool_size=args.pool_size, timeout=args.timeout) as client:
+        if not args.skip_setup:
+            await scenarios.setup(client)
+
+        started = time.time()
+
+        def snapshot():
+            merged = merge_stages(stages)
+            merged.started = started
+            return merged
+
+        progress = asyncio.create_task(every(args.progress_interval, snapshot, on_interval))
+        try:
+            sent, peak = await open_loop(client, steps, profile, args.max_in_flight, stages)
+        finally:
+            progress.cancel()
+
+    for _, stats in stages.values():
+        stats.finish()
+    return stages, sent, peak
+
+
+MODES = {
+    'closed': run_closed,
+    'open': run_open,
+}
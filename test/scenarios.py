@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Async versions of the test_api.py calls for load generation
+Each step takes (client, state): state is a per-worker dict that carries
+created item ids and uploaded filenames between steps, so CRUD and storage
+steps can run in a loop without sharing fixtures across workers.
+"""
+
+import os
+import uuid
+from datetime import datetime
+
+TEST_BUCKET = 'test-bucket'
+SQL_DIR = os.path.join(os.path.dirname(__file__), 'sql')
+
+
+async def setup(client):
+    """Make sure test_items and test-bucket exist before the run (see test_api.py)"""
+    result = await client.request('setup: GET /rest/v1/test_items', 'GET', '/rest/v1/test_items?limit=1',
+                                  service=True, ok=(200, 404))
+    if result and result.status == 404:
+        await client.request('setup: POST /rest/v1/rpc/exec_sql', 'POST', '/rest/v1/rpc/exec_sql',
+                             service=True, ok=(200, 201, 204), json={
+                                 "sql": "CREATE TABLE IF NOT EXISTS test_items (id SERIAL PRIMARY KEY, name TEXT, description TEXT, created_at TIMESTAMP DEFAULT NOW()); GRANT ALL ON test_items TO anon, authenticated, service_role;"
+                             })
+
+    result = await client.request('setup: GET /storage/v1/bucket', 'GET', '/storage/v1/bucket', service=True)
+    buckets = result.json() if result and result.status == 200 else []
+    if TEST_BUCKET not in [bucket.get('name') for bucket in buckets]:
+        await client.request('setup: POST /storage/v1/bucket', 'POST', '/storage/v1/bucket',
+                             service=True, ok=(200, 201, 409),
+                             json={"id": TEST_BUCKET, "name": TEST_BUCKET, "public": False})
+
+
+async def install_sql(client, filename):
+    """Run test/sql/<filename> through the exec_sql RPC; False if the RPC isn't available"""
+    with open(os.path.join(SQL_DIR, filename)) as f:
+        sql = f.read()
+    result = await client.request(f'setup: {filename}', 'POST', '/rest/v1/rpc/exec_sql',
+                                  service=True, ok=(200, 201, 204), json={"sql": sql})
+    if result and result.status in (200, 201, 204):
+        return True
+    print(f"⚠️  Could not install {filename} via RPC: {result.text if result else 'no response'}")
+    print(f"💡 Run it manually: psql -f test/sql/{filename}")
+    return False
+
+
+async def auth_health(client, state):
+    await client.request('GET /auth/v1/health', 'GET', '/auth/v1/health')
+
+
+async def postgrest_health(client, state):
+    await client.request('GET /rest/v1/', 'GET', '/rest/v1/')
+
+
+async def postgrest_create(client, state):
+    result = await client.request('POST /rest/v1/test_items', 'POST', '/rest/v1/test_items',
+                                  service=True, ok=(200, 201),
+                                  headers={'Prefer': 'return=representation'},
+                                  json={
+                                      "name": f"Load Item {uuid.uuid4().hex[:12]}",
+                                      "description": f"Load test item created at {datetime.now()}"
+                                  })
+    if result and result.status in (200, 201):
+        rows = result.json()
+        if isinstance(rows, list) and rows:
+            state.setdefault('item_ids', []).append(rows[0].get('id'))
+
+
+async def postgrest_read(client, state):
+    await client.request('GET /rest/v1/test_items', 'GET', '/rest/v1/test_items?limit=5', service=True)
+
+
+async def postgrest_update(client, state):
+    if not state.get('item_ids'):
+        await postgrest_create(client, state)
+    if not state.get('item_ids'):
+        return
+    item_id = state['item_ids'][-1]
+    await client.request('PATCH /rest/v1/test_items', 'PATCH', f'/rest/v1/test_items?id=eq.{item_id}',
+                         service=True, ok=(200, 204),
+                         headers={'Prefer': 'return=representation'},
+                         json={"description": f"Updated description at {datetime.now()}"})
+
+
+async def postgrest_delete(client, state):
+    if not state.get('item_ids'):
+        await postgrest_create(client, state)
+    if not state.get('item_ids'):
+        return
+    item_id = state['item_ids'].pop()
+    await client.request('DELETE /rest/v1/test_items', 'DELETE', f'/rest/v1/test_items?id=eq.{item_id}',
+                         service=True, ok=(200, 204))
+
+
+async def auth_signup(client, state):
+    result = await client.request('POST /auth/v1/signup', 'POST', '/auth/v1/signup', ok=(200, 201), json={
+        "email": f"load-user-{uuid.uuid4().hex}@example.com",
+        "password": "TestPassword123!"
+    })
+    if result and result.status in (200, 201):
+        state['access_token'] = (result.json() or {}).get('access_token')
+
+
+async def auth_login(client, state):
+    """Password grant for this virtual user's own account (signs up once first)"""
+    if 'email' not in state:
+        email = f"load-login-{uuid.uuid4().hex}@example.com"
+        result = await client.request('POST /auth/v1/signup', 'POST', '/auth/v1/signup', ok=(200, 201), json={
+            "email": email,
+            "password": "TestPassword123!"
+        })
+        if not result or result.status not in (200, 201):
+            return
+        state['email'] = email
+    result = await client.request('POST /auth/v1/token', 'POST', '/auth/v1/token?grant_type=password', json={
+        "email": state['email'],
+        "password": "TestPassword123!"
+    })
+    if result and result.status == 200:
+        state['access_token'] = (result.json() or {}).get('access_token')
+
+
+async def list_users(client, state):
+    await client.request('GET /auth/v1/admin/users', 'GET', '/auth/v1/admin/users', service=True)
+
+
+async def authenticated_read(client, state):
+    """Read as an authenticated user with a locally minted token (no GoTrue round trip)"""
+    await client.request('GET /rest/v1/test_items (user)', 'GET', '/rest/v1/test_items?limit=5',
+                         token=client.user_token(state))
+
+
+async def authenticated_storage_list(client, state):
+    await client.request('POST /storage/v1/object/list (user)', 'POST', f'/storage/v1/object/list/{TEST_BUCKET}',
+                         token=client.user_token(state), json={"prefix": "", "limit": 100, "offset": 0})
+
+
+async def storage_health(client, state):
+    await client.request('GET /storage/v1/status', 'GET', '/storage/v1/status')
+
+
+async def storage_upload(client, state):
+    filename = f"load-file-{uuid.uuid4().hex}.txt"
+    result = await client.request('POST /storage/v1/object', 'POST', f'/storage/v1/object/{TEST_BUCKET}/{filename}',
+                                  service=True, ok=(200, 201), content_type='text/plain',
+                                  data=f"Load test file created at {datetime.now()}")
+    if result and result.status in (200, 201):
+        state.setdefault('filenames', []).append(filename)
+
+
+async def storage_list(client, state):
+    await client.request('POST /storage/v1/object/list', 'POST', f'/storage/v1/object/list/{TEST_BUCKET}',
+                         service=True, json={"prefix": "", "limit": 100, "offset": 0})
+
+
+async def storage_download(client, state):
+    if not state.get('filenames'):
+        await storage_upload(client, state)
+    if not state.get('filenames'):
+        return
+    filename = state['filenames'][-1]
+    await client.request('GET /storage/v1/object', 'GET', f'/storage/v1/object/{TEST_BUCKET}/{filename}',
+                         service=True, content_type=None)
+
+
+async def realtime_connection(client, state):
+    await client.request('GET /realtime/v1/websocket', 'GET', '/realtime/v1/websocket',
+                         ok=(200, 400, 426), content_type=None)
+
+
+# Steps in the same order as test_api.py main()
+TEST_API_STEPS = {
+    'auth_health': auth_health,
+    'postgrest_health': postgrest_health,
+    'postgrest_create': postgrest_create,
+    'postgrest_read': postgrest_read,
+    'postgrest_update': postgrest_update,
+    'postgrest_delete': postgrest_delete,
+    'auth_signup': auth_signup,
+    'list_users': list_users,
+    'storage_health': storage_health,
+    'storage_upload': storage_upload,
+    'storage_list': storage_list,
+    'storage_download': storage_download,
+    'realtime_connection': realtime_connection,
+}
+
+# Plus steps that aren't in test_api.py: minted-token reads and the GoTrue issuance storm
+SCENARIOS = dict(
+    TEST_API_STEPS,
+    authenticated_read=authenticated_read,
+    authenticated_storage_list=authenticated_storage_list,
+    auth_login=auth_login,
+)
+
+# Named groups accepted wherever a scenario list is expected
+GROUPS = {
+    'all': list(TEST_API_STEPS),
+    'health': ['auth_health', 'postgrest_health', 'storage_health'],
+    'rest': ['postgrest_read', 'postgrest_create', 'postgrest_update', 'postgrest_delete'],
+    'auth': ['auth_health', 'auth_signup', 'list_users'],
+    'storage': ['storage_upload', 'storage_list', 'storage_download'],
+    'authenticated': ['authenticated_read', 'authenticated_storage_list'],
+    # Measures token issuance (bcrypt + session insert); use on its own, not mixed with app traffic
+    'auth_storm': ['auth_signup', 'auth_login'],
+}
+
+
+def resolve(names):
+    """Turn a comma separated list of scenario and group names into step functions"""
+    steps = []
+    for name in [n.strip() for n in names.split(',') if n.strip()]:
+        if name in GROUPS:
+            steps.extend(SCENARIOS[n] for n in GROUPS[name])
+        elif name in SCENARIOS:
+            steps.append(SCENARIOS[name])
+        else:
+            raise SystemExit(f"❌ Unknown scenario '{name}'. Available: {', '.join(list(GROUPS) + list(SCENARIOS))}")
+    return steps
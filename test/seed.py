@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset seeder for the benchmarks
+- items:    millions of test_items rows, generated server-side in batches (seed_items RPC)
+- users:    auth users created through the GoTrue admin API
+- storage:  small objects under <prefix>/<xx>/<xx>/... with a configurable fan-out
+
+Nothing is materialized up front: rows, users and objects are generated per
+batch from their index. Progress is kept in the seed_progress table, so
+re-running with the same targets is a no-op and an interrupted run resumes
+from the last completed batch.
+
+Usage:
+    python seed.py --items 2000000 --users 20000 --objects 100000
+    python seed.py --datasets storage --objects 50000 --fanout 32 --depth 2
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import quote
+
+import scenarios
+from harness import Config, HarnessClient
+from scenarios import TEST_BUCKET
+
+PROGRESS_PATH = '/rest/v1/seed_progress'
+PASSWORD = 'TestPassword123!'
+
+
+def user_email(index):
+    return f"seed-user-{index:08d}@example.com"
+
+
+def object_path(prefix, index, fanout, depth):
+    """Spread objects over fanout**depth directories, e.g. seed/0a/03/object-000001234.txt"""
+    levels = [f"{(index // fanout ** level) % fanout:02x}" for level in range(depth)]
+    return '/'.join([prefix] + levels + [f"object-{index:09d}.txt"])
+
+
+class Seeder:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+
+    async def get_progress(self, dataset):
+        result = await self.client.request('GET seed_progress', 'GET',
+                                           f"{PROGRESS_PATH}?dataset=eq.{quote(dataset)}&select=done",
+                                           service=True)
+        rows = result.json() if result and result.status == 200 else []
+        return rows[0]['done'] if rows else 0
+
+    async def set_progress(self, dataset, done):
+        await self.client.request('POST seed_progress', 'POST', PROGRESS_PATH, service=True, ok=(200, 201),
+                                  headers={'Prefer': 'resolution=merge-duplicates,return=minimal'},
+                                  json={"dataset": dataset, "done": done})
+
+    async def batched(self, dataset, target, batch, create):
+        """Run create(index) for every index from the checkpoint up to target, one batch at a time"""
+        done = await self.get_progress(dataset)
+        if done >= target:
+            print(f"✅ {dataset}: {done} already seeded")
+            return done
+        print(f"🌱 {dataset}: resuming at {done} of {target}")
+        slots = asyncio.Semaphore(self.args.concurrency)
+
+        async def bounded(index):
+            async with slots:
+                return await create(index)
+
+        reporter = Reporter(dataset, done, target)
+        while done < target:
+            upto = min(done + batch, target)
+            results = await asyncio.gather(*(bounded(index) for index in range(done, upto)))
+            failed = results.count(False)
+            if failed:
+                # Don't move the checkpoint past a batch with holes in it
+                print(f"\n❌ {dataset}: {failed} of {upto - done} failed in batch starting at {done}; stopping")
+                break
+            done = upto
+            await self.set_progress(dataset, done)
+            reporter.update(done)
+        reporter.close()
+        return done
+
+    async def seed_items(self):
+        """Call seed_items until it reports the target; each call commits one batch"""
+        target, batch = self.args.items, self.args.item_batch
+        done = await self.get_progress('items')
+        if done >= target:
+            print(f"✅ items: {done} already seeded")
+            return done
+        print(f"🌱 items: resuming at {done} of {target}")
+        reporter = Reporter('items', done, target)
+        while done < target:
+            result = await self.client.request('rpc seed_items', 'POST', '/rest/v1/rpc/seed_items',
+                                               service=True, json={"target": target, "batch": batch})
+            if not result or result.status != 200:
+                print(f"\n❌ items: seed_items failed at {done}: {result.text if result else 'no response'}")
+                break
+            done = result.json()
+            reporter.update(done)
+        reporter.close()
+        await self.client.request('rpc seed_analyze', 'POST', '/rest/v1/rpc/seed_analyze',
+                                  service=True, ok=(200, 204), json={})
+        return done
+
+    async def create_user(self, index):
+        result = await self.client.request('POST /auth/v1/admin/users', 'POST', '/auth/v1/admin/users',
+                                           service=True, ok=(200, 201, 422), json={
+                                               "email": user_email(index),
+                                               "password": PASSWORD,
+                                               "email_confirm": True,
+                                               "user_metadata": {"seed_index": index}
+                                           })
+        # 422: already registered by an earlier, interrupted run
+        return bool(result) and result.status in (200, 201, 422)
+
+    async def create_object(self, index):
+        path = object_path(self.args.prefix, index, self.args.fanout, self.args.depth)
+        result = await self.client.request('POST /storage/v1/object', 'POST',
+                                           f'/storage/v1/object/{self.args.bucket}/{path}',
+                                           service=True, ok=(200, 201), content_type='text/plain',
+                                           headers={'x-upsert': 'true'}, data=self.object_body(index))
+        return bool(result) and result.status in (200, 201)
+
+    def object_body(self, index):
+        line = f"seed object {index}\n".encode()
+        return (line * (self.args.object_size // len(line) + 1))[:self.args.object_size]
+
+
+class Reporter:
+    """Single-line progress with the rate since start"""
+
+    def __init__(self, dataset, start, target):
+        self.dataset = dataset
+        self.start = start
+        self.target = target
+        self.started = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, done):
+        now = time.perf_counter()
+        if now - self.last < 1 and done < self.target:
+            return
+        self.last = now
+        rate = (done - self.start) / (now - self.started) if now > self.started else 0
+        print(f"\r   {self.dataset}: {done}/{self.target} ({done / self.target * 100:.1f}%) {rate:,.0f}/s",
+              end='', flush=True)
+
+    def close(self):
+        print()
+
+
+async def run(args):
+    config = Config()
+    config.validate()
+    datasets = [name.strip() for name in args.datasets.split(',') if name.strip()]
+
+    print("🚀 Starting dataset seeder")
+    print(f"URL: {config.url}")
+    print(f"Datasets: {', '.join(datasets)}")
+    print("-" * 50)
+
+    async with HarnessClient(config, pool_size=max(args.concurrency, 10), timeout=args.timeout) as client:
+        if not args.skip_setup:
+            await scenarios.setup(client)
+            await scenarios.install_sql(client, 'bench_queries.sql')
+            await scenarios.install_sql(client, 'seed.sql')
+
+        seeder = Seeder(client, args)
+        started = time.perf_counter()
+        if 'items' in datasets:
+            await seeder.seed_items()
+        if 'users' in datasets:
+            await seeder.batched('users', args.users, args.batch, seeder.create_user)
+        if 'storage' in datasets:
+            await seeder.batched(f'storage:{args.bucket}/{args.prefix}', args.objects, args.batch,
+                                 seeder.create_object)
+
+    print(f"\n⏱️  Seeding took {time.perf_counter() - started:.1f}s")
+    client.stats.print_report("SEEDING REQUESTS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed benchmark datasets")
+    parser.add_argument('--datasets', default='items,users,storage', help="Subset of items,users,storage")
+    parser.add_argument('--items', type=int, default=1000000, help="Target test_items rows")
+    parser.add_argument('--item-batch', type=int, default=50000, help="Rows per seed_items call")
+    parser.add_argument('--users', type=int, default=10000, help="Target seeded auth users")
+    parser.add_argument('--objects', type=int, default=10000, help="Target seeded storage objects")
+    parser.add_argument('--object-size', type=int, default=1024, help="Bytes per storage object")
+    parser.add_argument('--bucket', default=TEST_BUCKET)
+    parser.add_argument('--prefix', default='seed', help="Top-level storage prefix")
+    parser.add_argument('--fanout', type=int, default=16, help="Sub-prefixes per level")
+    parser.add_argument('--depth', type=int, default=2, help="Levels of sub-prefixes")
+    parser.add_argument('--batch', type=int, default=500, help="Users/objects per checkpoint")
+    parser.add_argument('--concurrency', type=int, default=20, help="Requests in flight")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't install SQL or create the bucket")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
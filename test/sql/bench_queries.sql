@@ -0,0 +1,70 @@
+-- Read-path benchmark fixtures (used by query_bench.py)
+-- Installed through the exec_sql RPC when available, otherwise run with psql as the supabase user.
+-- test_items must exist first (scenarios.setup / test_api.py create it).
+
+-- Child table so PostgREST can embed test_items -> test_item_tags through the foreign key
+CREATE TABLE IF NOT EXISTS test_item_tags (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL REFERENCES test_items(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS test_item_tags_item_id_idx ON test_item_tags (item_id);
+GRANT ALL ON test_item_tags TO anon, authenticated, service_role;
+GRANT USAGE, SELECT ON SEQUENCE test_item_tags_id_seq TO anon, authenticated, service_role;
+
+-- name and created_at are left unindexed on purpose: the benchmark should
+-- show the Seq Scan until someone adds the index the API actually needs.
+
+-- Top test_items up to target rows (two tags each), spread over the last year
+CREATE OR REPLACE FUNCTION bench_seed_items(target INTEGER)
+RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    existing BIGINT;
+BEGIN
+    SELECT count(*) INTO existing FROM test_items;
+    IF existing < target THEN
+        WITH inserted AS (
+            INSERT INTO test_items (name, description, created_at)
+            SELECT 'Bench Item ' || g,
+                   'Query benchmark row ' || g,
+                   NOW() - (g % 365) * INTERVAL '1 day' - (g % 86400) * INTERVAL '1 second'
+            FROM generate_series(existing + 1, target) AS g
+            RETURNING id
+        )
+        INSERT INTO test_item_tags (item_id, tag)
+        SELECT id, tag
+        FROM inserted, unnest(ARRAY['tag-' || (id % 10), 'tag-' || (id % 7 + 10)]) AS tag;
+        ANALYZE test_items;
+        ANALYZE test_item_tags;
+    END IF;
+    RETURN greatest(existing, target);
+END;
+$$;
+
+-- EXPLAIN (FORMAT JSON) of a single SELECT, optionally with ANALYZE
+CREATE OR REPLACE FUNCTION bench_explain(query TEXT, with_analyze BOOLEAN DEFAULT FALSE)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    plan JSON;
+BEGIN
+    IF query !~* '^\s*select\s' OR position(';' IN query) > 0 THEN
+        RAISE EXCEPTION 'bench_explain only explains a single SELECT statement';
+    END IF;
+    IF with_analyze THEN
+        EXECUTE 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' || query INTO plan;
+    ELSE
+        EXECUTE 'EXPLAIN (FORMAT JSON) ' || query INTO plan;
+    END IF;
+    RETURN plan;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION bench_seed_items(INTEGER), bench_explain(TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION bench_seed_items(INTEGER), bench_explain(TEXT, BOOLEAN) TO service_role;
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,17 @@
+-- Realtime benchmark fixtures (used by realtime_bench.py --mode postgres)
+-- Installed through the exec_sql RPC when available, otherwise run with psql as the supabase user.
+
+-- postgres_changes only sees tables in the supabase_realtime publication
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        CREATE PUBLICATION supabase_realtime;
+    END IF;
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'test_items'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE test_items;
+    END IF;
+END;
+$$;
@@ -0,0 +1,60 @@
+-- Write-path benchmark fixtures (used by write_bench.py)
+-- Installed through the exec_sql RPC when available, otherwise run with psql as the supabase user.
+
+CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
+
+CREATE TABLE IF NOT EXISTS bench_writes (
+    id BIGSERIAL PRIMARY KEY,
+    ext_id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    description TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+GRANT ALL ON bench_writes TO service_role;
+GRANT USAGE, SELECT ON SEQUENCE bench_writes_id_seq TO service_role;
+
+-- Set-based load of a JSON array in one statement (closest thing to COPY through PostgREST)
+CREATE OR REPLACE FUNCTION bench_bulk_load(rows JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+    loaded BIGINT;
+BEGIN
+    INSERT INTO bench_writes (ext_id, name, description)
+    SELECT r.ext_id, r.name, r.description
+    FROM jsonb_to_recordset(rows) AS r(ext_id TEXT, name TEXT, description TEXT)
+    ON CONFLICT (ext_id) DO UPDATE SET name = EXCLUDED.name, description = EXCLUDED.description;
+    GET DIAGNOSTICS loaded = ROW_COUNT;
+    RETURN jsonb_build_object('rows', loaded, 'db_ms', extract(epoch FROM clock_timestamp() - started) * 1000);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION bench_reset()
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    TRUNCATE bench_writes RESTART IDENTITY;
+$$;
+
+-- Cumulative server execution time (ms) of statements that touched the benchmark objects
+CREATE OR REPLACE FUNCTION bench_db_time()
+RETURNS DOUBLE PRECISION
+LANGUAGE sql
+SECURITY DEFINER
+-- Supabase keeps pg_stat_statements in the extensions schema
+SET search_path = public, extensions
+AS $$
+    SELECT coalesce(sum(total_exec_time), 0)
+    FROM pg_stat_statements
+    WHERE (query ILIKE '%bench_writes%' OR query ILIKE '%bench_bulk_load%')
+      AND query NOT ILIKE '%bench_db_time%'
+      AND query NOT ILIKE '%bench_reset%';
+$$;
+
+REVOKE ALL ON FUNCTION bench_bulk_load(JSONB), bench_reset(), bench_db_time() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION bench_bulk_load(JSONB), bench_reset(), bench_db_time() TO service_role;
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,61 @@
+-- Synthetic dataset fixtures (used by seed.py)
+-- Installed through the exec_sql RPC when available, otherwise run with psql as the supabase user.
+-- Needs test_items and test_item_tags (scenarios.setup and bench_queries.sql).
+
+-- How far each dataset got; updated in the same transaction as the rows it counts
+CREATE TABLE IF NOT EXISTS seed_progress (
+    dataset TEXT PRIMARY KEY,
+    done BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+GRANT ALL ON seed_progress TO service_role;
+
+-- Insert the next batch of test_items (two tags each) towards target; returns rows seeded so far.
+-- Re-running after a crash continues where the last committed batch stopped.
+CREATE OR REPLACE FUNCTION seed_items(target BIGINT, batch INTEGER)
+RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    seeded BIGINT;
+    upto BIGINT;
+BEGIN
+    INSERT INTO seed_progress (dataset) VALUES ('items') ON CONFLICT (dataset) DO NOTHING;
+    SELECT done INTO seeded FROM seed_progress WHERE dataset = 'items' FOR UPDATE;
+    upto := least(seeded + batch, target);
+    IF upto <= seeded THEN
+        RETURN seeded;
+    END IF;
+
+    WITH inserted AS (
+        INSERT INTO test_items (name, description, created_at)
+        SELECT 'Seed Item ' || g,
+               'Synthetic row ' || g || ' ' || md5(g::TEXT),
+               NOW() - (g % 730) * INTERVAL '1 day' - (g % 86400) * INTERVAL '1 second'
+        FROM generate_series(seeded + 1, upto) AS g
+        RETURNING id
+    )
+    INSERT INTO test_item_tags (item_id, tag)
+    SELECT id, tag
+    FROM inserted, unnest(ARRAY['tag-' || (id % 10), 'tag-' || (id % 7 + 10)]) AS tag;
+
+    UPDATE seed_progress SET done = upto, updated_at = NOW() WHERE dataset = 'items';
+    RETURN upto;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION seed_analyze()
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    ANALYZE test_items;
+    ANALYZE test_item_tags;
+$$;
+
+REVOKE ALL ON FUNCTION seed_items(BIGINT, INTEGER), seed_analyze() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION seed_items(BIGINT, INTEGER), seed_analyze() TO service_role;
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,964 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Kong-fronted Supabase API
+Implements the subset of routes the test tools use, backed by SQLite:
+- /auth/v1:     health, signup, token (password grant), admin/users
+- /rest/v1:     test_items, test_item_tags, bench_writes, seed_progress with the
+                PostgREST filters, select, order, limit/offset, Prefer and CSV
+                the tools send, plus the RPCs from test/sql/*.sql
+- /storage/v1:  status, buckets, object upload/download (Range), delete, list,
+                TUS resumable uploads, S3 multipart uploads (/storage/v1/s3, signature
+                not verified)
+- /realtime/v1: Phoenix websocket with broadcast and postgres_changes INSERTs
+Every request can get injected latency and errors, globally or per route prefix.
+--fake-k8s adds simulated HPAs / cluster-autoscaler (fake_cluster.py) behind a
+minimal Kubernetes API, for autoscale_bench.py.
+POST /_standin/failover simulates a database restart for failover_probe.py.
+
+Usage:
+    python standin.py --port 54321 --latency-ms 5 --jitter-ms 10 --error-rate 0.01
+    eval "$(python standin.py --print-env)"   # then run test_api.py / loadgen.py against it
+
+From Python (e.g. CI):
+    url, stop = serve_in_thread(latency_ms=2)
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+from fake_cluster import FakeCluster
+from jwt_mint import mint
+
+JWT_SECRET = 'standin-jwt-secret-not-for-production'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')));
+CREATE TABLE IF NOT EXISTS test_item_tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER NOT NULL REFERENCES test_items(id) ON DELETE CASCADE, tag TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS test_item_tags_item_id_idx ON test_item_tags (item_id);
+CREATE TABLE IF NOT EXISTS bench_writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, ext_id TEXT NOT NULL UNIQUE, name TEXT, description TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')));
+CREATE TABLE IF NOT EXISTS seed_progress (
+    dataset TEXT PRIMARY KEY, done INTEGER NOT NULL DEFAULT 0, updated_at TEXT);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY, email TEXT UNIQUE, password TEXT, user_metadata TEXT, created_at TEXT);
+CREATE TABLE IF NOT EXISTS buckets (
+    id TEXT PRIMARY KEY, name TEXT UNIQUE, public INTEGER, created_at TEXT);
+CREATE TABLE IF NOT EXISTS objects (
+    bucket TEXT, name TEXT, id TEXT, size INTEGER, content_type TEXT, created_at TEXT, updated_at TEXT,
+    PRIMARY KEY (bucket, name));
+"""
+
+# Tables exposed on /rest/v1 with their primary key, the upsert conflict target unless on_conflict names another
+REST_TABLES = {'test_items': 'id', 'test_item_tags': 'id', 'bench_writes': 'id', 'seed_progress': 'dataset'}
+# parent -> child -> foreign key column, for select=...,child(cols) embedding
+EMBEDS = {'test_items': {'test_item_tags': 'item_id'}}
+# Paths outside the Supabase API: no apikey, no injected latency / errors
+CONTROL_PREFIXES = ('/api/', '/apis/', '/_standin/')
+# Endpoints that answer without the database
+DB_FREE = ('/auth/v1/health', '/storage/v1/status', '/realtime/v1/')
+
+OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+             'like': 'LIKE', 'ilike': 'LIKE'}
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ApiError(Exception):
+    """Raised inside handlers; rendered as a PostgREST/GoTrue-style JSON error"""
+
+    def __init__(self, status, message, code=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.code = code
+
+
+class StandIn:
+    """The stand-in application and its state"""
+
+    def __init__(self, db=':memory:', data_dir=None, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 route_latency=None, route_errors=None, seed=None, cluster=None,
+                 failover_down_s=20.0, failover_hang_ms=0.0):
+        self.db = sqlite3.connect(db, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+        self.own_data_dir = data_dir is None
+        self.data_dir = data_dir or tempfile.mkdtemp(prefix='standin-')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.route_latency = route_latency or {}
+        self.route_errors = route_errors or {}
+        self.random = random.Random(seed)
+        # Milliseconds spent in SQLite per table, for the bench_db_time RPC
+        self.table_ms = {}
+        self.uploads = {}
+        self.multipart = {}
+        self.sockets = {}
+        self.runner = None
+        # Optional FakeCluster: autoscaling model plus a Kubernetes API for autoscale_bench.py
+        self.cluster = cluster
+        # Simulated database restart: defaults for /_standin/failover and the one in progress
+        self.failover_down_s = failover_down_s
+        self.failover_hang_ms = failover_hang_ms
+        self.outage = None
+        self.anon_key = mint(JWT_SECRET, None, role='anon', ttl=10 * 365 * 86400)[0]
+        self.service_key = mint(JWT_SECRET, None, role='service_role', ttl=10 * 365 * 86400)[0]
+
+    # --- Plumbing --------------------------------------------------------
+
+    def app(self):
+        app = web.Application(middlewares=[self.inject, self.errors], client_max_size=1024 ** 3)
+        routes = [
+            web.get('/auth/v1/health', self.auth_health),
+            web.post('/auth/v1/signup', self.auth_signup),
+            web.post('/auth/v1/token', self.auth_token),
+            web.get('/auth/v1/admin/users', self.admin_list_users),
+            web.post('/auth/v1/admin/users', self.admin_create_user),
+            web.get('/rest/v1/', self.rest_root),
+            web.post('/rest/v1/rpc/{function}', self.rpc),
+            web.route('*', '/rest/v1/{table}', self.rest_table),
+            web.get('/storage/v1/status', self.storage_status),
+            web.get('/storage/v1/bucket', self.list_buckets),
+            web.post('/storage/v1/bucket', self.create_bucket),
+            web.post('/storage/v1/object/list/{bucket}', self.list_objects),
+            web.post('/storage/v1/upload/resumable', self.tus_create),
+            web.route('*', '/storage/v1/upload/resumable/{upload}', self.tus_upload),
+            web.delete('/storage/v1/object/{bucket}', self.delete_objects),
+            web.post('/storage/v1/object/{bucket}/{name:.+}', self.put_object),
+            web.put('/storage/v1/object/{bucket}/{name:.+}', self.put_object),
+            web.get('/storage/v1/object/{bucket}/{name:.+}', self.get_object),
+            web.post('/storage/v1/s3/{bucket}/{name:.+}', self.s3_multipart),
+            web.put('/storage/v1/s3/{bucket}/{name:.+}', self.s3_upload_part),
+            web.delete('/storage/v1/s3/{bucket}/{name:.+}', self.s3_abort),
+            web.get('/realtime/v1/websocket', self.realtime_socket),
+            web.post('/realtime/v1/api/broadcast', self.realtime_broadcast),
+            web.post('/_standin/failover', self.trigger_failover),
+        ]
+        if self.cluster:
+            routes.extend(self.cluster.routes())
+            app.on_startup.append(self.cluster.run)
+            app.on_cleanup.append(self.cluster.close)
+        app.add_routes(routes)
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Serve on the running loop; returns the base URL"""
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        for sockets in self.sockets.values():
+            for ws in list(sockets):
+                await ws.close()
+        if self.runner:
+            await self.runner.cleanup()
+        self.db.close()
+        if self.own_data_dir:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _pick(self, table, path, default):
+        matches = [prefix for prefix in table if path.startswith(prefix)]
+        return table[max(matches, key=len)] if matches else default
+
+    @web.middleware
+    async def inject(self, request, handler):
+        """Injected latency (base + exponential jitter) and errors"""
+        if request.path.startswith(CONTROL_PREFIXES):
+            return await handler(request)
+        delay = self._pick(self.route_latency, request.path, self.latency_ms)
+        if self.cluster:
+            self.cluster.observe(request.path)
+            delay += self.cluster.penalty_ms(request.path)
+        if self.jitter_ms:
+            delay += self.random.expovariate(1 / self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self.outage and not request.path.startswith(DB_FREE):
+            unavailable = await self.database_unavailable(request.path)
+            if unavailable is not None:
+                return unavailable
+        if self.random.random() < self._pick(self.route_errors, request.path, self.error_rate):
+            return web.json_response({"message": "injected error", "code": "standin"}, status=503)
+        return await handler(request)
+
+    @web.middleware
+    async def errors(self, request, handler):
+        signed = request.path.startswith('/storage/v1/s3/') and \
+            request.headers.get('Authorization', '').startswith('AWS4-HMAC-SHA256 ')
+        if not request.path.startswith(CONTROL_PREFIXES) and not signed and \
+                not request.headers.get('apikey') and not request.query.get('apikey'):
+            return web.json_response({"message": "No API key found in request"}, status=401)
+        try:
+            return await handler(request)
+        except ApiError as e:
+            return web.json_response({"message": e.message, "code": e.code, "error": e.message,
+                                      "statusCode": str(e.status)}, status=e.status)
+        except sqlite3.Error as e:
+            return web.json_response({"message": str(e), "code": "SQLITE"}, status=400)
+
+    # --- Database failover -----------------------------------------------
+
+    async def trigger_failover(self, request):
+        """Start a simulated database restart; body {"down_s": 20, "hang_ms": 0} overrides the defaults"""
+        body = await request.json() if request.can_read_body else {}
+        start = time.monotonic()
+        down_s = float(body.get('down_s', self.failover_down_s))
+        self.outage = {"start": start, "end": start + down_s,
+                       "hang_ms": float(body.get('hang_ms', self.failover_hang_ms))}
+        return web.json_response({"down_s": down_s, "hang_ms": self.outage['hang_ms'],
+                                  "rest_back_s": self.reconnected_at('/rest/v1/') - start})
+
+    def reconnected_at(self, path):
+        """When the service behind path reaches the database again"""
+        if not path.startswith('/rest/v1'):
+            # GoTrue and Storage open a new pool connection on the next request
+            return self.outage['end']
+        # PostgREST retries its pool with exponential backoff: 1s, 2s, 4s ... 32s
+        attempt, backoff = self.outage['start'], 1
+        while attempt < self.outage['end']:
+            attempt += backoff
+            backoff = min(backoff * 2, 32)
+        return attempt
+
+    async def database_unavailable(self, path):
+        """Error response while the database is restarting, like the real services give; None once back"""
+        remaining = self.reconnected_at(path) - time.monotonic()
+        if remaining <= 0:
+            return None
+        if self.outage['hang_ms']:
+            # Requests on connections to the old primary hang until the socket times out
+            await asyncio.sleep(min(self.outage['hang_ms'] / 1000, remaining))
+        if path.startswith('/rest/v1'):
+            return web.json_response({"code": "PGRST001", "details": "connection refused", "hint": None,
+                                      "message": "Database client error. Retrying the connection."}, status=503)
+        if path.startswith('/auth/v1'):
+            return web.json_response({"code": 500, "error_code": "unexpected_failure",
+                                      "msg": "Database error querying schema"}, status=500)
+        return web.json_response({"statusCode": "500", "error": "internal",
+                                  "message": "connect ECONNREFUSED"}, status=500)
+
+    def execute(self, table, sql, params=()):
+        start = time.perf_counter()
+        cursor = self.db.execute(sql, params)
+        rows = cursor.fetchall()
+        self.table_ms[table] = self.table_ms.get(table, 0.0) + (time.perf_counter() - start) * 1000
+        return cursor, rows
+
+    # --- Auth ------------------------------------------------------------
+
+    async def auth_health(self, request):
+        return web.json_response({"version": "standin", "name": "GoTrue",
+                                  "description": "Offline stand-in (test/standin.py)"})
+
+    def user_json(self, row):
+        return {"id": row['id'], "aud": "authenticated", "role": "authenticated", "email": row['email'],
+                "user_metadata": json.loads(row['user_metadata'] or '{}'), "created_at": row['created_at']}
+
+    def session_json(self, row):
+        token, expires = mint(JWT_SECRET, row['id'], email=row['email'])
+        return {"access_token": token, "token_type": "bearer", "expires_in": 3600, "expires_at": expires,
+                "refresh_token": uuid.uuid4().hex, "user": self.user_json(row)}
+
+    def create_user(self, body):
+        email = (body.get('email') or '').lower()
+        if not email or not body.get('password'):
+            raise ApiError(422, "Signup requires a valid password", 'validation_failed')
+        try:
+            self.db.execute('INSERT INTO users (id, email, password, user_metadata, created_at) VALUES (?, ?, ?, ?, ?)',
+                            (str(uuid.uuid4()), email, body['password'],
+                             json.dumps(body.get('user_metadata') or body.get('data') or {}), now()))
+        except sqlite3.IntegrityError:
+            raise ApiError(422, "User already registered", 'user_already_exists')
+        return self.db.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+
+    async def auth_signup(self, request):
+        return web.json_response(self.session_json(self.create_user(await request.json())))
+
+    async def auth_token(self, request):
+        if request.query.get('grant_type') != 'password':
+            raise ApiError(400, "Only the password grant is implemented", 'unsupported_grant_type')
+        body = await request.json()
+        row = self.db.execute('SELECT * FROM users WHERE email = ?', ((body.get('email') or '').lower(),)).fetchone()
+        if not row or row['password'] != body.get('password'):
+            raise ApiError(400, "Invalid login credentials", 'invalid_credentials')
+        return web.json_response(self.session_json(row))
+
+    async def admin_list_users(self, request):
+        page = max(1, int(request.query.get('page', 1)))
+        per_page = min(1000, max(1, int(request.query.get('per_page', 50))))
+        rows = self.db.execute('SELECT * FROM users ORDER BY created_at, id LIMIT ? OFFSET ?',
+                               (per_page, (page - 1) * per_page)).fetchall()
+        return web.json_response({"aud": "authenticated", "users": [self.user_json(row) for row in rows]})
+
+    async def admin_create_user(self, request):
+        return web.json_response(self.user_json(self.create_user(await request.json())))
+
+    # --- PostgREST -------------------------------------------------------
+
+    async def rest_root(self, request):
+        return web.json_response({"swagger": "2.0", "info": {"title": "standin", "version": "12.2.12"},
+                                  "paths": {f"/{table}": {} for table in REST_TABLES}})
+
+    def columns(self, table):
+        return [row['name'] for row in self.db.execute(f'PRAGMA table_info({table})')]
+
+    def where(self, table, query):
+        """WHERE clause and parameters from PostgREST column filters"""
+        columns, clauses, params = self.columns(table), [], []
+        for key, value in query.items():
+            if key in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns'):
+                continue
+            if key not in columns:
+                raise ApiError(400, f"column {table}.{key} does not exist", '42703')
+            negate = value.startswith('not.')
+            operator, _, operand = value[4:].partition('.') if negate else value.partition('.')
+            if operator in OPERATORS:
+                if operator in ('like', 'ilike'):
+                    operand = operand.replace('*', '%')
+                clause = f"{key} {OPERATORS[operator]} ?"
+                params.append(operand)
+            elif operator == 'in':
+                items = [item.strip('"') for item in operand.strip('()').split(',') if item]
+                clause = f"{key} IN ({', '.join('?' * len(items))})"
+                params.extend(items)
+            elif operator == 'is':
+                clause = f"{key} IS {dict(null='NULL', true='1', false='0').get(operand, 'NULL')}"
+            else:
+                raise ApiError(400, f"unsupported operator '{operator}'", 'PGRST100')
+            clauses.append(f"NOT ({clause})" if negate else clause)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def parse_select(self, table, select):
+        """Plain columns and {child: columns} embeddings"""
+        plain, embeds, depth, token = [], {}, 0, ''
+        for char in (select or '*') + ',':
+            if char == ',' and depth == 0:
+                token = token.strip()
+                if '(' in token:
+                    child, _, inner = token.partition('(')
+                    if child not in EMBEDS.get(table, {}):
+                        raise ApiError(400, f"Could not find a relationship between '{table}' and '{child}'",
+                                       'PGRST200')
+                    embeds[child] = inner.rstrip(')') or '*'
+                elif token:
+                    plain.append(token)
+                token = ''
+                continue
+            depth += char == '('
+            depth -= char == ')'
+            token += char
+        columns = self.columns(table)
+        for column in plain:
+            if column != '*' and column not in columns:
+                raise ApiError(400, f"column {table}.{column} does not exist", '42703')
+        return plain or ['*'], embeds
+
+    def order_by(self, table, order):
+        if not order:
+            return ''
+        columns, terms = self.columns(table), []
+        for term in order.split(','):
+            column, *modifiers = term.split('.')
+            if column not in columns:
+                raise ApiError(400, f"column {table}.{column} does not exist", '42703')
+            direction = 'DESC' if 'desc' in modifiers else 'ASC'
+            nulls = ' NULLS FIRST' if 'nullsfirst' in modifiers else ' NULLS LAST' if 'nullslast' in modifiers else ''
+            terms.append(f"{column} {direction}{nulls}")
+        return ' ORDER BY ' + ', '.join(terms)
+
+    def select_rows(self, table, query):
+        plain, embeds = self.parse_select(table, query.get('select'))
+        where, params = self.where(table, query)
+        sql = f"SELECT {', '.join(plain)}{', id' if embeds and '*' not in plain and 'id' not in plain else ''} " \
+              f"FROM {table}{where}{self.order_by(table, query.get('order'))}"
+        if 'limit' in query or 'offset' in query:
+            sql += f" LIMIT {int(query.get('limit', -1))} OFFSET {int(query.get('offset', 0))}"
+        _, rows = self.execute(table, sql, params)
+        rows = [dict(row) for row in rows]
+        for child, child_select in embeds.items():
+            key = EMBEDS[table][child]
+            child_columns = child_select.split(',')
+            for row in rows:
+                _, children = self.execute(child, f"SELECT {', '.join(child_columns)} FROM {child} WHERE {key} = ?",
+                                           (row['id'],))
+                row[child] = [dict(c) for c in children]
+        return rows, where, params
+
+    @staticmethod
+    def prefer(request):
+        preferences = {}
+        for item in request.headers.get('Prefer', '').split(','):
+            key, _, value = item.strip().partition('=')
+            if key:
+                preferences[key] = value
+        return preferences
+
+    def respond_rows(self, request, rows, status=200, headers=None):
+        if request.headers.get('Accept') == 'text/csv':
+            out = io.StringIO()
+            if rows:
+                writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            return web.Response(text=out.getvalue(), status=status, content_type='text/csv', headers=headers)
+        return web.json_response(rows, status=status, headers=headers)
+
+    async def rest_table(self, request):
+        table = request.match_info['table']
+        if table not in REST_TABLES:
+            raise ApiError(404, f'relation "public.{table}" does not exist', '42P01')
+        prefer = self.prefer(request)
+        query = request.query
+
+        if request.method == 'GET':
+            rows, where, params = self.select_rows(table, query)
+            headers = {}
+            if 'count' in prefer:
+                _, total = self.execute(table, f"SELECT count(*) FROM {table}{where}", params)
+                offset = int(query.get('offset', 0))
+                span = f"{offset}-{offset + len(rows) - 1}" if rows else '*'
+                headers['Content-Range'] = f"{span}/{total[0][0]}"
+            return self.respond_rows(request, rows, status=200, headers=headers)
+
+        if request.method == 'POST':
+            body = await request.json()
+            rows = body if isinstance(body, list) else [body]
+            inserted = self.insert(table, rows, upsert=prefer.get('resolution') == 'merge-duplicates',
+                                   conflict=query.get('on_conflict'))
+            if prefer.get('return') == 'representation':
+                return self.respond_rows(request, inserted, status=201)
+            return web.Response(status=201)
+
+        if request.method == 'PATCH':
+            body = await request.json()
+            columns = self.columns(table)
+            unknown = [key for key in body if key not in columns]
+            if unknown:
+                raise ApiError(400, f"column {table}.{unknown[0]} does not exist", '42703')
+            where, params = self.where(table, query)
+            _, ids = self.execute(table, f"SELECT id FROM {table}{where}" if 'id' in columns
+                                  else f"SELECT rowid AS id FROM {table}{where}", params)
+            self.execute(table, f"UPDATE {table} SET {', '.join(f'{key} = ?' for key in body)}{where}",
+                         list(body.values()) + params)
+            if prefer.get('return') == 'representation':
+                return self.respond_rows(request, self.rows_by_id(table, [row['id'] for row in ids]))
+            return web.Response(status=204)
+
+        if request.method == 'DELETE':
+            where, params = self.where(table, query)
+            rows = self.select_rows(table, query)[0] if prefer.get('return') == 'representation' else None
+            self.execute(table, f"DELETE FROM {table}{where}", params)
+            return self.respond_rows(request, rows) if rows is not None else web.Response(status=204)
+
+        raise ApiError(405, f"{request.method} not supported", 'PGRST117')
+
+    def rows_by_id(self, table, ids):
+        if not ids:
+            return []
+        _, rows = self.execute(table, f"SELECT * FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        return [dict(row) for row in rows]
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """BEGIN ... COMMIT, rolled back on any error so later writes don't hit an open transaction"""
+        self.db.execute('BEGIN')
+        try:
+            yield
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+    def insert(self, table, rows, upsert=False, conflict=None):
+        if not rows:
+            return []
+        columns = self.columns(table)
+        keys = list(rows[0])
+        unknown = [key for key in keys if key not in columns]
+        if unknown:
+            raise ApiError(400, f"column {table}.{unknown[0]} does not exist", '42703')
+        sql = f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({', '.join('?' * len(keys))})"
+        if upsert:
+            target = conflict or REST_TABLES[table]
+            if target not in columns:
+                raise ApiError(400, f"column {table}.{target} does not exist", '42703')
+            updates = [key for key in keys if key != target]
+            sql += f" ON CONFLICT ({target}) DO " + \
+                   (f"UPDATE SET {', '.join(f'{key} = excluded.{key}' for key in updates)}" if updates else "NOTHING")
+        sql += " RETURNING *"
+        inserted = []
+        try:
+            with self.transaction():
+                for row in rows:
+                    _, returned = self.execute(table, sql, [row.get(key) for key in keys])
+                    inserted.extend(dict(r) for r in returned)
+        except sqlite3.IntegrityError as e:
+            raise ApiError(409, str(e), '23505')
+        if table == 'test_items':
+            for row in inserted:
+                self.notify_insert(table, row)
+        return inserted
+
+    # --- RPCs (test/sql/*.sql) --------------------------------------------
+
+    async def rpc(self, request):
+        function = request.match_info['function']
+        handler = getattr(self, f'rpc_{function}', None)
+        if handler is None:
+            raise ApiError(404, f"Could not find the function public.{function} in the schema cache", 'PGRST202')
+        body = await request.json() if request.can_read_body else {}
+        result = handler(**(body or {}))
+        if result is None:
+            return web.Response(status=204)
+        return web.json_response(result)
+
+    def rpc_exec_sql(self, sql=None):
+        # Fixtures are built into the stand-in schema; the SQL itself is not run
+        return None
+
+    def rpc_bench_reset(self):
+        self.execute('bench_writes', 'DELETE FROM bench_writes')
+        self.table_ms.pop('bench_writes', None)
+        return None
+
+    def rpc_bench_db_time(self):
+        return self.table_ms.get('bench_writes', 0.0)
+
+    def rpc_bench_bulk_load(self, rows):
+        start = time.perf_counter()
+        loaded = self.insert('bench_writes', rows, upsert=True, conflict='ext_id')
+        return {"rows": len(loaded), "db_ms": (time.perf_counter() - start) * 1000}
+
+    def seed(self, first, last):
+        """Insert test_items first..last (inclusive) with two tags each"""
+        with self.transaction():
+            for g in range(first, last + 1):
+                created = datetime.fromtimestamp(time.time() - (g % 365) * 86400 - g % 86400, timezone.utc)
+                cursor = self.db.execute('INSERT INTO test_items (name, description, created_at) VALUES (?, ?, ?)',
+                                         (f"Seed Item {g}", f"Synthetic row {g}", created.isoformat()))
+                item_id = cursor.lastrowid
+                self.db.executemany('INSERT INTO test_item_tags (item_id, tag) VALUES (?, ?)',
+                                    [(item_id, f"tag-{item_id % 10}"), (item_id, f"tag-{item_id % 7 + 10}")])
+
+    def rpc_bench_seed_items(self, target):
+        existing = self.db.execute('SELECT count(*) FROM test_items').fetchone()[0]
+        if existing < target:
+            self.seed(existing + 1, target)
+        return max(existing, target)
+
+    def rpc_seed_items(self, target, batch):
+        row = self.db.execute("SELECT done FROM seed_progress WHERE dataset = 'items'").fetchone()
+        done = row[0] if row else 0
+        upto = min(done + batch, target)
+        if upto > done:
+            self.seed(done + 1, upto)
+            self.db.execute("INSERT INTO seed_progress (dataset, done, updated_at) VALUES ('items', ?, ?) "
+                            "ON CONFLICT (dataset) DO UPDATE SET done = excluded.done, updated_at = excluded.updated_at",
+                            (upto, now()))
+        return max(done, upto)
+
+    def rpc_seed_analyze(self):
+        self.db.execute('ANALYZE')
+        return None
+
+    def rpc_bench_explain(self, query, with_analyze=False):
+        """EXPLAIN QUERY PLAN mapped onto the Postgres FORMAT JSON node names the tools look for"""
+        try:
+            steps = self.db.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        except sqlite3.Error as e:
+            raise ApiError(400, f"stand-in cannot explain this query: {e}", '42601')
+        nodes = []
+        for step in steps:
+            detail = step['detail']
+            words = detail.split()
+            if words[0] == 'SCAN' and len(words) > 1:
+                relation = words[1]
+                rows = self.db.execute(f"SELECT count(*) FROM {relation}").fetchone()[0] \
+                    if relation in REST_TABLES else 0
+                nodes.append({"Node Type": "Seq Scan", "Relation Name": relation, "Plan Rows": rows,
+                              "Total Cost": float(rows)})
+            elif words[0] == 'SEARCH':
+                nodes.append({"Node Type": "Index Scan", "Relation Name": words[1], "Plan Rows": 1,
+                              "Total Cost": 1.0, "Detail": detail})
+            elif 'TEMP B-TREE' in detail:
+                nodes.append({"Node Type": "Sort", "Plan Rows": 0, "Total Cost": 0.0, "Detail": detail})
+        return [{"Plan": {"Node Type": "Result", "Total Cost": sum(n["Total Cost"] for n in nodes),
+                          "Plan Rows": 0, "Plans": nodes}}]
+
+    # --- Storage ---------------------------------------------------------
+
+    async def storage_status(self, request):
+        return web.Response(text='OK')
+
+    async def list_buckets(self, request):
+        rows = self.db.execute('SELECT * FROM buckets ORDER BY name').fetchall()
+        return web.json_response([{"id": r['id'], "name": r['name'], "public": bool(r['public']),
+                                   "created_at": r['created_at']} for r in rows])
+
+    async def create_bucket(self, request):
+        body = await request.json()
+        name = body.get('name') or body.get('id')
+        try:
+            self.db.execute('INSERT INTO buckets (id, name, public, created_at) VALUES (?, ?, ?, ?)',
+                            (body.get('id') or name, name, int(bool(body.get('public'))), now()))
+        except sqlite3.IntegrityError:
+            raise ApiError(409, "The resource already exists", 'Duplicate')
+        return web.json_response({"name": name})
+
+    def bucket_dir(self, bucket):
+        if not self.db.execute('SELECT 1 FROM buckets WHERE id = ? OR name = ?', (bucket, bucket)).fetchone():
+            raise ApiError(404, "Bucket not found", 'NoSuchBucket')
+        return os.path.join(self.data_dir, bucket)
+
+    def object_file(self, bucket, name):
+        path = os.path.normpath(os.path.join(self.bucket_dir(bucket), name))
+        if not path.startswith(os.path.join(self.data_dir, bucket) + os.sep):
+            raise ApiError(400, "Invalid key", 'InvalidKey')
+        return path
+
+    def register_object(self, bucket, name, size, content_type):
+        stamp = now()
+        self.db.execute('INSERT INTO objects (bucket, name, id, size, content_type, created_at, updated_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (bucket, name) DO UPDATE SET '
+                        'size = excluded.size, content_type = excluded.content_type, updated_at = excluded.updated_at',
+                        (bucket, name, str(uuid.uuid4()), size, content_type, stamp, stamp))
+
+    async def put_object(self, request):
+        bucket, name = request.match_info['bucket'], request.match_info['name']
+        path = self.object_file(bucket, name)
+        exists = self.db.execute('SELECT 1 FROM objects WHERE bucket = ? AND name = ?', (bucket, name)).fetchone()
+        if exists and request.method == 'POST' and request.headers.get('x-upsert') != 'true':
+            raise ApiError(409, "The resource already exists", 'Duplicate')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        with open(path, 'wb') as f:
+            async for chunk in request.content.iter_chunked(1024 * 1024):
+                f.write(chunk)
+                size += len(chunk)
+        self.register_object(bucket, name, size, request.headers.get('Content-Type'))
+        return web.json_response({"Key": f"{bucket}/{name}"})
+
+    async def get_object(self, request):
+        bucket, name = request.match_info['bucket'], request.match_info['name']
+        path = self.object_file(bucket, name)
+        row = self.db.execute('SELECT * FROM objects WHERE bucket = ? AND name = ?', (bucket, name)).fetchone()
+        if not row or not os.path.exists(path):
+            raise ApiError(404, "Object not found", 'NoSuchKey')
+        # FileResponse answers Range requests with 206
+        return web.FileResponse(path, headers={'Content-Type': row['content_type'] or 'application/octet-stream'})
+
+    async def delete_objects(self, request):
+        bucket = request.match_info['bucket']
+        body = await request.json()
+        deleted = []
+        for name in body.get('prefixes', []):
+            path = self.object_file(bucket, name)
+            if self.db.execute('DELETE FROM objects WHERE bucket = ? AND name = ?', (bucket, name)).rowcount:
+                deleted.append({"bucket_id": bucket, "name": name})
+            if os.path.exists(path):
+                os.remove(path)
+        return web.json_response(deleted)
+
+    async def list_objects(self, request):
+        """Direct children of prefix: objects, and folders (id None) for deeper names"""
+        bucket = request.match_info['bucket']
+        self.bucket_dir(bucket)
+        body = await request.json()
+        prefix = (body.get('prefix') or '').strip('/')
+        base = f"{prefix}/" if prefix else ''
+        rows = self.db.execute("SELECT * FROM objects WHERE bucket = ? AND substr(name, 1, ?) = ?",
+                               (bucket, len(base), base)).fetchall()
+        entries = {}
+        for row in rows:
+            child, slash, _ = row['name'][len(base):].partition('/')
+            if slash:
+                entries.setdefault(child, {"name": child, "id": None, "updated_at": None, "created_at": None,
+                                           "metadata": None})
+            else:
+                entries[child] = {"name": child, "id": row['id'], "updated_at": row['updated_at'],
+                                  "created_at": row['created_at'],
+                                  "metadata": {"size": row['size'], "mimetype": row['content_type']}}
+        sort = body.get('sortBy') or {}
+        reverse = sort.get('order') == 'desc'
+        items = sorted(entries.values(), key=lambda e: e.get(sort.get('column', 'name')) or '', reverse=reverse)
+        offset, limit = int(body.get('offset', 0)), int(body.get('limit', 100))
+        return web.json_response(items[offset:offset + limit])
+
+    async def tus_create(self, request):
+        metadata = {}
+        for item in request.headers.get('Upload-Metadata', '').split(','):
+            key, _, value = item.strip().partition(' ')
+            if key:
+                metadata[key] = base64.b64decode(value).decode()
+        bucket, name = metadata.get('bucketName'), metadata.get('objectName')
+        if not bucket or not name:
+            raise ApiError(400, "bucketName and objectName metadata are required", 'InvalidUploadMetadata')
+        path = self.object_file(bucket, name)
+        upload = uuid.uuid4().hex
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.uploads[upload] = {"bucket": bucket, "name": name, "path": path + f'.{upload}.part',
+                                "length": int(request.headers['Upload-Length']), "offset": 0,
+                                "content_type": metadata.get('contentType')}
+        open(self.uploads[upload]['path'], 'wb').close()
+        return web.Response(status=201, headers={'Location': f"/storage/v1/upload/resumable/{upload}",
+                                                 'Tus-Resumable': '1.0.0'})
+
+    async def tus_upload(self, request):
+        upload = self.uploads.get(request.match_info['upload'])
+        if upload is None:
+            raise ApiError(404, "Upload not found", 'NoSuchUpload')
+        headers = {'Tus-Resumable': '1.0.0', 'Upload-Length': str(upload['length']),
+                   'Upload-Offset': str(upload['offset']), 'Cache-Control': 'no-store'}
+        if request.method == 'HEAD':
+            return web.Response(status=200, headers=headers)
+        if request.method != 'PATCH':
+            raise ApiError(405, f"{request.method} not supported", 'MethodNotAllowed')
+        if int(request.headers.get('Upload-Offset', -1)) != upload['offset']:
+            raise ApiError(409, "Upload-Offset does not match", 'OffsetMismatch')
+        with open(upload['path'], 'ab') as f:
+            async for chunk in request.content.iter_chunked(1024 * 1024):
+                f.write(chunk)
+                upload['offset'] += len(chunk)
+        if upload['offset'] >= upload['length']:
+            final = upload['path'].rsplit('.', 2)[0]
+            os.replace(upload['path'], final)
+            self.register_object(upload['bucket'], upload['name'], upload['offset'], upload['content_type'])
+            del self.uploads[request.match_info['upload']]
+        headers['Upload-Offset'] = str(upload['offset'])
+        return web.Response(status=204, headers=headers)
+
+    def s3_upload(self, request):
+        upload = self.multipart.get(request.query.get('uploadId'))
+        if upload is None:
+            raise ApiError(404, "The specified upload does not exist", 'NoSuchUpload')
+        return upload
+
+    async def s3_multipart(self, request):
+        """CreateMultipartUpload (?uploads) and CompleteMultipartUpload (?uploadId=)"""
+        bucket, name = request.match_info['bucket'], request.match_info['name']
+        if 'uploads' in request.query:
+            path = self.object_file(bucket, name)
+            upload = uuid.uuid4().hex
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.multipart[upload] = {"bucket": bucket, "name": name, "path": path, "parts": {}}
+            return web.Response(content_type='application/xml', text=(
+                f"<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{name}</Key>"
+                f"<UploadId>{upload}</UploadId></InitiateMultipartUploadResult>"))
+        upload = self.s3_upload(request)
+        listed = [(int(part.findtext('PartNumber')), part.findtext('ETag'))
+                  for part in ElementTree.fromstring(await request.read()).iter('Part')]
+        if not listed or any(upload['parts'].get(number, (None, None))[1] != etag for number, etag in listed):
+            raise ApiError(400, "One or more of the specified parts could not be found", 'InvalidPart')
+        size = 0
+        with open(upload['path'], 'wb') as f:
+            for number, _ in listed:
+                part = upload['parts'][number][0]
+                with open(part, 'rb') as source:
+                    size += f.write(source.read())
+        for part, _ in upload['parts'].values():
+            os.remove(part)
+        del self.multipart[request.query['uploadId']]
+        self.register_object(upload['bucket'], upload['name'], size, 'application/octet-stream')
+        return web.Response(content_type='application/xml', text=(
+            f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{name}</Key>"
+            f"</CompleteMultipartUploadResult>"))
+
+    async def s3_upload_part(self, request):
+        upload = self.s3_upload(request)
+        number = int(request.query['partNumber'])
+        path = f"{upload['path']}.{request.query['uploadId']}.{number}"
+        digest = hashlib.md5()
+        with open(path, 'wb') as f:
+            async for chunk in request.content.iter_chunked(1024 * 1024):
+                f.write(chunk)
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        upload['parts'][number] = (path, etag)
+        return web.Response(headers={'ETag': etag})
+
+    async def s3_abort(self, request):
+        upload = self.s3_upload(request)
+        for part, _ in upload['parts'].values():
+            os.remove(part)
+        del self.multipart[request.query['uploadId']]
+        return web.Response(status=204)
+
+    # --- Realtime --------------------------------------------------------
+
+    async def realtime_socket(self, request):
+        ws = web.WebSocketResponse()
+        if not ws.can_prepare(request).ok:
+            return web.Response(status=426, text="Upgrade Required")
+        await ws.prepare(request)
+        joined = {}
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                topic, event = data.get('topic'), data.get('event')
+                if event == 'phx_join':
+                    joined[topic] = (data.get('payload') or {}).get('config') or {}
+                    self.sockets.setdefault(topic, {})[ws] = joined[topic]
+                elif event == 'phx_leave':
+                    joined.pop(topic, None)
+                    self.sockets.get(topic, {}).pop(ws, None)
+                await ws.send_json({"topic": topic, "event": "phx_reply", "ref": data.get('ref'),
+                                    "payload": {"status": "ok", "response": {}}})
+        finally:
+            for topic in joined:
+                self.sockets.get(topic, {}).pop(ws, None)
+        return ws
+
+    def send(self, ws, message):
+        if not ws.closed:
+            asyncio.ensure_future(ws.send_json(message))
+
+    async def realtime_broadcast(self, request):
+        body = await request.json()
+        for message in body.get('messages', []):
+            topic = f"realtime:{message.get('topic')}"
+            for ws in list(self.sockets.get(topic, {})):
+                self.send(ws, {"topic": topic, "event": "broadcast", "ref": None, "payload": {
+                    "type": "broadcast", "event": message.get('event'), "payload": message.get('payload')}})
+        return web.Response(status=202)
+
+    def notify_insert(self, table, row):
+        """postgres_changes INSERT to every subscriber whose table and eq filter match"""
+        for topic, subscribers in self.sockets.items():
+            for ws, config in list(subscribers.items()):
+                for change in config.get('postgres_changes') or []:
+                    if change.get('table') not in (table, '*') or change.get('event') not in ('INSERT', '*'):
+                        continue
+                    column, _, condition = (change.get('filter') or '').partition('=')
+                    if column and (not condition.startswith('eq.') or str(row.get(column)) != condition[3:]):
+                        continue
+                    self.send(ws, {"topic": topic, "event": "postgres_changes", "ref": None, "payload": {
+                        "data": {"schema": "public", "table": table, "type": "INSERT", "record": row,
+                                 "commit_timestamp": now()}, "ids": []}})
+                    break
+
+
+def serve_in_thread(host='127.0.0.1', port=0, **options):
+    """Run a StandIn on a background thread; returns (url, stop)"""
+    loop = asyncio.new_event_loop()
+    standin = StandIn(**options)
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        state['url'] = loop.run_until_complete(standin.start(host, port))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(standin.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return state['url'], stop
+
+
+def parse_routes(values):
+    """['/auth/v1=50', ...] -> {'/auth/v1': 50.0}"""
+    routes = {}
+    for value in values or []:
+        prefix, _, number = value.partition('=')
+        routes[prefix] = float(number)
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Supabase API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--db', default=':memory:', help="SQLite database (default: in memory)")
+    parser.add_argument('--data-dir', default=None, help="Storage object directory (default: temporary)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added to every request")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Mean of an extra exponential delay")
+    parser.add_argument('--error-rate', type=float, default=0, help="Share of requests answered with 503")
+    parser.add_argument('--route-latency', action='append', metavar='PREFIX=MS',
+                        help="Latency for a path prefix instead of --latency-ms (repeatable)")
+    parser.add_argument('--route-error-rate', action='append', metavar='PREFIX=RATE',
+                        help="Error rate for a path prefix instead of --error-rate (repeatable)")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for injected latency / errors")
+    parser.add_argument('--print-env', action='store_true', help="Only print the environment for the tools")
+    parser.add_argument('--failover-down-s', type=float, default=20,
+                        help="Database downtime of POST /_standin/failover")
+    parser.add_argument('--failover-hang-ms', type=float, default=0,
+                        help="How long requests hang before failing during the downtime")
+    cluster = parser.add_argument_group('fake cluster', "Simulated HPAs / cluster-autoscaler on /api and /apis")
+    cluster.add_argument('--fake-k8s', action='store_true', help="Serve the fake Kubernetes API")
+    cluster.add_argument('--pod-capacity', type=float, default=50, help="req/s one pod handles at 100%% CPU")
+    cluster.add_argument('--service-ms', type=float, default=5, help="Per-request service time for queueing delay")
+    cluster.add_argument('--pod-start-s', type=float, default=20, help="Scheduled pod to Ready")
+    cluster.add_argument('--node-start-s', type=float, default=90, help="New node to Ready")
+    cluster.add_argument('--pods-per-node', type=int, default=4)
+    cluster.add_argument('--hpa-sync-s', type=float, default=15, help="HPA evaluation period")
+    cluster.add_argument('--scale-down-s', type=float, default=300, help="HPA scale-down stabilization window")
+    cluster.add_argument('--ca-delay-s', type=float, default=10, help="Pending time before nodes are added")
+    args = parser.parse_args()
+
+    standin = StandIn(db=args.db, data_dir=args.data_dir, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      error_rate=args.error_rate, route_latency=parse_routes(args.route_latency),
+                      route_errors=parse_routes(args.route_error_rate), seed=args.seed,
+                      failover_down_s=args.failover_down_s, failover_hang_ms=args.failover_hang_ms,
+                      cluster=FakeCluster(pod_capacity=args.pod_capacity, service_ms=args.service_ms,
+                                          pod_start_s=args.pod_start_s, node_start_s=args.node_start_s,
+                                          pods_per_node=args.pods_per_node, hpa_sync_s=args.hpa_sync_s,
+                                          scale_down_s=args.scale_down_s, ca_delay_s=args.ca_delay_s)
+                      if args.fake_k8s else None)
+    url = f"http://{args.host}:{args.port}"
+    environment = (f"export SUPABASE_URL={url}\nexport anonKey={standin.anon_key}\n"
+                   f"export serviceKey={standin.service_key}\nexport secret={JWT_SECRET}")
+    if args.print_env:
+        print(environment)
+        return
+
+    print("🧪 Supabase stand-in (offline, SQLite)")
+    print(f"URL: {url}  latency: {args.latency_ms}ms + exp({args.jitter_ms}ms)  errors: {args.error_rate * 100:g}%")
+    if args.fake_k8s:
+        print(f"☸️  Fake Kubernetes API: {url}  (autoscale_bench.py --api {url})")
+    print("-" * 50)
+    print(environment)
+    web.run_app(standin.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Latency and counter aggregation for the Supabase load tools
+- HDR-style log-linear latency histogram (mergeable, sparse)
+- Per-endpoint counters (requests, errors, status codes, bytes)
+- Run-level report with throughput and p50/p90/p99/max
+- Coordinated-omission correction (HdrHistogram recordValueWithExpectedInterval)
+- to_dict / from_dict for the JSON results files (results.py)
+"""
+
+import math
+import time
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in microseconds.
+
+    Values below 2^SUB_BUCKET_BITS are stored exactly; above that every
+    power-of-two range is split into 2^(SUB_BUCKET_BITS-1) buckets. Percentiles
+    report a bucket's upper bound, so they overstate the latency by at most
+    1/2^(SUB_BUCKET_BITS-1) (1/64, about 1.6%) while staying small and mergeable.
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def _index(cls, value):
+        shift = max(0, value.bit_length() - cls.SUB_BUCKET_BITS)
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def _bounds(cls, index):
+        """Lowest and highest value that map to a bucket index"""
+        if index < (1 << cls.SUB_BUCKET_BITS):
+            return index, index
+        shift = (index >> (cls.SUB_BUCKET_BITS - 1)) - 1
+        mantissa = index - (shift << (cls.SUB_BUCKET_BITS - 1))
+        low = mantissa << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value_us, count=1):
+        """Record a latency (microseconds) count times"""
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_corrected(self, value_us, expected_interval_us):
+        """Record a latency and back-fill the samples a stalled closed-loop sender never issued.
+
+        If a response took longer than the interval at which requests were
+        expected, the requests that would have been sent meanwhile would have
+        seen value - interval, value - 2*interval, ... of queueing delay.
+        """
+        self.record(value_us)
+        if not expected_interval_us or expected_interval_us <= 0:
+            return
+        missing = int(value_us) - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def merge(self, other):
+        """Add all values of another histogram into this one"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        """Value (microseconds) at or below which p percent of samples fall"""
+        if self.total == 0:
+            return 0
+        if p >= 100:
+            return self.max
+        target = max(1, math.ceil(self.total * p / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._bounds(index)[1], self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def to_dict(self):
+        return {"counts": sorted(self.counts.items()), "total": self.total, "sum": self.sum,
+                "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["counts"]}
+        histogram.total = data["total"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+# HTTP phases recorded by the harness trace hooks, in request order:
+# queue (waiting for a pool slot), dns, connect (TCP + TLS), ttfb (request
+# headers sent -> response headers) and transfer (response body)
+PHASES = ('queue', 'dns', 'connect', 'ttfb', 'transfer')
+
+
+class EndpointStats:
+    """Counters and latency histogram for one endpoint"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.status_codes = {}
+        self.error_kinds = {}
+        # Only phases that actually happened are recorded (no connect on a reused connection)
+        self.phases = {}
+        self.reused = 0
+        self.connections = 0
+
+    def record(self, seconds, ok, status=None, nbytes=0, error=None,
+               service_seconds=None, expected_interval=None, phases=None, reused=None):
+        """Record one request.
+
+        seconds is the response time (from the scheduled start in open-loop
+        runs); service_seconds is the time from actually sending it. phases
+        maps PHASES names to seconds; reused says whether a pooled keep-alive
+        connection was used (None when unknown).
+        """
+        if expected_interval:
+            self.latency.record_corrected(seconds * 1_000_000, expected_interval * 1_000_000)
+        else:
+            self.latency.record(seconds * 1_000_000)
+        self.service.record((seconds if service_seconds is None else service_seconds) * 1_000_000)
+        self.requests += 1
+        self.bytes += nbytes
+        if status is not None:
+            key = str(status)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if not ok:
+            self.errors += 1
+            kind = error or f"HTTP {status}"
+            self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+        for phase, phase_seconds in (phases or {}).items():
+            self.phases.setdefault(phase, LatencyHistogram()).record(phase_seconds * 1_000_000)
+        if reused is not None:
+            if reused:
+                self.reused += 1
+            else:
+                self.connections += 1
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.service.merge(other.service)
+        self.requests += other.requests
+        self.errors += other.errors
+        self.bytes += other.bytes
+        for key, count in other.status_codes.items():
+            self.status_codes[key] = self.status_codes.get(key, 0) + count
+        for key, count in other.error_kinds.items():
+            self.error_kinds[key] = self.error_kinds.get(key, 0) + count
+        for phase, histogram in other.phases.items():
+            self.phases.setdefault(phase, LatencyHistogram()).merge(histogram)
+        self.reused += other.reused
+        self.connections += other.connections
+        return self
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def reuse_rate(self):
+        """Share of requests sent on an already open keep-alive connection"""
+        traced = self.reused + self.connections
+        return self.reused / traced if traced else 0.0
+
+    def to_dict(self):
+        return {
+            "latency": self.latency.to_dict(),
+            "service": self.service.to_dict(),
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "status_codes": self.status_codes,
+            "error_kinds": self.error_kinds,
+            "phases": {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+            "reused": self.reused,
+            "connections": self.connections,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.latency = LatencyHistogram.from_dict(data["latency"])
+        stats.service = LatencyHistogram.from_dict(data["service"])
+        stats.requests = data["requests"]
+        stats.errors = data["errors"]
+        stats.bytes = data["bytes"]
+        stats.status_codes = dict(data["status_codes"])
+        stats.error_kinds = dict(data["error_kinds"])
+        stats.phases = {phase: LatencyHistogram.from_dict(h) for phase, h in data.get("phases", {}).items()}
+        stats.reused = data.get("reused", 0)
+        stats.connections = data.get("connections", 0)
+        return stats
+
+
+class RunStats:
+    """Per-endpoint statistics for a whole load run"""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.started = time.time()
+        self.finished = None
+
+    def endpoint(self, name):
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def record(self, name, seconds, ok, status=None, nbytes=0, error=None,
+               service_seconds=None, expected_interval=None, phases=None, reused=None):
+        self.endpoint(name).record(seconds, ok, status=status, nbytes=nbytes, error=error,
+                                   service_seconds=service_seconds, expected_interval=expected_interval,
+                                   phases=phases, reused=reused)
+
+    def merge(self, other):
+        for name, stats in other.endpoints.items():
+            self.endpoint(name).merge(stats)
+        self.started = min(self.started, other.started)
+        if other.finished is not None:
+            self.finished = max(self.finished or other.finished, other.finished)
+        return self
+
+    def finish(self):
+        self.finished = time.time()
+
+    @property
+    def elapsed(self):
+        return max(1e-9, (self.finished or time.time()) - self.started)
+
+    @property
+    def total_requests(self):
+        return sum(s.requests for s in self.endpoints.values())
+
+    @property
+    def total_errors(self):
+        return sum(s.errors for s in self.endpoints.values())
+
+    def to_dict(self):
+        return {"started": self.started, "finished": self.finished,
+                "endpoints": {name: s.to_dict() for name, s in self.endpoints.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.started = data["started"]
+        stats.finished = data["finished"]
+        stats.endpoints = {name: EndpointStats.from_dict(s) for name, s in data["endpoints"].items()}
+        return stats
+
+    def print_report(self, title="LOAD TEST SUMMARY"):
+        """Print throughput, error rate and latency percentiles per endpoint"""
+        elapsed = self.elapsed
+        print("\n" + "=" * 100)
+        print(f"📊 {title}")
+        print("=" * 100)
+        print(f"{'Endpoint':<40} {'reqs':>8} {'req/s':>9} {'err%':>7} "
+              f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        print("-" * 100)
+        for name in sorted(self.endpoints):
+            s = self.endpoints[name]
+            h = s.latency
+            print(f"{name:<40} {s.requests:>8} {s.requests / elapsed:>9.1f} {s.error_rate * 100:>6.2f}% "
+                  f"{h.percentile(50) / 1000:>8.1f} {h.percentile(90) / 1000:>8.1f} "
+                  f"{h.percentile(99) / 1000:>8.1f} {h.max / 1000:>8.1f}")
+        print("-" * 100)
+        total = self.total_requests
+        error_rate = self.total_errors / total * 100 if total else 0.0
+        print(f"⏱️  Duration: {elapsed:.1f}s   📨 Requests: {total}   "
+              f"🚀 Throughput: {total / elapsed:.1f} req/s   ❌ Errors: {error_rate:.2f}%")
+
+        errors = {}
+        for name, s in self.endpoints.items():
+            for kind, count in s.error_kinds.items():
+                errors[f"{name}: {kind}"] = count
+        if errors:
+            print("\n❌ Errors by endpoint:")
+            for key, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+                print(f"   {count:>6}  {key}")
+
+        if any(s.phases for s in self.endpoints.values()):
+            self.print_phases()
+
+    def print_phases(self):
+        """Print p50/p99 per HTTP phase and keep-alive reuse per endpoint"""
+        print("\n⏱️  Phase breakdown (p50/p99 ms; dns and connect only on new connections)")
+        print(f"{'Endpoint':<34} {'reuse':>6} {'new':>6} " + " ".join(f"{phase:>11}" for phase in PHASES))
+        print("-" * 108)
+        for name in sorted(self.endpoints):
+            s = self.endpoints[name]
+            cells = []
+            for phase in PHASES:
+                h = s.phases.get(phase)
+                cells.append(f"{h.percentile(50) / 1000:>5.1f}/{h.percentile(99) / 1000:<5.1f}" if h else f"{'-':>11}")
+            print(f"{name[:34]:<34} {s.reuse_rate * 100:>5.1f}% {s.connections:>6} " + " ".join(cells))
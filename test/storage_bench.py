@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Supabase Storage Throughput Benchmark
+- Uploads and downloads objects across a size matrix (e.g. 4KB .. 5GB)
+- Upload methods: standard (one streamed POST), TUS resumable (chunked PATCHes)
+  and S3 multipart through /storage/v1/s3 (parts uploaded in parallel)
+- Download methods: whole object and parallel byte ranges
+- Bodies are generated and written to disk in chunks, never held whole in memory
+- Reports MB/s per size and method plus per-object and per-part latency
+
+Usage:
+    python storage_bench.py --sizes 4KB,1MB,32MB --objects 8 --parallel 4
+    python storage_bench.py --sizes 1GB --upload tus --download ranged --parts 8
+    python storage_bench.py --sizes 256MB,1GB --upload multipart --parts 8 --part-size 16MB
+
+Note: the chart sets storage FILE_SIZE_LIMIT to 50MB; raise it before
+benchmarking larger objects.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+from urllib.parse import quote, urlparse
+
+import aiohttp
+from yarl import URL
+
+import results
+from harness import Config, HarnessClient
+from scenarios import TEST_BUCKET
+from stats import EndpointStats, RunStats
+
+UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+STREAM_CHUNK = 256 * 1024
+TUS_CHUNK = 6 * 1024 * 1024  # Supabase storage expects 6MB TUS chunks
+S3_MIN_PART = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+
+def parse_size(text):
+    """'4KB' -> 4096"""
+    text = text.strip().upper()
+    for unit in ('GB', 'MB', 'KB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * UNITS[unit])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+# One random block reused for every body, sliced into chunks on the fly
+BLOCK = os.urandom(1024 * 1024)
+
+
+def body_chunks(size, chunk=STREAM_CHUNK, start=0):
+    """Yield bytes start..size of the body in chunks without building the whole body.
+
+    Byte n of every object is BLOCK[n % len(BLOCK)], so any offset can be
+    regenerated when a resumable upload restarts part-way.
+    """
+    position = start
+    while position < size:
+        length = min(chunk, size - position)
+        offset = position % len(BLOCK)
+        if offset + length <= len(BLOCK):
+            yield BLOCK[offset:offset + length]
+        else:
+            data = bytearray()
+            while len(data) < length:
+                take = min(length - len(data), len(BLOCK) - offset)
+                data += BLOCK[offset:offset + take]
+                offset = 0
+            yield bytes(data)
+        position += length
+
+
+async def async_body(size, start=0):
+    for chunk in body_chunks(size, start=start):
+        yield chunk
+
+
+class S3Signer:
+    """AWS Signature V4 for the storage S3 endpoint, payloads left unsigned so parts can stream
+
+    Either S3 access keys (storage S3_PROTOCOL_ACCESS_KEY_ID / _SECRET) or session
+    token auth: the project ref as access key, the anon key as secret and a JWT
+    as session token.
+    """
+
+    def __init__(self, access_key, secret_key, region, session_token=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.session_token = session_token
+
+    def headers(self, method, host, path, query):
+        """Signed headers for an already encoded path and query string"""
+        stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+        scope = f"{stamp[:8]}/{self.region}/s3/aws4_request"
+        headers = {'host': host, 'x-amz-content-sha256': 'UNSIGNED-PAYLOAD', 'x-amz-date': stamp}
+        if self.session_token:
+            headers['x-amz-security-token'] = self.session_token
+        signed = ';'.join(sorted(headers))
+        canonical = '\n'.join([method, path, query, *(f"{key}:{headers[key]}" for key in sorted(headers)),
+                               '', signed, 'UNSIGNED-PAYLOAD'])
+        to_sign = '\n'.join(['AWS4-HMAC-SHA256', stamp, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (stamp[:8], self.region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+        headers['Authorization'] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={signed}, Signature={signature}")
+        return headers
+
+
+def xml_text(body, tag):
+    """Text of the first element named tag in an S3 XML response, ignoring namespaces"""
+    for element in ElementTree.fromstring(body).iter():
+        if element.tag.rsplit('}', 1)[-1] == tag:
+            return element.text
+    return None
+
+
+class Group:
+    """Results for one (method, size) cell of the matrix"""
+
+    def __init__(self):
+        self.objects = EndpointStats()
+        self.parts = EndpointStats()
+        self.bytes = 0
+        self.wall = 0.0
+
+
+class StorageBench:
+    def __init__(self, client, bucket, workdir, signer=None):
+        self.client = client
+        self.bucket = bucket
+        self.workdir = workdir
+        self.signer = signer
+        self.groups = {}
+
+    def group(self, method, size):
+        key = (method, size)
+        if key not in self.groups:
+            self.groups[key] = Group()
+        return self.groups[key]
+
+    def url(self, path):
+        return f"{self.client.config.url}{path}"
+
+    def auth_headers(self):
+        return self.client.headers(service=True, content_type=None)
+
+    def s3(self, method, name, query, headers=None, data=None):
+        """SigV4-signed request to the S3 endpoint for an object of the bucket"""
+        base = urlparse(self.client.config.url)
+        path = quote(f"{base.path}/storage/v1/s3/{self.bucket}/{name}", safe='/-_.~')
+        query = '&'.join(f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}"
+                         for key, value in sorted(query.items()))
+        signed = self.signer.headers(method, base.netloc, path, query)
+        return self.client.session.request(method, URL(f"{base.scheme}://{base.netloc}{path}?{query}", encoded=True),
+                                           data=data, headers={**signed, **(headers or {})})
+
+    # Uploads
+
+    async def upload_standard(self, name, size):
+        group = self.group('upload standard', size)
+        headers = {**self.auth_headers(), 'Content-Type': 'application/octet-stream',
+                   'Content-Length': str(size), 'x-upsert': 'true'}
+        start = time.perf_counter()
+        try:
+            async with self.client.session.post(self.url(f'/storage/v1/object/{self.bucket}/{name}'),
+                                                headers=headers, data=async_body(size)) as response:
+                await response.read()
+                ok = response.status in (200, 201)
+                group.objects.record(time.perf_counter() - start, ok, status=response.status, nbytes=size)
+                return ok
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            group.objects.record(time.perf_counter() - start, False, error=type(e).__name__)
+            return False
+
+    async def upload_tus(self, name, size, chunk_size, retries=3):
+        """TUS resumable upload; on a failed PATCH the offset is re-read with HEAD and the upload resumes"""
+        group = self.group('upload tus', size)
+        tus = {'Tus-Resumable': '1.0.0'}
+        metadata = ','.join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in (
+            ('bucketName', self.bucket),
+            ('objectName', name),
+            ('contentType', 'application/octet-stream'),
+        ))
+        start = time.perf_counter()
+        try:
+            async with self.client.session.post(
+                    self.url('/storage/v1/upload/resumable'),
+                    headers={**self.auth_headers(), **tus, 'Upload-Length': str(size),
+                             'Upload-Metadata': metadata, 'x-upsert': 'true'}) as response:
+                await response.read()
+                if response.status != 201:
+                    group.objects.record(time.perf_counter() - start, False, status=response.status)
+                    return False
+                # Location may carry the in-cluster host; keep only the path behind Kong
+                location = self.url(urlparse(response.headers['Location']).path)
+
+            offset, failures = 0, 0
+            chunks = body_chunks(size, chunk_size)
+            chunk = next(chunks, b'')
+            while offset < size:
+                part_start = time.perf_counter()
+                try:
+                    async with self.client.session.patch(
+                            location, data=chunk,
+                            headers={**self.auth_headers(), **tus, 'Upload-Offset': str(offset),
+                                     'Content-Type': 'application/offset+octet-stream'}) as response:
+                        await response.read()
+                        ok = response.status in (200, 204)
+                        group.parts.record(time.perf_counter() - part_start, ok,
+                                           status=response.status, nbytes=len(chunk))
+                        if not ok:
+                            raise aiohttp.ClientResponseError(response.request_info, (), status=response.status)
+                        offset = int(response.headers.get('Upload-Offset', offset + len(chunk)))
+                        chunk = next(chunks, b'')
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if not isinstance(e, aiohttp.ClientResponseError):
+                        group.parts.record(time.perf_counter() - part_start, False, error=type(e).__name__)
+                    failures += 1
+                    if failures > retries:
+                        raise
+                    resumed = await self._tus_offset(location, tus)
+                    if resumed != offset:
+                        # Server kept a different amount: regenerate the body from there
+                        offset = resumed
+                        chunks = body_chunks(size, chunk_size, start=offset)
+                        chunk = next(chunks, b'')
+
+            group.objects.record(time.perf_counter() - start, True, status=204, nbytes=size)
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+            group.objects.record(time.perf_counter() - start, False, error=type(e).__name__)
+            return False
+
+    async def _tus_offset(self, location, tus):
+        async with self.client.session.head(location, headers={**self.auth_headers(), **tus}) as response:
+            return int(response.headers.get('Upload-Offset', 0))
+
+    async def upload_multipart(self, name, size, part_size, parts):
+        """S3 multipart upload with up to parts UploadPart requests in flight; aborted if any part fails"""
+        group = self.group('upload multipart', size)
+        start = time.perf_counter()
+        upload_id, status, ok = None, None, False
+        try:
+            async with self.s3('POST', name, {'uploads': ''}) as response:
+                body = await response.read()
+                if response.status != 200:
+                    group.objects.record(time.perf_counter() - start, False, status=response.status)
+                    return False
+                upload_id = xml_text(body, 'UploadId')
+
+            etags = {}
+            slots = asyncio.Semaphore(parts)
+
+            async def put(number, first):
+                length = min(part_size, size - first)
+                async with slots:
+                    part_start = time.perf_counter()
+                    try:
+                        async with self.s3('PUT', name, {'partNumber': str(number), 'uploadId': upload_id},
+                                           headers={'Content-Length': str(length)},
+                                           data=async_body(first + length, start=first)) as response:
+                            await response.read()
+                            # Without the ETag the part can't be listed in CompleteMultipartUpload
+                            etag = response.headers.get('ETag')
+                            ok = response.status == 200 and bool(etag)
+                            group.parts.record(time.perf_counter() - part_start, ok, status=response.status,
+                                               nbytes=length,
+                                               error='MissingETag' if response.status == 200 and not etag else None)
+                            if ok:
+                                etags[number] = etag
+                            return ok
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        group.parts.record(time.perf_counter() - part_start, False, error=type(e).__name__)
+                        return False
+
+            # A 0 byte object still needs one (empty) part
+            firsts = range(0, max(size, 1), part_size)
+            ok = all(await asyncio.gather(*(put(number, first) for number, first in enumerate(firsts, 1))))
+            if ok:
+                complete = ''.join(f"<Part><PartNumber>{number}</PartNumber><ETag>{etags[number]}</ETag></Part>"
+                                   for number in sorted(etags))
+                async with self.s3('POST', name, {'uploadId': upload_id},
+                                   headers={'Content-Type': 'application/xml'},
+                                   data=f"<CompleteMultipartUpload>{complete}</CompleteMultipartUpload>".encode()) \
+                        as response:
+                    body = await response.read()
+                    status = response.status
+                    # S3 may answer 200 and still fail the upload in the body
+                    ok = status == 200 and xml_text(body, 'Error') is None
+            group.objects.record(time.perf_counter() - start, ok, status=status, nbytes=size if ok else 0)
+            return ok
+        except (aiohttp.ClientError, asyncio.TimeoutError, ElementTree.ParseError) as e:
+            group.objects.record(time.perf_counter() - start, False, error=type(e).__name__)
+            return False
+        finally:
+            if upload_id and not ok:
+                await self._s3_abort(name, upload_id)
+
+    async def _s3_abort(self, name, upload_id):
+        """Best effort AbortMultipartUpload so failed runs don't leave parts behind"""
+        try:
+            async with self.s3('DELETE', name, {'uploadId': upload_id}) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+    # Downloads
+
+    async def download_whole(self, name, size):
+        group = self.group('download whole', size)
+        path = os.path.join(self.workdir, name.replace('/', '_') + '.whole')
+        start = time.perf_counter()
+        received = 0
+        try:
+            async with self.client.session.get(self.url(f'/storage/v1/object/{self.bucket}/{name}'),
+                                               headers=self.auth_headers()) as response:
+                with open(path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK):
+                        f.write(chunk)
+                        received += len(chunk)
+                ok = response.status == 200 and received == size
+                group.objects.record(time.perf_counter() - start, ok, status=response.status, nbytes=received)
+                return ok
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            group.objects.record(time.perf_counter() - start, False, error=type(e).__name__)
+            return False
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def download_ranged(self, name, size, parts):
+        """Fetch parts byte ranges concurrently, each written at its offset with pwrite"""
+        group = self.group('download ranged', size)
+        path = os.path.join(self.workdir, name.replace('/', '_') + '.ranged')
+        part_size = max(1, -(-size // parts))
+        fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        os.ftruncate(fd, size)
+
+        async def fetch(first):
+            last = min(size, first + part_size) - 1
+            part_start = time.perf_counter()
+            position = first
+            try:
+                async with self.client.session.get(
+                        self.url(f'/storage/v1/object/{self.bucket}/{name}'),
+                        headers={**self.auth_headers(), 'Range': f'bytes={first}-{last}'}) as response:
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK):
+                        os.pwrite(fd, chunk, position)
+                        position += len(chunk)
+                    ok = response.status == 206 and position == last + 1
+                    group.parts.record(time.perf_counter() - part_start, ok,
+                                       status=response.status, nbytes=position - first)
+                    return ok
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                group.parts.record(time.perf_counter() - part_start, False, error=type(e).__name__)
+                return False
+
+        start = time.perf_counter()
+        try:
+            fetched = await asyncio.gather(*(fetch(first) for first in range(0, size, part_size)))
+            ok = all(fetched)
+            group.objects.record(time.perf_counter() - start, ok, nbytes=size if ok else 0)
+            return ok
+        finally:
+            os.close(fd)
+            os.remove(path)
+
+    async def delete(self, names):
+        for i in range(0, len(names), 100):
+            async with self.client.session.delete(
+                    self.url(f'/storage/v1/object/{self.bucket}'),
+                    headers={**self.auth_headers(), 'Content-Type': 'application/json'},
+                    json={"prefixes": names[i:i + 100]}) as response:
+                await response.read()
+
+
+async def bounded(parallel, jobs):
+    """Run coroutine factories with at most parallel in flight; returns wall time"""
+    slots = asyncio.Semaphore(parallel)
+
+    async def run(job):
+        async with slots:
+            return await job()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(job) for job in jobs))
+    return time.perf_counter() - start
+
+
+async def run(args):
+    config = Config()
+    config.validate()
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    uploads = [m for m in args.upload.split(',') if m]
+    downloads = [m for m in args.download.split(',') if m]
+    workdir = tempfile.mkdtemp(prefix='storage-bench-', dir=args.workdir)
+    run_id = uuid.uuid4().hex[:8]
+    # Session token auth unless S3 access keys are given
+    signer = S3Signer(args.s3_access_key or args.project_ref, args.s3_secret_key or config.anon_key,
+                      args.s3_region, session_token=None if args.s3_access_key else config.service_key)
+
+    print("🚀 Starting Supabase Storage benchmark")
+    print(f"URL: {config.url}  Bucket: {args.bucket}")
+    print(f"Sizes: {', '.join(format_size(s) for s in sizes)}  Objects/size: {args.objects}  "
+          f"Parallel: {args.parallel}  Ranged parts: {args.parts}")
+    print("-" * 50)
+
+    created, uploaded = [], []
+    async with HarnessClient(config, pool_size=max(args.parallel * max(args.parts, 1), 10),
+                             timeout=args.timeout) as client:
+        bench = StorageBench(client, args.bucket, workdir, signer)
+        try:
+            for size in sizes:
+                for method in uploads:
+                    names = [f"bench-{run_id}/{method}-{format_size(size)}-{i}.bin" for i in range(args.objects)]
+                    print(f"📤 {method} upload {format_size(size)} x{args.objects}...")
+                    if method == 'standard':
+                        jobs = [lambda n=n: bench.upload_standard(n, size) for n in names]
+                    elif method == 'multipart':
+                        jobs = [lambda n=n: bench.upload_multipart(n, size, args.part_size, args.parts)
+                                for n in names]
+                    else:
+                        jobs = [lambda n=n: bench.upload_tus(n, size, args.chunk_size) for n in names]
+                    group = bench.group(f'upload {method}', size)
+                    group.wall += await bounded(args.parallel, jobs)
+                    group.bytes += size * (group.objects.requests - group.objects.errors)
+                    created.extend(names)
+                    uploaded.extend(names)
+
+                source, uploaded = uploaded, []
+                for method in downloads:
+                    if not source:
+                        print(f"⚠️  Skipping {method} download {format_size(size)} (nothing uploaded)")
+                        continue
+                    print(f"📥 {method} download {format_size(size)} x{len(source)}...")
+                    if method == 'whole':
+                        jobs = [lambda n=n: bench.download_whole(n, size) for n in source]
+                    else:
+                        jobs = [lambda n=n: bench.download_ranged(n, size, args.parts) for n in source]
+                    group = bench.group(f'download {method}', size)
+                    group.wall += await bounded(args.parallel, jobs)
+                    group.bytes += size * (group.objects.requests - group.objects.errors)
+        finally:
+            if created and not args.keep:
+                await bench.delete(created)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(bench.groups)
+    results.save('storage-bench', args, group_series(bench.groups), url=config.url, extra={
+        f"{method} {format_size(size)}": {"bytes": group.bytes, "wall": group.wall}
+        for (method, size), group in bench.groups.items()
+    })
+    return bench.groups
+
+
+def group_series(groups):
+    """One RunStats per (method, size) with objects/parts endpoints, elapsed = transfer wall time"""
+    series = {}
+    for (method, size), group in groups.items():
+        stats = RunStats()
+        stats.endpoints = {'objects': group.objects, 'parts': group.parts}
+        stats.finished = stats.started + group.wall
+        series[f"{method} {format_size(size)}"] = stats
+    return series
+
+
+def print_report(groups):
+    print("\n" + "=" * 110)
+    print("📊 STORAGE BENCHMARK SUMMARY")
+    print("=" * 110)
+    print(f"{'Method':<18} {'Size':>7} {'objs':>5} {'err':>4} {'MB/s':>9} {'obj p50 ms':>11} "
+          f"{'obj p99 ms':>11} {'parts':>6} {'part p50 ms':>12} {'part p99 ms':>12}")
+    print("-" * 110)
+    for (method, size), group in sorted(groups.items(), key=lambda item: (item[0][1], item[0][0])):
+        objects, parts = group.objects, group.parts
+        mbps = group.bytes / UNITS['MB'] / group.wall if group.wall else 0.0
+        print(f"{method:<18} {format_size(size):>7} {objects.requests:>5} {objects.errors:>4} {mbps:>9.2f} "
+              f"{objects.latency.percentile(50) / 1000:>11.1f} {objects.latency.percentile(99) / 1000:>11.1f} "
+              f"{parts.requests:>6} {parts.latency.percentile(50) / 1000:>12.1f} "
+              f"{parts.latency.percentile(99) / 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supabase storage throughput benchmark")
+    parser.add_argument('--sizes', default='4KB,256KB,1MB,16MB', help="Comma separated object sizes (4KB .. 5GB)")
+    parser.add_argument('--objects', type=int, default=4, help="Objects per size and upload method")
+    parser.add_argument('--parallel', type=int, default=4, help="Objects transferred concurrently")
+    parser.add_argument('--parts', type=int, default=4,
+                        help="Concurrent byte ranges per ranged download and parts in flight per multipart upload")
+    parser.add_argument('--chunk-size', type=parse_size, default=TUS_CHUNK, help="TUS PATCH chunk size")
+    parser.add_argument('--part-size', type=parse_size, default=8 * UNITS['MB'],
+                        help="Multipart part size (at least 5MB)")
+    parser.add_argument('--upload', default='standard,tus', help="Upload methods: standard,tus,multipart")
+    parser.add_argument('--download', default='whole,ranged', help="Download methods: whole,ranged")
+    parser.add_argument('--bucket', default=TEST_BUCKET)
+    parser.add_argument('--workdir', default=None, help="Directory for downloaded files (default: system temp)")
+    parser.add_argument('--timeout', type=float, default=None, help="Per-transfer timeout in seconds (default: none)")
+    parser.add_argument('--keep', action='store_true', help="Don't delete uploaded objects afterwards")
+    parser.add_argument('--s3-access-key', default=os.getenv('S3_ACCESS_KEY_ID'),
+                        help="S3 protocol access key (default: session token auth with --project-ref)")
+    parser.add_argument('--s3-secret-key', default=os.getenv('S3_SECRET_ACCESS_KEY'))
+    parser.add_argument('--s3-region', default=os.getenv('S3_REGION', 'us-east-1'))
+    parser.add_argument('--project-ref', default=os.getenv('PROJECT_REF', 'stub'),
+                        help="Access key for session token auth (the chart's storage TENANT_ID)")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    if args.part_size < S3_MIN_PART:
+        raise SystemExit(f"❌ --part-size must be at least {format_size(S3_MIN_PART)}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ import time
 from datetime import datetime
 from dotenv import load_dotenv
 
+from pagination import iter_storage_objects, iter_users
+
 # Load environment variables
 load_dotenv()
 
@@ -307,54 +309,43 @@ def create_test_user():
         return None, test_email
 
 def list_users():
-    """Test 4: List users using Service Key"""
+    """Test 4: List users using Service Key (paged, never holds every user)"""
     print("\n🔍 Test 4: Listing users (requires Service Key)...")
     
     try:
-        url = f"{SUPABASE_URL}/auth/v1/admin/users"
-        headers = {
-            'apikey': SERVICE_KEY,
-            'Authorization': f'Bearer {SERVICE_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        print(f"Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            users = result.get('users', [])
-            print(f"✅ Users found: {len(users)}")
-            
-            for i, user in enumerate(users[:5]):  # Show only first 5
+        count = 0
+        for user in iter_users(SUPABASE_URL, SERVICE_KEY):
+            if count < 5:  # Show only first 5
                 email = user.get('email', 'No email')
                 user_id = user.get('id', 'No ID')
                 created_at = user.get('created_at', 'Unknown')
-                print(f"   {i+1}. {email} (ID: {user_id[:8]}...) - {created_at}")
-            
-            if len(users) > 5:
-                print(f"   ... and {len(users) - 5} more users")
-                
-            return users
-        else:
-            print(f"❌ Error listing users: {response.text}")
-            return []
+                print(f"   {count+1}. {email} (ID: {user_id[:8]}...) - {created_at}")
+            count += 1
+        
+        if count > 5:
+            print(f"   ... and {count - 5} more users")
+        print(f"✅ Users found: {count}")
+        return count
             
     except Exception as e:
         print(f"❌ Error listing users: {e}")
-        return []
+        return 0
 
 def verify_user_exists(users, test_email):
-    """Test 5: Verify the created user exists in the list"""
+    """Test 5: Verify the created user exists in the list (stops at the first match)"""
     print(f"\n🔍 Test 5: Verifying user {test_email} exists...")
     
-    for user in users:
-        if user.get('email') == test_email:
-            print(f"✅ User found in list")
-            print(f"   Email: {user.get('email')}")
-            print(f"   ID: {user.get('id')}")
-            print(f"   Created: {user.get('created_at')}")
-            return True
+    try:
+        for user in users:
+            if user.get('email') == test_email:
+                print(f"✅ User found in list")
+                print(f"   Email: {user.get('email')}")
+                print(f"   ID: {user.get('id')}")
+                print(f"   Created: {user.get('created_at')}")
+                return True
+    except Exception as e:
+        print(f"❌ Error listing users: {e}")
+        return False
     
     print(f"❌ User {test_email} NOT found in list")
     return False
@@ -462,47 +453,26 @@ def test_storage_upload():
         return None
 
 def test_storage_list():
-    """Test 8: List files in Storage"""
+    """Test 8: List files in Storage (paged with limit/offset)"""
     print("\n🔍 Test 8: Listing files in Storage...")
     
     try:
-        url = f"{SUPABASE_URL}/storage/v1/object/list/test-bucket"
-        headers = {
-            'apikey': SERVICE_KEY,
-            'Authorization': f'Bearer {SERVICE_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Include required prefix property
-        data = {
-            "prefix": "",
-            "limit": 100,
-            "offset": 0
-        }
-        
-        response = requests.post(url, headers=headers, json=data, timeout=10)
-        print(f"Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            files = response.json()
-            print(f"✅ Files found: {len(files)}")
-            
-            for i, file in enumerate(files[:3]):  # Show only first 3
+        count = 0
+        for file in iter_storage_objects(SUPABASE_URL, SERVICE_KEY, 'test-bucket'):
+            if count < 3:  # Show only first 3
                 name = file.get('name', 'Unknown')
-                size = file.get('metadata', {}).get('size', 'Unknown')
-                print(f"   {i+1}. {name} ({size} bytes)")
-            
-            if len(files) > 3:
-                print(f"   ... and {len(files) - 3} more files")
-                
-            return files
-        else:
-            print(f"❌ Error listing files: {response.text}")
-            return []
+                size = (file.get('metadata') or {}).get('size', 'Unknown')
+                print(f"   {count+1}. {name} ({size} bytes)")
+            count += 1
+        
+        if count > 3:
+            print(f"   ... and {count - 3} more files")
+        print(f"✅ Files found: {count}")
+        return count
             
     except Exception as e:
         print(f"❌ Error listing files: {e}")
-        return []
+        return 0
 
 def test_storage_download(filename):
     """Test 9: Download a file from Storage"""
@@ -613,12 +583,12 @@ def main():
         tests_passed += 1
     
     # Test 4: List users
-    users = list_users()
-    if users:
+    user_count = list_users()
+    if user_count:
         tests_passed += 1
     
-    # Test 5: Verify user exists
-    if user_id and users and verify_user_exists(users, test_email):
+    # Test 5: Verify user exists (pages through users until it is found)
+    if user_id and user_count and verify_user_exists(iter_users(SUPABASE_URL, SERVICE_KEY), test_email):
         tests_passed += 1
     
     # Test 6: Storage Health
@@ -638,8 +608,8 @@ def main():
         print("⚠️  Skipping upload test (bucket creation failed)")
     
     # Test 8: Storage List
-    files = test_storage_list()
-    if files:
+    file_count = test_storage_list()
+    if file_count:
         tests_passed += 1
     
     # Test 9: Storage Download
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Declarative mixed workloads for loadgen.py
+A workload file (YAML, see workloads/) describes:
+- load:       the loadgen mode and its options (closed/open, rate, duration ...)
+- mix:        steps with weights - scenarios.py steps by name, or inline requests
+- select:     weighted (default, one random step per iteration) or sequence
+- think_time: pause after each step of a virtual user (closed mode only)
+- session:    steps run once per virtual user (e.g. login) and a session length
+- feeders:    CSV files or inline values substituted into inline requests
+
+Inline request strings can use ${feeder.column}, ${state.key} (the newest
+value saved under key), ${uuid} and ${now}. A request that references a
+state key nobody saved yet is skipped for that iteration.
+
+Usage:
+    python loadgen.py run workloads/peak.yaml
+    python loadgen.py run workloads/soak.yaml --duration 600 --processes 4
+"""
+
+import asyncio
+import csv
+import os
+import random
+import re
+import uuid
+from datetime import datetime
+
+import yaml
+
+import scenarios
+
+TEMPLATE = re.compile(r'\$\{([^}]+)\}')
+LOAD_OPTIONS = {
+    'closed': ('concurrency', 'requests', 'expected_interval_ms'),
+    'open': ('profile', 'rate', 'max_in_flight', 'step_rate', 'step_duration', 'steps', 'to_rate', 'window',
+             'peak_rate', 'spike_at', 'spike_duration'),
+}
+COMMON_OPTIONS = ('duration', 'pool_size', 'timeout', 'progress_interval', 'skip_setup', 'processes')
+
+
+class Feeder:
+    """Rows from a CSV file or an inline list, handed out circular or random"""
+
+    def __init__(self, name, spec, base_dir):
+        self.name = name
+        if 'file' in spec:
+            with open(os.path.join(base_dir, spec['file']), newline='') as f:
+                self.rows = list(csv.DictReader(f))
+        else:
+            self.rows = [row if isinstance(row, dict) else {'value': row} for row in spec.get('values') or []]
+        if not self.rows:
+            raise SystemExit(f"❌ Feeder '{name}' has no rows")
+        self.order = spec.get('order', 'circular')
+        if self.order not in ('circular', 'random'):
+            raise SystemExit(f"❌ Feeder '{name}': order must be circular or random")
+        # Workers in different processes start at different rows
+        self.position = random.randrange(len(self.rows))
+
+    def next(self):
+        if self.order == 'random':
+            return random.choice(self.rows)
+        row = self.rows[self.position % len(self.rows)]
+        self.position += 1
+        return row
+
+
+class MissingState(Exception):
+    """A template referenced a state key that no earlier step saved"""
+
+
+def render(value, context):
+    """Substitute ${...} in strings inside value (dicts and lists are walked)"""
+    if isinstance(value, dict):
+        return {key: render(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, context) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def substitute(match):
+        return str(lookup(match.group(1).strip(), context))
+
+    whole = TEMPLATE.fullmatch(value)
+    if whole:
+        # Keep the type for values that are just one placeholder ("${state.item_ids}" -> 42)
+        return lookup(whole.group(1).strip(), context)
+    return TEMPLATE.sub(substitute, value)
+
+
+def lookup(expression, context):
+    if expression == 'uuid':
+        return uuid.uuid4().hex
+    if expression == 'now':
+        return datetime.now().isoformat()
+    source, _, key = expression.partition('.')
+    if source == 'state':
+        value = context['state'].get(key)
+        if isinstance(value, list):
+            value = value[-1] if value else None
+        if value is None:
+            raise MissingState(key)
+        return value
+    if source not in context['feeders']:
+        raise SystemExit(f"❌ Unknown placeholder '${{{expression}}}'")
+    # One row per feeder per request, however often it is referenced
+    if source not in context['rows']:
+        context['rows'][source] = context['feeders'][source].next()
+    row = context['rows'][source]
+    if (key or 'value') not in row:
+        raise SystemExit(f"❌ Feeder '{source}' has no column '{key or 'value'}'")
+    return row[key or 'value']
+
+
+def request_step(spec, feeders):
+    """Step function for an inline request"""
+    name = spec.get('name') or f"{spec.get('method', 'GET')} {spec['path'].split('?')[0]}"
+    method = spec.get('method', 'GET').upper()
+    auth = spec.get('auth', 'anon')
+    if auth not in ('anon', 'service', 'user', 'session'):
+        raise SystemExit(f"❌ {name}: auth must be anon, service, user or session")
+    ok = tuple(spec.get('ok') or ((200, 206) if method == 'GET' else (200, 201, 204)))
+    saves = spec.get('save') or {}
+    consume = spec.get('consume')
+
+    async def step(client, state):
+        context = {'state': state, 'feeders': feeders, 'rows': {}}
+        try:
+            path = render(spec['path'], context)
+            headers = render(spec.get('headers'), context)
+            body = render(spec.get('json'), context)
+        except MissingState:
+            return
+        token = None
+        if auth == 'user':
+            token = client.user_token(state)
+        elif auth == 'session':
+            token = state.get('access_token')
+            if not token:
+                return
+        result = await client.request(name, method, path, ok=ok, service=auth == 'service',
+                                      headers=headers, json=body, token=token,
+                                      content_type='application/json' if body is not None else None)
+        if not result or result.status not in ok:
+            return
+        if consume and state.get(consume):
+            state[consume].pop()
+        if saves:
+            data = result.json()
+            row = data[0] if isinstance(data, list) and data else data
+            for key, field in saves.items():
+                if isinstance(row, dict) and row.get(field) is not None:
+                    state.setdefault(key, []).append(row[field])
+
+    step.__name__ = name
+    return step
+
+
+def think_sampler(spec):
+    """() -> seconds; spec is a number, {min, max} (uniform) or {mean} (exponential)"""
+    if not spec:
+        return None
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    if 'mean' in spec:
+        return lambda: random.expovariate(1 / spec['mean'])
+    return lambda: random.uniform(spec.get('min', 0), spec['max'])
+
+
+class Workload:
+    """A parsed workload file"""
+
+    def __init__(self, path):
+        with open(path) as f:
+            spec = yaml.safe_load(f) or {}
+        self.path = path
+        self.name = spec.get('name') or os.path.splitext(os.path.basename(path))[0]
+        self.description = spec.get('description', '')
+        self.load = spec.get('load') or {}
+        self.select = spec.get('select', 'weighted')
+        if self.select not in ('weighted', 'sequence'):
+            raise SystemExit(f"❌ {path}: select must be weighted or sequence")
+        base_dir = os.path.dirname(os.path.abspath(path))
+        self.feeders = {name: Feeder(name, feeder, base_dir) for name, feeder in (spec.get('feeders') or {}).items()}
+        self.think = think_sampler(spec.get('think_time'))
+        session = spec.get('session') or {}
+        self.session_steps = [self.step(entry) for entry in session.get('start') or []]
+        self.session_length = session.get('length')
+
+        self.entries = []
+        for entry in spec.get('mix') or []:
+            weight = entry.get('weight', 1) if isinstance(entry, dict) else 1
+            if weight <= 0:
+                raise SystemExit(f"❌ {path}: weights must be positive")
+            self.entries.append((self.step(entry), weight))
+        if not self.entries:
+            raise SystemExit(f"❌ {path}: the mix is empty")
+
+    def step(self, entry):
+        """scenarios.py step by name (string or {step: name}), or {request: {...}}"""
+        if isinstance(entry, str):
+            entry = {'step': entry}
+        if 'request' in entry:
+            return request_step(entry['request'], self.feeders)
+        name = entry.get('step')
+        if name not in scenarios.SCENARIOS:
+            raise SystemExit(f"❌ {self.path}: unknown step '{name}'. Available: {', '.join(scenarios.SCENARIOS)}")
+        return scenarios.SCENARIOS[name]
+
+    def arguments(self):
+        """loadgen.py command line for the load section (options given after it override it)"""
+        mode = self.load.get('mode', 'closed')
+        if mode not in LOAD_OPTIONS:
+            raise SystemExit(f"❌ {self.path}: load.mode must be closed or open")
+        argv = [mode]
+        for key in LOAD_OPTIONS[mode] + COMMON_OPTIONS:
+            value = self.load.get(key)
+            if value is None or value is False:
+                continue
+            argv.append('--' + key.replace('_', '-'))
+            if value is not True:
+                argv.append(str(value))
+        unknown = set(self.load) - set(LOAD_OPTIONS[mode] + COMMON_OPTIONS) - {'mode'}
+        if unknown:
+            raise SystemExit(f"❌ {self.path}: unknown load options for {mode}: {', '.join(sorted(unknown))}")
+        return argv + ['--workload', self.path]
+
+    def steps(self, think=True):
+        """Step list for runner.closed_loop / open_loop (think time only makes sense closed-loop)"""
+        if self.select == 'sequence':
+            return [self.wrap(step, think) for step, _ in self.entries]
+        steps = [step for step, _ in self.entries]
+        weights = [weight for _, weight in self.entries]
+
+        async def mixed(client, state):
+            await random.choices(steps, weights)[0](client, state)
+
+        return [self.wrap(mixed, think)]
+
+    def wrap(self, step, think):
+        """Add session start / churn and think time around a step"""
+        sampler = self.think if think else None
+
+        async def wrapped(client, state):
+            if not state.get('session_started'):
+                state['session_started'] = True
+                for start in self.session_steps:
+                    await start(client, state)
+            await step(client, state)
+            state['iterations'] = state.get('iterations', 0) + 1
+            if self.session_length and state['iterations'] >= self.session_length:
+                # The virtual user leaves; the next iteration starts a fresh session
+                state.clear()
+            if sampler:
+                await asyncio.sleep(sampler())
+
+        return wrapped
+
+    def describe(self):
+        total = sum(weight for _, weight in self.entries)
+        return ", ".join(f"{getattr(step, '__name__', 'request')} {weight / total * 100:g}%"
+                         for step, weight in self.entries) if self.select == 'weighted' else "sequence"
+
+
+def resolve(args, mode):
+    """Steps for a loadgen run: the --workload file if given, else --scenarios"""
+    if getattr(args, 'workload', None):
+        return Workload(args.workload).steps(think=mode == 'closed')
+    return scenarios.resolve(args.scenarios)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+PostgREST Bulk-Write Benchmark
+Loads N rows into bench_writes (test/sql/bench_writes.sql) with several
+strategies and reports rows/s (of rows actually written), HTTP latency and
+DB-side execution time:
+- row:                  one POST per row
+- batch-<n>-minimal:    JSON array bodies of n rows, Prefer: return=minimal
+- batch-<n>-repr:       same with Prefer: return=representation
+- upsert-<n>:           arrays with Prefer: resolution=merge-duplicates
+                        (half the keys already exist)
+- rpc-<n>:              bench_bulk_load(rows jsonb), one set-based INSERT per call
+
+DB time is the pg_stat_statements delta for statements on the benchmark
+objects, so it excludes network, Kong and PostgREST overhead.
+
+Usage:
+    python write_bench.py --rows 20000 --batch-sizes 100,1000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import results
+import scenarios
+from harness import Config, HarnessClient
+from stats import EndpointStats, RunStats
+
+TABLE_PATH = '/rest/v1/bench_writes'
+
+
+def make_rows(run_id, first, count):
+    return [{
+        "ext_id": f"{run_id}-{i}",
+        "name": f"Bench Item {i}",
+        "description": f"Bulk write benchmark row {i} of run {run_id}"
+    } for i in range(first, first + count)]
+
+
+def chunks(total, size):
+    """(first, count) pairs covering total rows in batches of size"""
+    return [(first, min(size, total - first)) for first in range(0, total, size)]
+
+
+async def bounded(concurrency, coroutines):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(coroutine):
+        async with slots:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines))
+
+
+class WriteBench:
+    def __init__(self, client, rows, concurrency):
+        self.client = client
+        self.rows = rows
+        self.concurrency = concurrency
+
+    async def rpc(self, name, body=None):
+        result = await self.client.request(f'rpc {name}', 'POST', f'/rest/v1/rpc/{name}',
+                                           service=True, ok=(200, 204), json=body or {})
+        return result.json() if result and result.status == 200 else None
+
+    async def insert(self, endpoint, rows, prefer, path=TABLE_PATH):
+        """POST rows (an object or an array); returns how many rows were written"""
+        result = await self.client.request(endpoint, 'POST', path, service=True, ok=(200, 201),
+                                           headers={'Prefer': prefer}, json=rows)
+        if not result or result.status not in (200, 201):
+            return 0
+        return len(rows) if isinstance(rows, list) else 1
+
+    async def strategy_row(self, run_id):
+        return sum(await bounded(self.concurrency, (
+            self.insert('row', make_rows(run_id, i, 1)[0], 'return=minimal') for i in range(self.rows)
+        )))
+
+    async def strategy_batch(self, run_id, size, representation):
+        prefer = 'return=representation' if representation else 'return=minimal'
+        endpoint = f"batch-{size}-{'repr' if representation else 'minimal'}"
+        return sum(await bounded(self.concurrency, (
+            self.insert(endpoint, make_rows(run_id, first, count), prefer) for first, count in chunks(self.rows, size)
+        )))
+
+    async def preload_upsert(self, run_id):
+        """Untimed: load the first half of the keys so the upsert mixes updates and inserts"""
+        for first, count in chunks(self.rows // 2, 1000):
+            await self.rpc('bench_bulk_load', {"rows": make_rows(run_id, first, count)})
+
+    async def strategy_upsert(self, run_id, size):
+        return sum(await bounded(self.concurrency, (
+            # Without on_conflict PostgREST targets the primary key, and preloaded ext_ids would fail with 409
+            self.insert(f'upsert-{size}', make_rows(run_id, first, count),
+                        'resolution=merge-duplicates,return=minimal', path=f'{TABLE_PATH}?on_conflict=ext_id')
+            for first, count in chunks(self.rows, size)
+        )))
+
+    async def strategy_rpc(self, run_id, size):
+        loaded = await bounded(self.concurrency, (
+            self.rpc('bench_bulk_load', {"rows": make_rows(run_id, first, count)})
+            for first, count in chunks(self.rows, size)
+        ))
+        return sum(result['rows'] for result in loaded if result)
+
+    async def measure(self, name, execute, prepare=None):
+        """Reset the table, run prepare untimed, then time execute (which returns the rows it wrote)
+        and read the DB time delta"""
+        run_id = uuid.uuid4().hex[:8]
+        await self.rpc('bench_reset')
+        if prepare:
+            await prepare(run_id)
+        db_before = await self.rpc('bench_db_time')
+
+        stats, housekeeping = RunStats(), self.client.stats
+        self.client.stats = stats
+        written = 0
+        start = time.perf_counter()
+        try:
+            written = await execute(run_id)
+        finally:
+            wall = time.perf_counter() - start
+            stats.finish()
+            self.client.stats = housekeeping
+
+        db_after = await self.rpc('bench_db_time')
+        db_ms = db_after - db_before if db_before is not None and db_after is not None else None
+        return name, wall, db_ms, written, stats
+
+
+async def run(args):
+    config = Config()
+    config.validate()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+    strategies = [s.strip() for s in args.strategies.split(',') if s.strip()]
+
+    print("🚀 Starting PostgREST bulk-write benchmark")
+    print(f"URL: {config.url}")
+    print(f"Rows: {args.rows}  Batch sizes: {batch_sizes}  Concurrency: {args.concurrency}")
+    print("-" * 50)
+
+    measured = []
+    async with HarnessClient(config, pool_size=max(args.concurrency, 10), timeout=args.timeout) as client:
+        if not args.skip_setup:
+            await scenarios.install_sql(client, 'bench_writes.sql')
+
+        bench = WriteBench(client, args.rows, args.concurrency)
+        cases = []
+        if 'row' in strategies:
+            cases.append(('row', bench.strategy_row, None))
+        for size in batch_sizes:
+            if 'batch' in strategies:
+                cases.append((f'batch-{size}-minimal', lambda r, s=size: bench.strategy_batch(r, s, False), None))
+                cases.append((f'batch-{size}-repr', lambda r, s=size: bench.strategy_batch(r, s, True), None))
+            if 'upsert' in strategies:
+                cases.append((f'upsert-{size}', lambda r, s=size: bench.strategy_upsert(r, s), bench.preload_upsert))
+            if 'rpc' in strategies:
+                cases.append((f'rpc-{size}', lambda r, s=size: bench.strategy_rpc(r, s), None))
+
+        for name, execute, prepare in cases:
+            print(f"✍️  {name}...")
+            measured.append(await bench.measure(name, execute, prepare))
+
+        if not args.keep:
+            await bench.rpc('bench_reset')
+
+    print_report(args.rows, measured)
+    results.save('write-bench', args, {name: stats for name, _, _, _, stats in measured}, url=config.url,
+                 extra={name: {"wall": wall, "db_ms": db_ms, "rows": written}
+                        for name, wall, db_ms, written, _ in measured})
+    return measured
+
+
+def print_report(rows, measured):
+    print("\n" + "=" * 114)
+    print("📊 BULK-WRITE SUMMARY")
+    print("=" * 114)
+    print(f"{'Strategy':<22} {'requests':>9} {'err%':>7} {'wall s':>8} {'written':>9} {'rows/s':>10} {'DB ms':>10} "
+          f"{'DB %':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    print("-" * 114)
+    for name, wall, db_ms, written, stats in measured:
+        requests = stats.total_requests
+        errors = stats.total_errors / requests * 100 if requests else 0.0
+        latency = EndpointStats()
+        for endpoint in stats.endpoints.values():
+            latency.merge(endpoint)
+        db = f"{db_ms:>10.0f}" if db_ms is not None else f"{'n/a':>10}"
+        share = f"{db_ms / (wall * 1000) * 100:>5.0f}%" if db_ms is not None and wall else f"{'n/a':>6}"
+        rate = f"{written / wall if wall else 0:>10.0f}" if written else f"{'FAILED':>10}"
+        print(f"{name:<22} {requests:>9} {errors:>6.2f}% {wall:>8.2f} {written:>9} {rate} {db} "
+              f"{share} {latency.latency.percentile(50) / 1000:>8.1f} {latency.latency.percentile(99) / 1000:>8.1f}")
+    partial = [name for name, _, _, written, _ in measured if 0 < written < rows]
+    if partial:
+        print(f"\n⚠️  Wrote fewer than {rows} rows: {', '.join(partial)} (rows/s counts only written rows)")
+    print("\n💡 DB % above 100 means statements overlapped (concurrency > 1)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PostgREST bulk-write benchmark")
+    parser.add_argument('--rows', type=int, default=5000, help="Rows loaded per strategy")
+    parser.add_argument('--batch-sizes', default='10,100,1000', help="Comma separated batch sizes")
+    parser.add_argument('--strategies', default='row,batch,upsert,rpc', help="Subset of row,batch,upsert,rpc")
+    parser.add_argument('--concurrency', type=int, default=4, help="Requests in flight")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't (re)install test/sql/bench_writes.sql")
+    parser.add_argument('--keep', action='store_true', help="Leave the last strategy's rows in bench_writes")
+    results.add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()